@@ -6,8 +6,8 @@ import os
 import random
 from datetime import datetime
 from typing import Optional
-import httpx
 from openai import OpenAI
+from base.http_client import get_httpx_client
 from base.chatglm.code_kernel import CodeKernel, execute
 from base.chatglm.tool_registry import dispatch_tool, extract_code, get_tools
 from wcferry import Wcf
@@ -21,10 +21,7 @@ class ChatGLM:
         key = config.get("key", 'empty')
         api = config.get("api")
         proxy = config.get("proxy")
-        if proxy:
-            self.client = OpenAI(api_key=key, base_url=api, http_client=httpx.Client(proxy=proxy))
-        else:
-            self.client = OpenAI(api_key=key, base_url=api)
+        self.client = OpenAI(api_key=key, base_url=api, http_client=get_httpx_client(proxy))
         self.conversation_list = {}
         self.chat_type = {}
         self.max_retry = max_retry
@@ -48,6 +45,16 @@ class ChatGLM:
                 return True
         return False
 
+    def warmup(self) -> bool:
+        """预热：建立连接并发送一个极小的探测请求"""
+        try:
+            self.client.chat.completions.create(model="chatglm3", max_tokens=1,
+                                                messages=[{"role": "user", "content": "hi"}])
+            return True
+        except Exception as e:
+            print(f"ChatGLM 预热失败: {e}")
+            return False
+
     def get_answer(self, question: str, wxid: str) -> str:
         # wxid或者roomid,个人时为微信id，群消息时为群id
         if '#帮助' == question:
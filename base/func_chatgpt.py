@@ -4,9 +4,10 @@
 import logging
 from datetime import datetime
 
-import httpx
 from openai import APIConnectionError, APIError, AuthenticationError, OpenAI
 
+from base.http_client import get_httpx_client, record_usage
+
 
 class ChatGPT():
     def __init__(self, conf: dict) -> None:
@@ -16,12 +17,12 @@ class ChatGPT():
         prompt = conf.get("prompt")
         self.model = conf.get("model", "gpt-3.5-turbo")
         self.LOG = logging.getLogger("ChatGPT")
-        if proxy:
-            self.client = OpenAI(api_key=key, base_url=api, http_client=httpx.Client(proxy=proxy))
-        else:
-            self.client = OpenAI(api_key=key, base_url=api)
+        self.client = OpenAI(api_key=key, base_url=api, http_client=get_httpx_client(proxy))
         self.conversation_list = {}
         self.system_content_msg = {"role": "system", "content": prompt}
+        # 最近一次请求的 token 用量，以及累计命中前缀缓存节省的 token 数
+        self.last_usage = {}
+        self.cached_tokens_total = 0
 
     def __repr__(self):
         return 'ChatGPT'
@@ -33,6 +34,17 @@ class ChatGPT():
                 return True
         return False
 
+    def warmup(self) -> bool:
+        """预热：建立连接并发送一个极小的探测请求"""
+        try:
+            self.client.chat.completions.create(model=self.model,
+                                                messages=[{"role": "user", "content": "hi"}],
+                                                max_tokens=1)
+            return True
+        except Exception as e:
+            self.LOG.error(f"预热失败：{str(e)}")
+            return False
+
     def get_answer(self, question: str, wxid: str) -> str:
         # wxid或者roomid,个人时为微信id，群消息时为群id
         self.updateMessage(wxid, question, "user")
@@ -42,6 +54,7 @@ class ChatGPT():
                                                       messages=self.conversation_list[wxid],
                                                       temperature=0.2)
             rsp = ret.choices[0].message.content
+            record_usage(self, ret.usage)
             rsp = rsp[2:] if rsp.startswith("\n\n") else rsp
             rsp = rsp.replace("\n\n", "\n")
             self.updateMessage(wxid, rsp, "assistant")
@@ -7,9 +7,10 @@ import logging
 import time
 from datetime import datetime
 
-import requests
 from lxml import etree
 
+from base.http_client import get_session
+
 
 class News(object):
     def __init__(self) -> None:
@@ -23,7 +24,7 @@ class News(object):
         data = {"type": "telegram", "keyword": "你需要知道的隔夜全球要闻", "page": 0,
                 "rn": 1, "os": "web", "sv": "7.7.5", "app": "CailianpressWeb"}
         try:
-            rsp = requests.post(url=url, headers=self.headers, data=data)
+            rsp = get_session().post(url=url, headers=self.headers, data=data)
             data = json.loads(rsp.text)["data"]["telegram"]["data"][0]
             news = data["descr"]
             timestamp = data["time"]
@@ -2,8 +2,9 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime
-import re
 
 import ollama
 
@@ -13,10 +14,19 @@ class Ollama():
         enable = conf.get("enable")
         self.model = conf.get("model")
         self.prompt = conf.get("prompt")
+        self.keep_alive = conf.get("keep_alive", "30m")
+        # 每个会话保留的历史消息条数（不含系统提示词），按问答成对保留
+        self.max_history = int(conf.get("max_history", 10)) // 2 * 2 or 2
+        # 最多保留多少个会话，超出后淘汰最久未使用的
+        self.max_conversations = int(conf.get("max_conversations", 200))
 
         self.LOG = logging.getLogger("Ollama")
-        self.conversation_list = {}
-
+        self.client = ollama.Client(host=conf.get("host"))
+        # 系统提示词固定放在最前面，前缀不变，Ollama 可以复用已缓存的提示词计算结果
+        self.system_content_msg = {"role": "system", "content": self.prompt}
+        self.conversation_list = OrderedDict()
+        self._lock = threading.Lock()
+        self.preload_on_start = conf.get("preload", True)
 
     def __repr__(self):
         return 'Ollama'
@@ -28,32 +38,66 @@ class Ollama():
                 return True
         return False
 
-    def get_answer(self, question: str, wxid: str) -> str:
+    def preload(self) -> bool:
+        """加载模型并预先计算系统提示词，之后的新会话直接命中缓存"""
+        try:
+            self.client.chat(model=self.model, messages=[self.system_content_msg],
+                             keep_alive=self.keep_alive, options={"num_predict": 1})
+            self.LOG.info(f"模型 {self.model} 已预加载，保持 {self.keep_alive}")
+            return True
+        except Exception as e:
+            self.LOG.error(f"模型 {self.model} 预加载失败：{str(e)}")
+            return False
+
+    def warmup(self) -> bool:
+        """启动预热：按配置预加载模型，否则只探测服务是否可用"""
+        if self.preload_on_start:
+            return self.preload()
         try:
-            self.conversation_list[wxid]
-        except KeyError:
-            res=ollama.generate(model=self.model, prompt=self.prompt, keep_alive="30m")
-            self.updateMessage(wxid, res["context"], "assistant")
+            self.client.list()
+            return True
+        except Exception as e:
+            self.LOG.error(f"Ollama 服务不可用：{str(e)}")
+            return False
+
+    def get_answer(self, question: str, wxid: str) -> str:
         # wxid或者roomid,个人时为微信id，群消息时为群id
         rsp = ""
+        question_ = {"role": "user", "content": question}
         try:
-            res=ollama.generate(model=self.model, prompt=question, context=self.conversation_list[wxid], keep_alive="30m")
-            self.updateMessage(wxid, res["context"], "user")
-            res_message = res["response"]
+            messages = [self.system_content_msg] + self.getHistory(wxid) + [question_]
+            res = self.client.chat(model=self.model, messages=messages, keep_alive=self.keep_alive)
+            rsp = res["message"]["content"]
             # 去除<think>标签对与内部内容
-            # res_message = res_message.split("</think>")[-1]
-            # 去除开头的\n和空格
-            # return res_message[2:]
-            return res_message
+            # rsp = rsp.split("</think>")[-1]
+            self.updateMessage(wxid, question_, {"role": "assistant", "content": rsp})
         except Exception as e0:
-            print(e0)
             self.LOG.error(f"发生未知错误：{str(e0)}")
 
         return rsp
 
-    def updateMessage(self, wxid: str, context: str, role: str) -> None:
-        # 当前问题
-        self.conversation_list[wxid] = context
+    def getHistory(self, wxid: str) -> list:
+        with self._lock:
+            history = self.conversation_list.get(wxid)
+            if history is None:
+                return []
+            self.conversation_list.move_to_end(wxid)
+            return list(history)
+
+    def updateMessage(self, wxid: str, question: dict, answer: dict) -> None:
+        with self._lock:
+            history = self.conversation_list.get(wxid)
+            if history is None:
+                history = deque(maxlen=self.max_history)
+                self.conversation_list[wxid] = history
+                # 会话过多时，淘汰最久未使用的
+                while len(self.conversation_list) > self.max_conversations:
+                    self.conversation_list.popitem(last=False)
+            self.conversation_list.move_to_end(wxid)
+            # 问答成对写入，超出长度时自动滚动清除最早的一轮
+            history.append(question)
+            history.append(answer)
+
 
 if __name__ == "__main__":
     from configuration import Config
@@ -0,0 +1,195 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from base.func_chatglm import ChatGLM
+from base.func_chatgpt import ChatGPT
+from base.func_ollama import Ollama
+from base.func_zhipu import ZhiPu
+
+# 路由支持的模型: 名称 -> 适配器类
+PROVIDERS = {
+    "chatgpt": ChatGPT,
+    "zhipu": ZhiPu,
+    "ollama": Ollama,
+    "chatglm": ChatGLM,
+}
+
+
+class ProviderStats:
+    """单个模型的滚动统计：最近 window 次请求的耗时和成败"""
+
+    def __init__(self, window: int) -> None:
+        self.latencies = deque(maxlen=window)
+        self.results = deque(maxlen=window)
+        self.cooldown_until = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, ok: bool, latency: float) -> None:
+        with self.lock:
+            self.results.append(ok)
+            if ok:
+                self.latencies.append(latency)
+
+    def error_rate(self) -> float:
+        with self.lock:
+            if not self.results:
+                return 0.0
+            return self.results.count(False) / len(self.results)
+
+    def avg_latency(self) -> float:
+        """平均耗时，没有样本时返回 0，保证新模型会先被试用"""
+        with self.lock:
+            if not self.latencies:
+                return 0.0
+            return sum(self.latencies) / len(self.latencies)
+
+
+class ChatRouter:
+    """多模型路由：按滚动耗时和错误率选择最快的健康模型，超时对冲，失败自动切换"""
+
+    def __init__(self, conf: dict, provider_confs: dict) -> None:
+        """
+        :param conf: router 配置
+        :param provider_confs: 各模型的配置，如 {"chatgpt": config.CHATGPT, ...}
+        """
+        self.LOG = logging.getLogger("ChatRouter")
+        self.hedge_after = float(conf.get("hedge_after", 8))
+        self.timeout = float(conf.get("timeout", 60))
+        self.max_error_rate = float(conf.get("max_error_rate", 0.5))
+        self.cooldown = float(conf.get("cooldown", 60))
+        window = int(conf.get("window", 20))
+
+        self.providers = {}
+        self.stats = {}
+        for name in conf.get("providers", []):
+            cls = PROVIDERS.get(name)
+            pconf = provider_confs.get(name)
+            if not cls:
+                self.LOG.warning(f"不支持的路由模型: {name}")
+                continue
+            if not cls.value_check(pconf):
+                self.LOG.warning(f"路由模型 {name} 未配置，跳过")
+                continue
+            try:
+                self.providers[name] = cls(pconf)
+                self.stats[name] = ProviderStats(window)
+            except Exception as e:
+                self.LOG.error(f"路由模型 {name} 初始化失败: {e}")
+
+        self.executor = ThreadPoolExecutor(max_workers=max(len(self.providers) * 4, 1),
+                                           thread_name_prefix="ChatRouter")
+        self.LOG.info(f"路由模型: {list(self.providers)}")
+
+    def __repr__(self):
+        return f"ChatRouter({', '.join(self.providers)})"
+
+    @staticmethod
+    def value_check(conf: dict) -> bool:
+        if conf:
+            if conf.get("providers"):
+                return True
+        return False
+
+    def _is_healthy(self, name: str, now: float) -> bool:
+        stats = self.stats[name]
+        if stats.cooldown_until > now:
+            return False
+        if stats.error_rate() > self.max_error_rate:
+            # 错误率过高，进入冷却期，同时清空统计，冷却结束后重新试用
+            stats.cooldown_until = now + self.cooldown
+            with stats.lock:
+                stats.results.clear()
+            self.LOG.warning(f"模型 {name} 错误率过高，冷却 {self.cooldown}s")
+            return False
+        return True
+
+    def ranked(self) -> list:
+        """按优先级排好的候选模型：健康的按平均耗时升序，不健康的放在最后兜底"""
+        now = time.time()
+        healthy = [n for n in self.providers if self._is_healthy(n, now)]
+        unhealthy = [n for n in self.providers if n not in healthy]
+        healthy.sort(key=lambda n: self.stats[n].avg_latency())
+        return healthy + unhealthy
+
+    def _call(self, name: str, question: str, wxid: str) -> tuple:
+        start = time.time()
+        try:
+            rsp = self.providers[name].get_answer(question, wxid)
+        except Exception as e:
+            self.LOG.error(f"模型 {name} 调用失败: {e}")
+            rsp = ""
+        latency = time.time() - start
+        ok = bool(rsp)
+        self.stats[name].record(ok, latency)
+        self.LOG.info(f"模型 {name} {'成功' if ok else '失败'}，耗时 {latency:.2f}s")
+        return name, rsp
+
+    def get_answer(self, question: str, wxid: str) -> str:
+        # wxid或者roomid,个人时为微信id，群消息时为群id
+        candidates = self.ranked()
+        if not candidates:
+            self.LOG.error("没有可用的路由模型")
+            return ""
+
+        deadline = time.time() + self.timeout
+        pending = {self.executor.submit(self._call, candidates.pop(0), question, wxid)}
+        next_hedge = time.time() + self.hedge_after
+
+        while pending:
+            now = time.time()
+            if now >= deadline:
+                break
+            wait_for = min(deadline, next_hedge) - now if candidates else deadline - now
+            done, pending = wait(pending, timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name, rsp = future.result()
+                if rsp:
+                    return rsp
+                # 失败，立即切换到下一个模型
+                if candidates:
+                    self.LOG.warning(f"模型 {name} 失败，切换到 {candidates[0]}")
+                    pending.add(self.executor.submit(self._call, candidates.pop(0), question, wxid))
+                    next_hedge = time.time() + self.hedge_after
+
+            # 首选模型迟迟不返回，并行请求下一个模型对冲
+            if not done and candidates and time.time() >= next_hedge:
+                self.LOG.warning(f"{self.hedge_after}s 内未返回，对冲请求 {candidates[0]}")
+                pending.add(self.executor.submit(self._call, candidates.pop(0), question, wxid))
+                next_hedge = time.time() + self.hedge_after
+
+        self.LOG.error("所有路由模型均未能在超时时间内返回")
+        return ""
+
+    def status(self) -> str:
+        """各模型的路由统计"""
+        lines = []
+        for name in self.providers:
+            stats = self.stats[name]
+            lines.append(f"{name}: 平均耗时 {stats.avg_latency():.2f}s, 错误率 {stats.error_rate():.0%}")
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from configuration import Config
+    c = Config()
+    router = ChatRouter(c.ROUTER, {"chatgpt": c.CHATGPT, "zhipu": c.ZhiPu, "ollama": c.OLLAMA, "chatglm": c.CHATGLM})
+
+    while True:
+        q = input(">>> ")
+        try:
+            time_start = datetime.now()  # 记录开始时间
+            print(router.get_answer(q, "wxid"))
+            time_end = datetime.now()  # 记录结束时间
+
+            print(f"{round((time_end - time_start).total_seconds(), 2)}s")  # 计算的时间差为程序的执行时间，单位为秒/s
+            print(router.status())
+        except Exception as e:
+            print(e)
@@ -3,9 +3,10 @@
 
 import logging
 
-import requests
 from random import randint
 
+from base.http_client import get_session
+
 
 class TigerBot:
     def __init__(self, tbconf=None) -> None:
@@ -31,7 +32,7 @@ class TigerBot:
         }
         rsp = ""
         try:
-            rsp = requests.post(self.tburl, headers=self.tbheaders, json=payload).json()
+            rsp = get_session().post(self.tburl, headers=self.tbheaders, json=payload).json()
             rsp = rsp["data"]["result"][0]
         except Exception as e:
             self.LOG.error(f"{e}: {payload}\n{rsp}")
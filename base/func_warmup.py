@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class Warmup:
+    """启动预热：在后台创建模型、预加载并发送探测请求，与微信握手、获取联系人并行进行"""
+
+    def __init__(self, factory: Callable[[], Any], timeout: float = 60) -> None:
+        """
+        :param factory: 创建模型对象的方法
+        :param timeout: 等待预热完成的最长秒数，超时后不再等待，预热在后台继续（创建模型本身仍会等待完成）
+        """
+        self.LOG = logging.getLogger("Warmup")
+        self.factory = factory
+        self.timeout = timeout
+        self.chat = None
+        self.timings = {}  # 后端名称 -> (是否就绪, 耗时秒数)
+        self._created = threading.Event()
+        self._ready = threading.Event()
+        self._start = 0.0
+
+    def start(self) -> "Warmup":
+        self._start = time.time()
+        threading.Thread(target=self._run, name="Warmup", daemon=True).start()
+        return self
+
+    def _run(self) -> None:
+        try:
+            self.chat = self.factory()
+            self.timings["创建模型"] = (self.chat is not None, time.time() - self._start)
+        except Exception as e:
+            self.LOG.error(f"创建模型失败: {e}")
+            self.timings["创建模型"] = (False, time.time() - self._start)
+        finally:
+            self._created.set()
+
+        if self.chat is None:
+            self._ready.set()
+            return
+
+        # 多模型路由时逐个预热各后端
+        providers = getattr(self.chat, "providers", None)
+        backends = dict(providers) if providers else {repr(self.chat): self.chat}
+        with ThreadPoolExecutor(max_workers=len(backends), thread_name_prefix="Warmup") as executor:
+            for name, future in [(n, executor.submit(self._warm, n, b)) for n, b in backends.items()]:
+                self.timings[name] = future.result()
+        self._ready.set()
+        self.LOG.info(self.report())
+
+    def _warm(self, name: str, backend: Any) -> tuple:
+        start = time.time()
+        warmup = getattr(backend, "warmup", None)
+        if not warmup:
+            return None, 0.0  # 该模型不支持预热
+        try:
+            ok = bool(warmup())
+        except Exception as e:
+            self.LOG.warning(f"{name} 预热出错: {e}")
+            ok = False
+        return ok, time.time() - start
+
+    def wait(self) -> Any:
+        """等待预热完成，返回创建好的模型对象
+        只限制预热的等待时间，模型对象一定等到创建结束，避免创建较慢时机器人永远拿不到模型
+        """
+        if not self._ready.wait(self.timeout):
+            self.LOG.warning(f"模型预热超过 {self.timeout}s，继续在后台进行")
+            self._created.wait()
+        return self.chat
+
+    def report(self) -> str:
+        """预热结果：各后端是否就绪及冷启动耗时"""
+        lines = [f"模型预热{'完成' if self._ready.is_set() else '未完成'}:"]
+        # 预热线程可能仍在写入 timings，遍历其副本
+        for name, (ok, elapsed) in list(self.timings.items()):
+            state = "跳过" if ok is None else ("就绪" if ok else "失败")
+            lines.append(f"{name}: {state} {elapsed:.2f}s")
+        return "\n".join(lines)
@@ -1,6 +1,7 @@
-import requests, json
 import logging
 
+from base.http_client import get_session
+
 class Weather:
     def __init__(self, city_code: str) -> None:
         self.city_code = city_code
@@ -13,7 +14,7 @@ class Weather:
         # 网络请求，传入请求api+城市代码
         self.LOG.info(f"获取天气: {url + str(self.city_code)}")
         try:
-            response = requests.get(url + str(self.city_code))
+            response = get_session().get(url + str(self.city_code))
             self.LOG.info(f"获取天气成功: {str(response.text)}")
         except Exception as e:
             self.LOG.error(f"获取天气失败: {str(e)}")
@@ -1,12 +1,24 @@
+import logging
+
 from zhipuai import ZhipuAI
 
+from base.http_client import get_httpx_client, record_usage
+
 
 class ZhiPu():
     def __init__(self, conf: dict) -> None:
+        self.LOG = logging.getLogger("ZhiPu")
         self.api_key = conf.get("api_key")
         self.model = conf.get("model", "glm-4")  # 默认使用 glm-4 模型
-        self.client = ZhipuAI(api_key=self.api_key)
+        self.client = ZhipuAI(api_key=self.api_key, http_client=get_httpx_client())
         self.converstion_list = {}
+        # 系统提示词只构建一次，固定放在消息最前面，便于服务端前缀缓存
+        prompt = conf.get("prompt")
+        self.system_content_msg = {"role": "system", "content": prompt} if prompt else None
+        self.max_history = int(conf.get("max_history", 10))
+        # 最近一次请求的 token 用量，以及累计命中前缀缓存节省的 token 数
+        self.last_usage = {}
+        self.cached_tokens_total = 0
 
     @staticmethod
     def value_check(conf: dict) -> bool:
@@ -17,6 +29,19 @@ class ZhiPu():
     def __repr__(self):
         return 'ZhiPu'
 
+    def warmup(self) -> bool:
+        """预热：建立连接并发送一个极小的探测请求"""
+        try:
+            self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": "hi"}],
+                max_tokens=1
+            )
+            return True
+        except Exception as e:
+            self.LOG.warning(f"预热失败：{str(e)}")
+            return False
+
     def get_answer(self, msg: str, wxid: str, **args) -> str:
         self._update_message(wxid, str(msg), "user")
         response = self.client.chat.completions.create(
@@ -25,15 +50,22 @@ class ZhiPu():
         )
         resp_msg = response.choices[0].message
         answer = resp_msg.content
+        record_usage(self, getattr(response, "usage", None))
         self._update_message(wxid, answer, "assistant")
         return answer
 
     def _update_message(self, wxid: str, msg: str, role: str) -> None:
         if wxid not in self.converstion_list.keys():
-            self.converstion_list[wxid] = []
+            self.converstion_list[wxid] = [self.system_content_msg] if self.system_content_msg else []
         content = {"role": role, "content": str(msg)}
         self.converstion_list[wxid].append(content)
 
+        # 只保留最近的记录，超过滚动清除，跳过开头的系统提示词
+        history = self.converstion_list[wxid]
+        first = 1 if self.system_content_msg else 0
+        while len(history) - first > self.max_history:
+            del history[first]
+
 
 if __name__ == "__main__":
     from configuration import Config
@@ -0,0 +1,126 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""进程内共享的 HTTP 客户端
+
+所有模型适配器、天气、新闻、策略接口都从这里取客户端，复用连接池和 keep-alive，
+统一连接/读取超时。httpx 客户端按代理区分，requests 会话全局一个。
+"""
+
+import logging
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+LOG = logging.getLogger("HttpClient")
+
+_settings = {
+    "connect_timeout": 5.0,  # 建立连接超时（秒）
+    "read_timeout": 60.0,  # 读取超时（秒），大模型回复较慢，不宜过短
+    "max_connections": 20,  # 每个客户端最大连接数
+    "max_keepalive": 10,  # 每个客户端保持的空闲长连接数
+    "keepalive_expiry": 60.0,  # 空闲长连接保持秒数
+    "http2": True,  # 服务端支持时使用 HTTP/2
+}
+_lock = threading.Lock()
+_httpx_clients = {}
+_session = None
+
+
+def configure(conf: dict) -> None:
+    """更新连接池配置，只影响之后新建的客户端
+    :param conf: config.yaml 中的 http 配置
+    """
+    if not conf:
+        return
+    with _lock:
+        for key in _settings:
+            if conf.get(key) is not None:
+                _settings[key] = type(_settings[key])(conf[key])
+
+
+def timeout() -> tuple:
+    """requests 使用的 (连接超时, 读取超时)"""
+    return _settings["connect_timeout"], _settings["read_timeout"]
+
+
+def get_httpx_client(proxy: str = None) -> httpx.Client:
+    """获取共享的 httpx 客户端，供 OpenAI 兼容的 SDK 使用
+    :param proxy: 代理地址，不同代理使用不同的客户端
+    """
+    key = proxy or ""
+    client = _httpx_clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        if key not in _httpx_clients:
+            _httpx_clients[key] = httpx.Client(
+                proxy=proxy or None,
+                http2=_settings["http2"] and HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(_settings["read_timeout"], connect=_settings["connect_timeout"]),
+                limits=httpx.Limits(max_connections=_settings["max_connections"],
+                                    max_keepalive_connections=_settings["max_keepalive"],
+                                    keepalive_expiry=_settings["keepalive_expiry"]),
+            )
+            LOG.info(f"创建共享 httpx 客户端: proxy={proxy or '无'}, http2={_settings['http2'] and HTTP2_AVAILABLE}")
+        return _httpx_clients[key]
+
+
+class _TimeoutSession(requests.Session):
+    """未指定 timeout 时使用统一的默认超时"""
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", timeout())
+        return super().request(method, url, **kwargs)
+
+
+def get_session() -> requests.Session:
+    """获取共享的 requests 会话，按主机复用长连接"""
+    global _session
+    if _session is not None:
+        return _session
+
+    with _lock:
+        if _session is None:
+            session = _TimeoutSession()
+            adapter = HTTPAdapter(pool_connections=_settings["max_connections"],
+                                  pool_maxsize=_settings["max_connections"])
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def record_usage(model, usage) -> None:
+    """记录 OpenAI 兼容接口返回的 token 用量到模型的 last_usage，并累加 cached_tokens_total
+    cached_tokens 为命中前缀缓存、无需重新计算的提示词 token，接口未返回用量时不更新
+    :param model: 模型适配器，需有 last_usage 和 cached_tokens_total 属性
+    :param usage: 响应中的 usage 对象
+    """
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    model.last_usage = {"prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0, "cached_tokens": cached}
+    model.cached_tokens_total += cached
+
+
+def close_all() -> None:
+    """关闭所有共享客户端，进程退出前调用"""
+    global _session
+    with _lock:
+        for client in _httpx_clients.values():
+            client.close()
+        _httpx_clients.clear()
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,126 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""策略提取基准测试
+
+对比 StrategyManager 原有的 extract_* 方法与单次扫描的 StrategyExtractor：
+吞吐量和逐字段一致率。语料取自 training/*.jsonl 和 test_data/messages.txt。
+
+用法: python -m benchmark.bench_strategy_extractor [-n 轮数]
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from plugin.strategy_extractor import StrategyExtractor  # noqa: E402
+from plugin.strategy_manager import StrategyManager  # noqa: E402
+
+FIELDS = ["stock_name", "stock_code", "action", "price_min", "price_max",
+          "position_ratio", "take_profit_price", "stop_loss_price", "reason"]
+
+
+def load_corpus() -> list:
+    """训练数据中的用户消息和助手回复，以及测试消息"""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "training", "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages = json.loads(line).get("messages", [])
+                except json.JSONDecodeError:
+                    continue
+                corpus.extend(m["content"] for m in messages if m.get("role") in ("user", "assistant"))
+
+    path = os.path.join(ROOT, "test_data", "messages.txt")
+    if os.path.exists(path):
+        block = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("====="):
+                    if "".join(block).strip():
+                        corpus.append("".join(block).strip())
+                    block = []
+                else:
+                    block.append(line)
+        if "".join(block).strip():
+            corpus.append("".join(block).strip())
+    return corpus
+
+
+def legacy_extract(manager: StrategyManager, text: str) -> dict:
+    """原有提取方法的组合结果"""
+    stock_name, stock_code, action = manager.extract_stock_info(text)
+    price_min, price_max = manager.extract_price_info(text)
+    stop_loss, take_profit = manager.extract_stop_prices(text)
+    return {
+        "stock_name": stock_name,
+        "stock_code": stock_code,
+        "action": action,
+        "price_min": price_min,
+        "price_max": price_max,
+        "position_ratio": manager.extract_position_ratio(text),
+        "take_profit_price": take_profit,
+        "stop_loss_price": stop_loss,
+        "reason": manager.extract_reason(text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="策略提取基准测试")
+    parser.add_argument("-n", "--rounds", type=int, default=20, help="重复轮数")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    if not corpus:
+        print("没有找到语料")
+        return
+    # 只用提取方法，不需要连接策略接口
+    manager = StrategyManager.__new__(StrategyManager)
+    extractor = StrategyExtractor()
+    total_chars = sum(len(t) for t in corpus)
+    print(f"语料: {len(corpus)} 条, {total_chars} 字符, {args.rounds} 轮")
+
+    # 原有方法会打印日志，计时时丢弃输出
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            legacy = [legacy_extract(manager, t) for t in corpus]
+        legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        fast = [extractor.extract(t) for t in corpus]
+    fast_time = time.perf_counter() - start
+
+    n = len(corpus) * args.rounds
+    print(f"{'方法':<12}{'耗时(s)':>10}{'条/秒':>12}{'MB/秒':>10}")
+    for name, elapsed in (("extract_*", legacy_time), ("extractor", fast_time)):
+        print(f"{name:<12}{elapsed:>10.3f}{n / elapsed:>12.0f}{total_chars * args.rounds / elapsed / 1e6:>10.2f}")
+    print(f"加速比: {legacy_time / fast_time:.2f}x")
+
+    print("\n逐字段一致率:")
+    mismatches = []
+    for field in FIELDS:
+        same = sum(1 for a, b in zip(legacy, fast) if a[field] == b[field])
+        print(f"  {field:<18}{same}/{len(corpus)}  {same / len(corpus):.2%}")
+        mismatches.extend((i, field) for i, (a, b) in enumerate(zip(legacy, fast)) if a[field] != b[field])
+
+    for i, field in mismatches[:10]:
+        print(f"\n不一致: #{i} {field}\n  原有: {legacy[i][field]!r}\n  新版: {fast[i][field]!r}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""策略模型基准测试
+
+对比原有的 Strategy（普通类、逐个 from_dict、立即解析时间）与带 __slots__、
+延迟解析时间的 Strategy 在列表接口场景下的解码耗时和内存占用。
+
+用法: python -m benchmark.bench_strategy_model [-n 条数]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from plugin.strategy_manager import JSON_BACKEND, Strategy, loads  # noqa: E402
+
+
+class LegacyStrategy:
+    """原有的策略模型，用于对比"""
+
+    def __init__(self, stock_name, stock_code, action, price_min=None, price_max=None, position_ratio=None,
+                 take_profit_price=None, stop_loss_price=None, reason=None):
+        self.id = None
+        self.stock_name = stock_name
+        self.stock_code = stock_code
+        self.action = action
+        self.price_min = price_min
+        self.price_max = price_max
+        self.position_ratio = position_ratio
+        self.take_profit_price = take_profit_price
+        self.stop_loss_price = stop_loss_price
+        self.reason = reason
+        self.created_at = datetime.now()
+        self.is_active = True
+        self.execution_status = "pending"
+
+    @classmethod
+    def from_dict(cls, data):
+        strategy = cls(
+            stock_name=data["stock_name"],
+            stock_code=data["stock_code"],
+            action=data["action"],
+            price_min=data.get("price_min"),
+            price_max=data.get("price_max"),
+            position_ratio=data.get("position_ratio"),
+            take_profit_price=data.get("take_profit_price"),
+            stop_loss_price=data.get("stop_loss_price"),
+            reason=data.get("reason")
+        )
+        strategy.id = data.get("id")
+        strategy.created_at = datetime.fromisoformat(data["created_at"])
+        strategy.is_active = data.get("is_active", True)
+        strategy.execution_status = data.get("execution_status", "pending")
+        return strategy
+
+
+def make_payload(n: int) -> bytes:
+    """模拟列表接口的响应体"""
+    now = datetime.now()
+    records = [{
+        "id": i,
+        "stock_name": f"股票{i % 5000}",
+        "stock_code": f"{600000 + i % 5000:06d}",
+        "action": ("buy", "sell", "add", "reduce")[i % 4],
+        "price_min": 10.0 + i % 100,
+        "price_max": 10.5 + i % 100,
+        "position_ratio": 0.1,
+        "take_profit_price": 12.0 + i % 100,
+        "stop_loss_price": 9.5 + i % 100,
+        "reason": "电气设备；充电桩；华为概念",
+        "created_at": (now - timedelta(minutes=i)).isoformat(),
+        "is_active": True,
+        "execution_status": "pending",
+    } for i in range(n)]
+    return json.dumps({"code": 200, "data": records}, ensure_ascii=False).encode("utf-8")
+
+
+def measure(name: str, decode):
+    gc.collect()
+    start = time.perf_counter()
+    objects = decode()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    objects = decode()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name:<28}{elapsed:>10.3f}{len(objects) / elapsed:>14.0f}{memory / 1024 / 1024:>12.1f}")
+    return objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description="策略模型基准测试")
+    parser.add_argument("-n", "--count", type=int, default=100_000, help="策略条数")
+    args = parser.parse_args()
+
+    payload = make_payload(args.count)
+    print(f"策略: {args.count} 条, 响应体 {len(payload) / 1024 / 1024:.1f}MB, JSON 解析: {JSON_BACKEND}")
+    print(f"{'方法':<24}{'耗时(s)':>10}{'条/秒':>14}{'内存(MB)':>12}")
+
+    legacy = measure("原有模型 json + from_dict",
+                     lambda: [LegacyStrategy.from_dict(d) for d in json.loads(payload)["data"]])
+    compact = measure(f"slots + {JSON_BACKEND} + from_list",
+                      lambda: Strategy.from_list(loads(payload)["data"]))
+
+    # 只有清理过期策略等需要时间的场景才解析
+    expire_time = datetime.now() - timedelta(days=7)
+    start = time.perf_counter()
+    expired = sum(1 for s in compact if s.created_at < expire_time)
+    print(f"首次访问 created_at: {time.perf_counter() - start:.3f}s, 过期 {expired} 条")
+
+    start = time.perf_counter()
+    for s in compact:
+        s.to_dict()
+    print(f"to_dict: {time.perf_counter() - start:.3f}s")
+
+    assert [s.to_dict() for s in compact[:100]] == [
+        {**{k: getattr(s, k) for k in ("stock_name", "stock_code", "action", "price_min", "price_max",
+                                       "position_ratio", "take_profit_price", "stop_loss_price", "reason",
+                                       "is_active", "id")},
+         "created_at": s.created_at.isoformat()} for s in legacy[:100]]
+
+
+if __name__ == "__main__":
+    main()
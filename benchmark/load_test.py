@@ -0,0 +1,498 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""端到端压测
+
+不启动界面，用 mock_wcf.py 中的 MockWcf、MockWxMsg 按设定速率构造消息，经有界队列交给
+Robot.processMsg 处理（与 enableReceivingMsg 的接收线程相同），大模型、百度OCR、策略服务（QMT）
+均由本地模拟服务代替，延迟可配置。
+
+消息来源：test_data/messages.txt 中的真实策略、test_data/images 中的图片，以及随机生成的策略和闲聊。
+每条消息按扇出数发到多个群（同一条策略被转发到多个群的情况）。
+结束后输出吞吐量、端到端延迟（含排队）和处理耗时的 p50/p95/p99，以及队列满被丢弃的消息数。
+
+用法: python -m benchmark.load_test [--rate 5] [--duration 60] [--groups 10] [--fanout 3]
+                                    [--llm-latency 1.5] [--ocr-latency 0.5] [--api-latency 0.05] [--json 结果.json]
+"""
+
+import argparse
+import base64
+import contextlib
+import glob
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mock_wcf import MockWcf, MockWxMsg  # noqa: E402
+from plugin.relevance_classifier import IRRELEVANT_ANSWER  # noqa: E402
+from plugin.strategy_extractor import extractor  # noqa: E402
+
+SEPARATOR = re.compile(r"\n=+\n")
+
+# 随机策略使用的股票
+STOCKS = [("日丰股份", "002953"), ("掌趣科技", "300315"), ("贵州茅台", "600519"), ("中国平安", "601318"),
+          ("宁德时代", "300750"), ("比亚迪", "002594"), ("招商银行", "600036"), ("中芯国际", "688981")]
+
+# 不含策略信号的群聊，应被前置过滤拦下
+CHATTER = ["收到", "今天大盘怎么样", "哈哈哈", "老师辛苦了", "明天见", "这个位置还能上车吗", "谢谢分享", "早上好"]
+
+Route = Tuple[str, "re.Pattern", Callable[[re.Match, bytes], Tuple[int, object]]]
+
+
+class StubServer:
+    """本地模拟服务：按方法和路径分发，每个请求等待设定的延迟后返回 JSON"""
+
+    def __init__(self, name: str, routes: List[Route], latency: float, jitter: float) -> None:
+        self.name = name
+        self.routes = routes
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        threading.Thread(target=self.server.serve_forever, name=f"Stub-{self.name}", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handle(self, method: str, path: str, body: bytes) -> Tuple[int, object]:
+        with self._lock:
+            self.calls += 1
+        if self.latency > 0:
+            time.sleep(max(self.latency * random.uniform(1 - self.jitter, 1 + self.jitter), 0))
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if route_method == method and match:
+                return handler(match, body)
+        return 404, {"code": 404, "message": f"未模拟的接口: {method} {path}"}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload = stub._handle(self.command, self.path.split("?")[0], body)
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        return Handler
+
+
+def strategy_markdown(data: dict) -> str:
+    """模拟大模型按提示词整理出的策略文本"""
+    action = {"buy": "买入", "sell": "卖出"}.get(data.get("action"), "买入")
+    lines = ["### 股票名称", f"{data['stock_name']}（{data['stock_code']}）", "", "### 操作建议",
+             "1. **执行策略**", f"    - **操作要求**：{action}"]
+    if data.get("price_min") is not None and data.get("price_max") is not None:
+        lines.append(f"    - **交易价格**：{data['price_min']:g}-{data['price_max']:g}元")
+    if data.get("stop_loss_price") is not None:
+        lines += ["", "2. **止损策略**", f"    - **止损价格**：{data['stop_loss_price']:g}元下方"]
+    if data.get("take_profit_price") is not None:
+        lines += ["", "3. **止盈策略**", f"    - **止盈价格**：{data['take_profit_price']:g}元上方"]
+    return "\n".join(lines)
+
+
+def llm_server(latency: float, jitter: float) -> StubServer:
+    """OpenAI 兼容的 /v1/chat/completions，能提取到股票时返回整理后的策略，否则返回“无相关信息”"""
+    seen_prefixes = set()
+    prefix_lock = threading.Lock()
+
+    def completions(match, body):
+        request = json.loads(body)
+        messages = request.get("messages", [])
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        data = extractor.extract(question.replace("**", ""))
+        answer = strategy_markdown(data) if data.get("stock_name") and data.get("stock_code") else IRRELEVANT_ANSWER
+
+        # 按字符数粗略估算 token，系统消息相同视为命中前缀缓存
+        system = "".join(m["content"] for m in messages if m["role"] == "system")
+        prompt_tokens = sum(len(m["content"]) for m in messages)
+        key = hashlib.md5(system.encode("utf-8")).hexdigest()
+        with prefix_lock:
+            cached = len(system) if key in seen_prefixes else 0
+            seen_prefixes.add(key)
+        return 200, {
+            "id": f"chatcmpl-stub-{random.getrandbits(32):08x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(answer),
+                      "total_tokens": prompt_tokens + len(answer), "prompt_tokens_details": {"cached_tokens": cached}},
+        }
+
+    return StubServer("LLM", [("POST", re.compile(r"^/v1/chat/completions$"), completions)], latency, jitter)
+
+
+def ocr_server(latency: float, jitter: float, corpus: List[str]) -> StubServer:
+    """百度OCR的授权和高精度识别接口，同一张图片总是返回同一条语料"""
+    def token(match, body):
+        return 200, {"access_token": "stub-token", "expires_in": 2592000}
+
+    def accurate_basic(match, body):
+        image = parse_qs(body.decode("utf-8")).get("image", [""])[0]
+        index = int(hashlib.md5(base64.b64decode(image or "")).hexdigest(), 16) % len(corpus)
+        lines = [line for line in corpus[index].splitlines() if line.strip()]
+        return 200, {"log_id": random.getrandbits(48), "words_result_num": len(lines),
+                     "words_result": [{"words": line} for line in lines]}
+
+    return StubServer("OCR", [("POST", re.compile(r"^/oauth/2\.0/token$"), token),
+                              ("POST", re.compile(r"^/rest/2\.0/ocr/v1/accurate_basic$"), accurate_basic)],
+                      latency, jitter)
+
+
+def qmt_server(latency: float, jitter: float) -> StubServer:
+    """策略服务 /api/v1 的分析、查重、增改和停用接口，策略保存在内存中"""
+    strategies: Dict[int, dict] = {}
+    lock = threading.Lock()
+
+    def ok(data):
+        return 200, {"code": 200, "message": "success", "data": data}
+
+    def analyze(match, body):
+        data = extractor.extract(json.loads(body).get("strategy_text", "").replace("**", ""))
+        if not (data.get("stock_name") and data.get("stock_code")):
+            return 200, {"code": 400, "message": "未识别到股票", "data": None}
+        return ok({**data, "action": data.get("action") or "buy", "position_ratio": data.get("position_ratio") or 0.1})
+
+    def listing(match, body):
+        with lock:
+            return ok([s for s in strategies.values() if s["is_active"]])
+
+    def check(match, body):
+        params = json.loads(body)
+        with lock:
+            for s in strategies.values():
+                if s["is_active"] and (s["stock_code"], s["action"]) == (params.get("stock_code"), params.get("action")):
+                    return ok(s)
+        return ok(None)
+
+    def create(match, body):
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        with lock:
+            strategy = {**json.loads(body), "id": len(strategies) + 1, "is_active": True,
+                        "created_at": now, "updated_at": now}
+            strategies[strategy["id"]] = strategy
+        return ok(strategy)
+
+    def update(match, body):
+        with lock:
+            strategy = strategies.get(int(match.group(1)))
+            if strategy is None:
+                return 200, {"code": 404, "message": "策略不存在", "data": None}
+            strategy.update(json.loads(body or b"{}"), updated_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+            return ok(strategy)
+
+    def get(match, body):
+        with lock:
+            return ok(strategies.get(int(match.group(1))))
+
+    def deactivate(match, body):
+        with lock:
+            strategy = strategies.get(int(match.group(1)))
+            if strategy:
+                strategy["is_active"] = False
+        return ok(strategy)
+
+    return StubServer("QMT", [
+        ("POST", re.compile(r"^/api/v1/analyze_strategy$"), analyze),
+        ("GET", re.compile(r"^/api/v1/strategies$"), listing),
+        ("POST", re.compile(r"^/api/v1/strategies/check$"), check),
+        ("POST", re.compile(r"^/api/v1/strategies$"), create),
+        ("PUT", re.compile(r"^/api/v1/strategies/(\d+)$"), update),
+        ("GET", re.compile(r"^/api/v1/strategies/(\d+)$"), get),
+        ("POST", re.compile(r"^/api/v1/strategies/(\d+)/deactivate$"), deactivate),
+    ], latency, jitter)
+
+
+def load_corpus() -> List[str]:
+    """test_data/messages.txt 中以分隔线隔开的策略消息"""
+    path = os.path.join(ROOT, "test_data", "messages.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [m.strip() for m in SEPARATOR.split(f.read()) if m.strip()]
+
+
+def synthetic_strategy(rng: random.Random) -> str:
+    name, code = rng.choice(STOCKS)
+    low = round(rng.uniform(5, 100), 1)
+    high = round(low * 1.02, 1)
+    return (f"操作建议：{name} {code}\n交易价格：{low}-{high}元\n建议数量：{rng.choice([5, 10, 20])}%仓位\n"
+            f"止损价格：{round(low * 0.92, 1)}元下方\n止盈价格：{round(high * 1.15, 1)}元上方")
+
+
+class LoadTest:
+    """按到达速率投递消息，由工作线程调用 processMsg，记录每条消息的耗时"""
+
+    def __init__(self, robot, args, corpus: List[str], images: List[str]) -> None:
+        self.robot = robot
+        self.args = args
+        self.corpus = corpus
+        self.images = images
+        self.rng = random.Random(args.seed)
+        self.groups = [f"{i:010d}@chatroom" for i in range(args.groups)]
+        self.queue: "queue.Queue[Optional[Tuple[str, float, object]]]" = queue.Queue(maxsize=args.queue_size)
+        self.results: List[Tuple[str, float, float, float]] = []  # (类型, 到达, 开始处理, 处理完成)
+        self.errors = 0
+        self.dropped = 0
+        self.sent = 0
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def _next_traffic(self) -> Tuple[str, str]:
+        """下一条消息的 (类型, 内容)，图片的内容为图片路径"""
+        r = self.rng.random()
+        if self.images and r < self.args.image_ratio:
+            return "image", self.rng.choice(self.images)
+        r -= self.args.image_ratio
+        if r < self.args.synthetic_ratio:
+            return "synthetic", synthetic_strategy(self.rng)
+        r -= self.args.synthetic_ratio
+        if r < self.args.chatter_ratio or not self.corpus:
+            return "chatter", self.rng.choice(CHATTER)
+        return "corpus", self.rng.choice(self.corpus)
+
+    def _messages(self, kind: str, content: str) -> List[object]:
+        """按扇出构造消息，私聊只发一条"""
+        private = self.rng.random() < self.args.private_ratio
+        rooms = [""] if private else self.rng.sample(self.groups, min(self.args.fanout, len(self.groups)))
+        messages = []
+        for room in rooms:
+            self._seq += 1
+            sender = f"wxid_load{self.rng.randrange(self.args.senders):04d}"
+            if kind == "image":
+                msg = MockWxMsg(content=content, sender=sender, roomid=room, msg_type=0x03)
+                # 带 mock 标记的图片消息直接以 content 作为图片路径，不经过下载
+                msg.id = f"mock-{self._seq}"
+            else:
+                text = content if not room else f"@{self.robot.wxid} {content}"
+                msg = MockWxMsg(content=text, sender=sender, roomid=room)
+                msg.id = self._seq
+            messages.append(msg)
+        return messages
+
+    def _worker(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            kind, arrived, msg = item
+            started = time.perf_counter()
+            try:
+                self.robot.processMsg(msg)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                if self.args.verbose:
+                    print(f"[压测] 处理出错: {str(e)}", file=sys.stderr)
+            finished = time.perf_counter()
+            with self._lock:
+                self.results.append((kind, arrived, started, finished))
+
+    def run(self) -> dict:
+        workers = [threading.Thread(target=self._worker, name=f"LoadWorker-{i}", daemon=True)
+                   for i in range(self.args.workers)]
+        for worker in workers:
+            worker.start()
+
+        total = int(self.args.rate * self.args.duration)
+        start = time.perf_counter()
+        for i in range(total):
+            # 开环投递：按计划时间到达，不等待处理完成
+            delay = start + i / self.args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            kind, content = self._next_traffic()
+            for msg in self._messages(kind, content):
+                self.sent += 1
+                try:
+                    self.queue.put_nowait((kind, time.perf_counter(), msg))
+                except queue.Full:
+                    self.dropped += 1
+        generated = time.perf_counter()
+
+        # 等待队列中剩余的消息处理完，超时后未处理的计为未完成
+        deadline = generated + self.args.drain
+        while time.perf_counter() < deadline:
+            with self._lock:
+                if len(self.results) >= self.sent - self.dropped:
+                    break
+            time.sleep(0.05)
+        unfinished = self.sent - self.dropped - len(self.results)
+        for _ in workers:
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                break
+        elapsed = max(r[3] for r in self.results) - start if self.results else time.perf_counter() - start
+        return self.report(elapsed, generated - start, unfinished)
+
+    def report(self, elapsed: float, generation: float, unfinished: int) -> dict:
+        def percentiles(values: List[float]) -> dict:
+            if not values:
+                return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+            values = sorted(values)
+
+            def pct(p: float) -> float:
+                return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 1)
+
+            return {"p50": pct(0.5), "p95": pct(0.95), "p99": pct(0.99), "max": round(values[-1] * 1000, 1)}
+
+        by_kind = {}
+        for kind in sorted({r[0] for r in self.results}):
+            rows = [r for r in self.results if r[0] == kind]
+            by_kind[kind] = {"count": len(rows), "latency_ms": percentiles([r[3] - r[1] for r in rows]),
+                             "service_ms": percentiles([r[3] - r[2] for r in rows])}
+        return {
+            "sent": self.sent,
+            "completed": len(self.results),
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "unfinished": unfinished,
+            "offered_rate": round(self.sent / generation, 2) if generation else 0.0,
+            "throughput": round(len(self.results) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": percentiles([r[3] - r[1] for r in self.results]),
+            "service_ms": percentiles([r[3] - r[2] for r in self.results]),
+            "by_kind": by_kind,
+        }
+
+
+def build_robot(args, llm: StubServer, qmt: StubServer):
+    """使用模拟服务地址创建策略机器人，日志等文件写在工作目录下"""
+    from configuration import Config
+    from constants import ChatType
+    from plugin.baidu_ocr import BaiduOCR
+    from robot_b import Robot
+
+    config = Config()
+    config.GROUPS = [f"{i:010d}@chatroom" for i in range(args.groups)]
+    config.API = {"base_url": f"{qmt.url}/api/v1"}
+    config.CHATGPT = {"key": "stub-key", "api": f"{llm.url}/v1", "model": "stub-model", "proxy": None,
+                      "prompt": "由机器人替换为策略提示词"}
+    config.SEND_RATE_LIMIT = 0
+    config.PRICE_MONITOR = {"enable": False}
+    # 发件箱默认关闭，压测默认启用，与生产环境开启发件箱时的写入路径一致
+    config.OUTBOX = {"enable": not args.no_outbox}
+    BaiduOCR.base_url = args.ocr_url
+    return Robot(config, MockWcf(), ChatType.CHATGPT.value)
+
+
+def print_report(result: dict, stubs: List[StubServer], robot) -> None:
+    print(f"投递 {result['sent']} 条（{result['offered_rate']} 条/秒），完成 {result['completed']}，"
+          f"丢弃 {result['dropped']}，出错 {result['errors']}，未完成 {result['unfinished']}")
+    print(f"吞吐量: {result['throughput']} 条/秒")
+    print(f"\n{'类型':<12}{'条数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}"
+          f"{'处理p50':>10}{'处理p99':>10}")
+    rows = list(result["by_kind"].items()) + [("合计", {"count": result["completed"], "latency_ms": result["latency_ms"],
+                                                       "service_ms": result["service_ms"]})]
+    for kind, s in rows:
+        latency, service = s["latency_ms"], s["service_ms"]
+        print(f"{kind:<14}{s['count']:>8}{latency['p50']:>10.1f}{latency['p95']:>10.1f}{latency['p99']:>10.1f}"
+              f"{latency['max']:>10.1f}{service['p50']:>10.1f}{service['p99']:>10.1f}")
+    print("\n模拟服务调用: " + "，".join(f"{stub.name} {stub.calls} 次" for stub in stubs))
+    stats = robot.robot_logger.stats()
+    print(f"日志: 已写入 {stats['written']}，排队 {stats['queued']}，丢弃 {stats['dropped']}")
+    if robot.strategy_manager.outbox is not None:
+        print(f"策略发件箱: 待同步 {robot.strategy_manager.outbox.pending()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端压测")
+    parser.add_argument("--rate", type=float, default=5, help="每秒到达的消息数（扇出前）")
+    parser.add_argument("--duration", type=float, default=60, help="投递时长秒数")
+    parser.add_argument("--groups", type=int, default=10, help="群数量")
+    parser.add_argument("--fanout", type=int, default=3, help="每条群消息同时出现在几个群")
+    parser.add_argument("--senders", type=int, default=200, help="发送者数量")
+    parser.add_argument("--private-ratio", type=float, default=0.1, help="私聊消息比例")
+    parser.add_argument("--image-ratio", type=float, default=0.2, help="图片消息比例")
+    parser.add_argument("--synthetic-ratio", type=float, default=0.3, help="随机生成的策略比例")
+    parser.add_argument("--chatter-ratio", type=float, default=0.2, help="无关闲聊比例，其余为真实策略语料")
+    parser.add_argument("--workers", type=int, default=1, help="处理线程数，与生产环境的接收线程一致时为 1")
+    parser.add_argument("--queue-size", type=int, default=1000, help="接收队列长度，满时丢弃")
+    parser.add_argument("--drain", type=float, default=60, help="投递结束后等待处理完的最长秒数")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="大模型延迟秒数")
+    parser.add_argument("--ocr-latency", type=float, default=0.5, help="OCR延迟秒数")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="策略服务延迟秒数")
+    parser.add_argument("--jitter", type=float, default=0.3, help="延迟的随机波动比例")
+    parser.add_argument("--no-outbox", action="store_true", help="不使用策略发件箱，同步调用策略服务")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    parser.add_argument("--workdir", help="日志等文件的工作目录，默认新建临时目录")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="显示机器人的日志输出")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    images = sorted(glob.glob(os.path.join(ROOT, "test_data", "images", "*")))
+    if not corpus:
+        print("没有找到 test_data/messages.txt，图片识别结果将使用随机策略")
+    llm = llm_server(args.llm_latency, args.jitter).start()
+    ocr = ocr_server(args.ocr_latency, args.jitter, corpus or [synthetic_strategy(random.Random(i)) for i in range(20)])
+    ocr.start()
+    qmt = qmt_server(args.api_latency, args.jitter).start()
+    args.ocr_url = ocr.url
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix="load_test_"))
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    print(f"工作目录: {workdir}")
+    print(f"模拟服务: LLM {llm.url}  OCR {ocr.url}  QMT {qmt.url}")
+
+    out = sys.stdout if args.verbose else open(os.devnull, "w", encoding="utf-8")
+    with contextlib.redirect_stdout(out):
+        robot = build_robot(args, llm, qmt)
+        if not args.verbose:
+            logging.disable(logging.WARNING)
+        test = LoadTest(robot, args, corpus, images)
+        result = test.run()
+    logging.disable(logging.NOTSET)
+
+    print_report(result, [llm, ocr, qmt], robot)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    for stub in (llm, ocr, qmt):
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""逐条消息热点函数的微基准测试
+
+覆盖策略提取（extract_*、_markdown_to_json）、策略关键词判断、成语接龙、ChatGPT 对话记录、
+日志入队、Strategy 序列化、短信模板参数和日报提醒的日期计算。输入取自 training/*.jsonl
+和 test_data/messages.txt。每项自动确定循环次数，重复多轮，取每次调用的最小和中位耗时。
+
+缺少依赖（如成语表、chinese_calendar、wcferry）的项目会跳过，不影响其他项目。
+
+用法:
+    python -m benchmark.microbench --json baseline.json                # 保存基线
+    python -m benchmark.microbench --compare baseline.json [-t 0.2]    # 与基线比较，变慢超过阈值时退出码为 1
+    python -m benchmark.microbench -k extract                          # 只运行名称包含 extract 的项目
+"""
+
+import argparse
+import contextlib
+import datetime
+import glob
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 名称 -> 准备函数；准备函数返回 (执行一遍所有输入的函数, 输入条数)
+BENCHMARKS: List[Tuple[str, Callable[[dict], Tuple[Callable[[], None], int]]]] = []
+
+
+def benchmark(name: str):
+    def decorator(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return decorator
+
+
+def load_corpus() -> Dict[str, List[str]]:
+    """训练数据中的用户消息、助手回复，以及测试消息"""
+    corpus = {"user": [], "assistant": [], "messages": []}
+    for path in sorted(glob.glob(os.path.join(ROOT, "training", "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    messages = json.loads(line).get("messages", []) if line.strip() else []
+                except json.JSONDecodeError:
+                    continue
+                for m in messages:
+                    if m.get("role") in ("user", "assistant") and m.get("content"):
+                        corpus[m["role"]].append(m["content"])
+
+    path = os.path.join(ROOT, "test_data", "messages.txt")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            corpus["messages"] = [b.strip() for b in re.split(r"\n=+\n", f.read()) if b.strip()]
+    corpus["all"] = corpus["user"] + corpus["assistant"] + corpus["messages"]
+    return corpus
+
+
+def _manager():
+    from plugin.strategy_manager import StrategyManager
+    # 只用解析方法，不连接策略接口
+    return StrategyManager.__new__(StrategyManager)
+
+
+def _extract_bench(method: str):
+    def setup(corpus):
+        func = getattr(_manager(), method)
+        texts = corpus["all"]
+
+        def run():
+            for text in texts:
+                func(text)
+        return run, len(texts)
+    return setup
+
+
+for _method in ("extract_stock_info", "extract_price_info", "extract_stop_prices", "extract_position_ratio",
+                "extract_reason"):
+    benchmark(f"StrategyManager.{_method}")(_extract_bench(_method))
+
+
+@benchmark("StrategyManager._markdown_to_json")
+def _markdown_to_json(corpus):
+    manager = _manager()
+    texts = [t for t in corpus["assistant"] if "###" in t] or corpus["all"]
+
+    def run():
+        for text in texts:
+            manager._markdown_to_json(text)
+    return run, len(texts)
+
+
+@benchmark("Robot.is_valid_strategy_text")
+def _is_valid_strategy_text(corpus):
+    from robot_b import Robot
+    texts = corpus["all"]
+
+    def run():
+        for text in texts:
+            Robot.is_valid_strategy_text(None, text)
+    return run, len(texts)
+
+
+def _chengyu_inputs(limit: int = 2000):
+    from base.func_chengyu import cy
+    return cy, list(cy.cys)[:limit]
+
+
+@benchmark("Chengyu.getNext")
+def _chengyu_next(corpus):
+    cy, idioms = _chengyu_inputs()
+
+    def run():
+        for idiom in idioms:
+            cy.getNext(idiom)
+    return run, len(idioms)
+
+
+@benchmark("Chengyu.getMeaning")
+def _chengyu_meaning(corpus):
+    cy, idioms = _chengyu_inputs(200)
+
+    def run():
+        for idiom in idioms:
+            cy.getMeaning(idiom)
+    return run, len(idioms)
+
+
+@benchmark("ChatGPT.updateMessage")
+def _update_message(corpus):
+    from base.func_chatgpt import ChatGPT
+    chat = ChatGPT.__new__(ChatGPT)
+    chat.conversation_list = {}
+    chat.system_content_msg = {"role": "system", "content": "你是股票策略整理助手"}
+    # 50个会话轮流提问，每个会话很快达到10条上限并开始滚动清除
+    pairs = [(f"wxid_{i % 50}", text) for i, text in enumerate(corpus["user"] or corpus["all"])]
+
+    def run():
+        for wxid, text in pairs:
+            chat.updateMessage(wxid, text, "user")
+    return run, len(pairs)
+
+
+@benchmark("RobotLogger.log_group_chat")
+def _robot_logger(corpus):
+    from plugin.robot_logger import RobotLogger
+    # RobotLogger 写入当前目录下的 logs，main 中已切换到临时目录
+    logger = RobotLogger(max_queue=1_000_000)
+    texts = corpus["messages"] or corpus["all"]
+    replies = corpus["assistant"] or texts
+
+    def run():
+        for i, text in enumerate(texts):
+            logger.log_group_chat("0000000001@chatroom", f"wxid_{i % 50}", text, replies[i % len(replies)])
+    return run, len(texts)
+
+
+def _strategy_records(corpus) -> List[dict]:
+    from plugin.strategy_extractor import extractor
+    now = datetime.datetime.now()
+    records = []
+    for i, text in enumerate(corpus["all"]):
+        data = extractor.extract(text.replace("**", ""))
+        if data.get("stock_name") and data.get("stock_code"):
+            records.append({**data, "action": data.get("action") or "buy", "id": i,
+                            "created_at": (now - datetime.timedelta(minutes=i)).isoformat(),
+                            "is_active": True, "execution_status": "pending"})
+    return records
+
+
+@benchmark("Strategy.from_dict")
+def _strategy_from_dict(corpus):
+    from plugin.strategy_manager import Strategy
+    records = _strategy_records(corpus)
+
+    def run():
+        for record in records:
+            Strategy.from_dict(record)
+    return run, len(records)
+
+
+@benchmark("Strategy.to_dict")
+def _strategy_to_dict(corpus):
+    from plugin.strategy_manager import Strategy
+    strategies = [Strategy.from_dict(record) for record in _strategy_records(corpus)]
+
+    def run():
+        for strategy in strategies:
+            strategy.to_dict()
+    return run, len(strategies)
+
+
+@benchmark("SmsSender.format_strategy_content")
+def _sms_format(corpus):
+    from plugin.sms_sender import SmsSender
+    sender = SmsSender({"enabled": False})
+    texts = [t for t in corpus["assistant"] if "###" in t] or corpus["all"]
+
+    def run():
+        for text in texts:
+            sender.format_strategy_content(text)
+    return run, len(texts)
+
+
+def _report_dates() -> List[datetime.date]:
+    start = datetime.date(2024, 1, 1)
+    return [start + datetime.timedelta(days=i) for i in range(366)]
+
+
+@benchmark("ReportReminder.last_work_day_of_week")
+def _last_work_day_of_week(corpus):
+    from base.func_report_reminder import ReportReminder
+    dates = _report_dates()
+
+    def run():
+        for d in dates:
+            ReportReminder.last_work_day_of_week(d)
+    return run, len(dates)
+
+
+@benchmark("ReportReminder.last_work_friday_of_month")
+def _last_work_friday_of_month(corpus):
+    from base.func_report_reminder import ReportReminder
+    dates = _report_dates()
+
+    def run():
+        for d in dates:
+            ReportReminder.last_work_friday_of_month(d)
+    return run, len(dates)
+
+
+def measure(run: Callable[[], None], items: int, repeat: int, min_time: float) -> dict:
+    """自动确定每轮循环次数，使每轮不少于 min_time 秒
+    :return: 每次调用的最小、中位耗时（微秒）和每秒调用次数
+    """
+    run()  # 预热
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    per_op = [elapsed / loops / items]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        per_op.append((time.perf_counter() - start) / loops / items)
+    return {
+        "min_us": round(min(per_op) * 1e6, 3),
+        "median_us": round(statistics.median(per_op) * 1e6, 3),
+        "ops_per_sec": round(1 / statistics.median(per_op)),
+        "items": items,
+        "loops": loops,
+        "repeat": repeat,
+    }
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            name_filter: str = None) -> List[str]:
+    """按每次调用的最小耗时与基线比较
+    :param name_filter: 只比较名称包含该字符串的项目，与 -k 一致
+    :return: 变慢超过阈值的项目，以及基线中有、本次出错或缺失的项目
+    """
+    regressions = []
+    print(f"\n{'项目':<42}{'基线(us)':>12}{'本次(us)':>12}{'变化':>10}")
+    for name, base in baseline.items():
+        if name not in results and (not name_filter or name_filter in name):
+            # 基线中有的项目这次出错被跳过，同样视为失败，避免异常被当成通过
+            print(f"{name:<44}{base['min_us']:>12.3f}{'-':>12}{'缺失':>10}")
+            regressions.append(name)
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"{name:<44}{'-':>12}{result['min_us']:>12.3f}{'新增':>10}")
+            continue
+        change = result["min_us"] / base["min_us"] - 1 if base["min_us"] else 0.0
+        mark = ""
+        if change > threshold:
+            mark = "  变慢"
+            regressions.append(name)
+        print(f"{name:<44}{base['min_us']:>12.3f}{result['min_us']:>12.3f}{change:>+10.1%}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点函数微基准测试")
+    parser.add_argument("-k", "--filter", help="只运行名称包含该字符串的项目")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="每个项目重复的轮数")
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少运行的秒数")
+    parser.add_argument("--json", help="把结果写入 JSON 文件，可作为之后比较的基线")
+    parser.add_argument("--compare", help="与基线 JSON 比较")
+    parser.add_argument("-t", "--threshold", type=float, default=0.2, help="最小耗时超过基线多少比例算作变慢")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"语料: 用户消息 {len(corpus['user'])} 条, 助手回复 {len(corpus['assistant'])} 条, "
+          f"测试消息 {len(corpus['messages'])} 条")
+    if not corpus["all"]:
+        print("没有找到语料")
+        return
+
+    results, skipped = {}, {}
+    workdir = tempfile.mkdtemp(prefix="microbench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    print(f"{'项目':<42}{'条数':>8}{'最小(us)':>12}{'中位(us)':>12}{'次/秒':>12}")
+    try:
+        for name, setup in BENCHMARKS:
+            if args.filter and args.filter not in name:
+                continue
+            # 原有的解析方法会打印日志，计时时丢弃输出
+            with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull), \
+                    contextlib.redirect_stderr(devnull):
+                try:
+                    run, items = setup(corpus)
+                    result = measure(run, items, args.repeat, args.min_time) if items else None
+                except Exception as e:
+                    skipped[name] = f"{e.__class__.__name__}: {e}"
+                    continue
+            if result is None:
+                skipped[name] = "没有可用的输入"
+                continue
+            results[name] = result
+            print(f"{name:<44}{items:>8}{result['min_us']:>12.3f}{result['median_us']:>12.3f}"
+                  f"{result['ops_per_sec']:>12}")
+    finally:
+        os.chdir(cwd)
+    for name, reason in skipped.items():
+        print(f"跳过 {name}: {reason}")
+
+    if args.json:
+        report = {
+            "meta": {"time": datetime.datetime.now().isoformat(timespec="seconds"),
+                     "python": platform.python_version(), "platform": platform.platform(),
+                     "corpus": {k: len(v) for k, v in corpus.items()}},
+            "results": results,
+            "skipped": skipped,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.threshold, args.filter)
+        if regressions:
+            print(f"\n{len(regressions)} 个项目变慢超过 {args.threshold:.0%} 或未能运行: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n没有项目变慢超过 {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
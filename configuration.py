@@ -7,6 +7,8 @@ import shutil
 
 import yaml
 
+from base import http_client
+
 
 class Config(object):
     def __init__(self) -> None:
@@ -27,12 +29,18 @@ class Config(object):
     def reload(self) -> None:
         yconfig = self._load_config()
         logging.config.dictConfig(yconfig["logging"])
+        http_client.configure(yconfig.get("http", {}))
         self.CITY_CODE = yconfig["weather"]["city_code"]
         self.WEATHER = yconfig["weather"]["receivers"]
         self.GROUPS = yconfig["groups"]["enable"]
         self.NEWS = yconfig["news"]["receivers"]
         self.REPORT_REMINDERS = yconfig["report_reminder"]["receivers"]
 
+        # 策略服务接口配置
+        self.API = yconfig.get("api", {})
+        if not self.API.get("base_url"):
+            self.API["base_url"] = "http://localhost:5000/api/v1"  # 默认值
+
         self.CHATGPT = yconfig.get("chatgpt", {})
         self.OLLAMA = yconfig.get("ollama", {})
         self.TIGERBOT = yconfig.get("tigerbot", {})
@@ -40,5 +48,15 @@ class Config(object):
         self.CHATGLM = yconfig.get("chatglm", {})
         self.BardAssistant = yconfig.get("bard", {})
         self.ZhiPu = yconfig.get("zhipu", {})
+        self.ROUTER = yconfig.get("router", {})
+        self.LOCAL_PARSE = yconfig.get("local_parse", {})
+        self.PREFILTER = yconfig.get("prefilter", {})
+        self.STOCK_INDEX = yconfig.get("stock_index", {})
+        self.PRICE_MONITOR = yconfig.get("price_monitor", {})
+        self.OUTBOX = yconfig.get("outbox", {})
+        self.ARCHIVE = yconfig.get("archive", {})
+        self.TRACING = yconfig.get("tracing", {})
+        self.METRICS = yconfig.get("metrics", {})
+        self.WARMUP = yconfig.get("warmup", {})
 
         self.SEND_RATE_LIMIT = yconfig.get("send_rate_limit", 0)
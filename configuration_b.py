@@ -7,6 +7,8 @@ import shutil
 
 import yaml
 
+from base import http_client
+
 
 class Config(object):
     def __init__(self) -> None:
@@ -33,6 +35,7 @@ class Config(object):
     def reload(self) -> None:
         yconfig = self._load_config()
         logging.config.dictConfig(yconfig["logging"])
+        http_client.configure(yconfig.get("http", {}))
         self.GROUPS = yconfig["groups"]["enable"]
         self.NEWS = yconfig["news"]["receivers"]
         self.REPORT_REMINDERS = yconfig["report_reminder"]["receivers"]
@@ -59,6 +62,16 @@ class Config(object):
         zhipu_config = yconfig.get("zhipu", {})
         # 不再从config.yaml中读取prompt
         self.ZhiPu = zhipu_config
+        self.OLLAMA = yconfig.get("ollama", {})
+        self.ROUTER = yconfig.get("router", {})
+        self.LOCAL_PARSE = yconfig.get("local_parse", {})
+        self.PREFILTER = yconfig.get("prefilter", {})
+        self.STOCK_INDEX = yconfig.get("stock_index", {})
+        self.PRICE_MONITOR = yconfig.get("price_monitor", {})
+        self.OUTBOX = yconfig.get("outbox", {})
+        self.ARCHIVE = yconfig.get("archive", {})
+        self.TRACING = yconfig.get("tracing", {})
+        self.METRICS = yconfig.get("metrics", {})
         
         # 处理短信配置
         self.SMS = yconfig.get("sms", {"enabled": False})
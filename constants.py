@@ -11,13 +11,14 @@ class ChatType(IntEnum):
     BardAssistant = 5  # Google Bard
     ZhiPu = 6  # ZhiPu
     OLLAMA = 7 # Ollama
+    ROUTER = 8  # 多模型路由
 
     @staticmethod
     def is_in_chat_types(chat_type: int) -> bool:
         if chat_type in [ChatType.TIGER_BOT.value, ChatType.CHATGPT.value,
                          ChatType.XINGHUO_WEB.value, ChatType.CHATGLM.value,
                          ChatType.BardAssistant.value, ChatType.ZhiPu.value,
-                         ChatType.OLLAMA]:
+                         ChatType.OLLAMA, ChatType.ROUTER.value]:
             return True
         return False
 
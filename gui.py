@@ -7,149 +7,81 @@ from tkinter import ttk, scrolledtext, filedialog
 from configuration import Config
 from robot import Robot
 import logging
-from wcferry import WxMsg
 from constants import ChatType
+from mock_wcf import MockWcf, MockWxMsg
 import os
 import time
-import shutil
 import threading
+import queue
+
+class LogSink:
+    """日志文本框的批量写入器
+
+    任意线程都可以调用 write，内容先放入线程安全的队列，
+    由 Tk 主线程每隔 interval_ms 毫秒取出全部待写内容，一次插入并滚动到底部。
+    文本框最多保留 max_lines 行，超出后删除最早的内容。
+    """
+
+    def __init__(self, widget, interval_ms=50, max_lines=5000):
+        """
+        :param widget: Text 文本框
+        :param interval_ms: 刷新间隔毫秒数
+        :param max_lines: 文本框最多保留的行数
+        """
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.max_lines = max_lines
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self.widget.after(self.interval_ms, self._flush)
+
+    def write(self, *segments):
+        """写入一条记录
+        :param segments: (文本, 标签) 元组，按顺序拼接，最后一段需以换行结尾
+        """
+        self._queue.put(segments)
+
+    def clear(self):
+        """清空文本框和尚未写入的内容，只能在主线程调用"""
+        self._drain()
+        self.widget.delete("1.0", tk.END)
+
+    def _drain(self):
+        entries = []
+        while True:
+            try:
+                entries.append(self._queue.get_nowait())
+            except queue.Empty:
+                return entries
 
-# 模拟的WCF类
-class MockWcf:
-    def __init__(self):
-        self._wxid = "wxid_test123"  # 模拟的微信ID
-        self.msg_queue = []  # 用于存储消息的队列
-        self.receiving_msg = True  # 消息接收状态
-        self.last_image_path = None  # 用于存储图片路径
-        self.gui = None  # 添加对GUI的引用
-        
-        # 创建图片保存目录
-        self.img_dir = os.path.abspath("img")
-        if not os.path.exists(self.img_dir):
-            os.makedirs(self.img_dir)
-            print(f"[模拟WCF] 创建图片目录: {self.img_dir}")
-
-    def get_self_wxid(self):
-        return self._wxid
-
-    def get_msg(self):
-        return None if not self.msg_queue else self.msg_queue.pop(0)
-
-    def is_receiving_msg(self):
-        return self.receiving_msg
-
-    def enable_receiving_msg(self):
-        self.receiving_msg = True
-
-    def disable_receiving_msg(self):
-        self.receiving_msg = False
+    def _flush(self):
+        if self._closed:
+            return
+        try:
+            entries = self._drain()
+            if entries:
+                # 每条记录至少一行，超出行数上限的部分插入后也会被删掉，直接丢弃
+                if len(entries) > self.max_lines:
+                    entries = entries[-self.max_lines:]
+                args = []
+                for segments in entries:
+                    for text, tag in segments:
+                        args.append(text)
+                        args.append(tag)
+                self.widget.insert(tk.END, *args)
+                self._trim()
+                self.widget.see(tk.END)
+        except tk.TclError:
+            # 窗口已关闭
+            self._closed = True
+            return
+        self.widget.after(self.interval_ms, self._flush)
 
-    def enable_recv_msg(self, callback):
-        self.receiving_msg = True
-        return True
+    def _trim(self):
+        lines = int(self.widget.index("end-1c").split(".")[0])
+        if lines > self.max_lines:
+            self.widget.delete("1.0", f"{lines - self.max_lines + 1}.0")
 
-    def send_text(self, msg: str, receiver: str, at_list=None):
-        """发送文本消息的模拟方法"""
-        print(f"[模拟WCF] 发送文本消息: {msg} 到 {receiver}, at列表={at_list}")
-        
-        # 如果有GUI引用，在GUI中显示机器人回复
-        if hasattr(self, "gui") and self.gui:
-            self.gui.root.after(0, lambda: self.gui.add_robot_message(msg))
-            
-        return True
-
-    def get_alias_in_chatroom(self, wxid, room_id):
-        return f"用户{wxid}"
-
-    def query_sql(self, db, sql):
-        # 返回一个模拟的联系人列表
-        return [{"UserName": "test_user", "NickName": "测试用户"}]
-        
-    def get_user_img(self, msg_id):
-        """模拟获取图片，直接返回图片路径"""
-        # 直接返回最后一次选择的图片路径
-        if hasattr(self, "last_image_path") and self.last_image_path:
-            print(f"[模拟WCF] 获取图片: msg_id={msg_id}, 返回路径={self.last_image_path}")
-            return self.last_image_path
-        print(f"[模拟WCF] 获取图片失败: msg_id={msg_id}")
-        return None
-        
-    def download_attach(self, id, thumb, extra):
-        """模拟下载附件"""
-        print(f"[模拟WCF] 模拟下载附件: id={id}, thumb={thumb}, extra={extra}")
-        
-        # 确保extra路径存在
-        if extra and os.path.exists(os.path.dirname(extra)):
-            # 创建一个空文件作为占位符
-            try:
-                with open(extra, 'w') as f:
-                    f.write(f"Mock attachment for message {id}")
-                print(f"[模拟WCF] 创建附件占位文件: {extra}")
-                return 0  # 返回成功
-            except Exception as e:
-                print(f"[模拟WCF] 创建附件占位文件失败: {str(e)}")
-                return -1
-        else:
-            print(f"[模拟WCF] 附件路径不存在: {extra}")
-            return -1
-        
-    def download_image(self, id, extra, dir):
-        """模拟下载图片"""
-        print(f"[模拟WCF] 模拟下载图片: id={id}, extra={extra}, dir={dir}")
-        
-        if not hasattr(self, "last_image_path") or not self.last_image_path or not os.path.exists(self.last_image_path):
-            print(f"[模拟WCF] 错误: 图片路径不存在或无效")
-            return None
-        
-        # 创建年月子目录
-        now = time.localtime()
-        year_month = f"{now.tm_year}-{now.tm_mon:02d}"
-        year_month_dir = os.path.join(dir, year_month)
-        if not os.path.exists(year_month_dir):
-            os.makedirs(year_month_dir)
-        
-        # 复制图片到目标目录
-        filename = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.path.basename(self.last_image_path)}"
-        target_path = os.path.join(year_month_dir, filename)
-        try:
-            shutil.copy2(self.last_image_path, target_path)
-            print(f"[模拟WCF] 图片已保存到: {target_path}")
-            return target_path
-        except Exception as e:
-            print(f"[模拟WCF] 保存图片出错: {str(e)}")
-            return None
-
-# 模拟的消息类，用于模拟 WxMsg
-class MockWxMsg(WxMsg):
-    def __init__(self, content, sender, roomid, msg_type=0x01):
-        # 确保ID是整数
-        timestamp_id = int(time.time())
-        self.id = timestamp_id
-        self.type = msg_type     # 消息类型
-        self.sender = sender     # 发送者
-        self.roomid = roomid     # 群id
-        self.content = content   # 消息内容
-        self.sign = ""          # 消息签名
-        self.thumb = ""         # 图片缩略图
-        self.extra = ""         # 附加信息
-        self.timestamp = timestamp_id  # 时间戳
-        print(f"[MockWxMsg] 创建消息: id={self.id}, type={self.type}, sender={self.sender}")
-
-    def __str__(self):
-        return f"[{self.type}]{'[Group]' if self.from_group() else ''} {self.sender}: {self.content}"
-
-    def from_group(self):
-        """是否是群消息"""
-        return bool(self.roomid)
-
-    def from_self(self):
-        """是否是自己发送的消息"""
-        return self.sender == "my_wechat_id"
-
-    def is_at(self, wxid):
-        """是否@了某人"""
-        # 更加健壮的@检测
-        return f"@{wxid}" in self.content or f"@{wxid} " in self.content or f" @{wxid}" in self.content
 
 class ChatGUI:
     def __init__(self):
@@ -210,7 +142,7 @@ class ChatGUI:
         self.robot = Robot(self.config, self.mock_wcf, chat_type)
         
         # 设置机器人的GUI引用
-        self.robot.gui = self
+        self.attach_robot(self.robot)
         
         # 创建聊天记录列表
         self.chat_log = []
@@ -221,6 +153,23 @@ class ChatGUI:
         # 显示启动信息
         self.show_startup_info()
     
+    def attach_robot(self, robot):
+        """设置机器人的GUI引用，并让机器人发送消息后通知GUI
+        只替换这个机器人实例的 sendTextMsg，不影响 Robot 类本身
+        """
+        robot.gui = self
+        original_send_text_msg = robot.sendTextMsg
+
+        def send_text_msg(msg, receiver, at_list=""):
+            # 调用原始的发送方法
+            original_send_text_msg(msg, receiver, at_list)
+            # 添加发送日志
+            self.add_log_message(f"发送消息到 {receiver}: {msg[:30]}{'...' if len(msg) > 30 else ''}", "INFO")
+            # 添加机器人消息
+            self.add_robot_message(msg)
+
+        robot.sendTextMsg = send_text_msg
+
     def setup_styles(self):
         """设置样式"""
         self.style = ttk.Style()
@@ -335,6 +284,9 @@ class ChatGUI:
         )
         self.chat_text.pack(fill=tk.BOTH, expand=True)
         
+        # 日志批量写入，机器人线程可直接调用 add_*_message
+        self.log_sink = LogSink(self.chat_text)
+        
         # 右侧聊天面板标题
         self.chat_title_frame = ttk.Frame(self.right_frame)
         self.chat_title_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -565,13 +517,12 @@ class ChatGUI:
         elif level == "STRATEGY":
             level_tag = "strategy"
         
-        # 在文本末尾插入新行
-        self.chat_text.insert(tk.END, f"[{time_str}] ", "time")
-        self.chat_text.insert(tk.END, f"[{level}] ", level_tag)
-        self.chat_text.insert(tk.END, f"{text}\n", "content")
-        
-        # 滚动到底部
-        self.chat_text.see(tk.END)
+        # 放入队列，由主线程批量插入
+        self.log_sink.write(
+            (f"[{time_str}] ", "time"),
+            (f"[{level}] ", level_tag),
+            (f"{text}\n", "content"),
+        )
         
     def add_sms_log(self, text, level="INFO"):
         """添加短信日志消息到界面（与add_log_message相同，但添加SMS标记）"""
@@ -585,21 +536,21 @@ class ChatGUI:
         elif level == "WARNING":
             level_tag = "warning"
         
-        # 在文本末尾插入新行
-        self.chat_text.insert(tk.END, f"[{time_str}] ", "time")
-        self.chat_text.insert(tk.END, f"[SMS] ", "strategy")
-        self.chat_text.insert(tk.END, f"[{level}] ", level_tag)
-        self.chat_text.insert(tk.END, f"{text}\n", "content")
-        
-        # 滚动到底部
-        self.chat_text.see(tk.END)
+        # 放入队列，由主线程批量插入
+        self.log_sink.write(
+            (f"[{time_str}] ", "time"),
+            ("[SMS] ", "strategy"),
+            (f"[{level}] ", level_tag),
+            (f"{text}\n", "content"),
+        )
 
     def add_section_header(self, title):
         """添加带有分隔线的章节标题"""
-        self.chat_text.insert(tk.END, "\n" + "="*50 + "\n", "content")
-        self.chat_text.insert(tk.END, f" {title} \n", "section_header")
-        self.chat_text.insert(tk.END, "="*50 + "\n", "content")
-        self.chat_text.see(tk.END)
+        self.log_sink.write(
+            ("\n" + "="*50 + "\n", "content"),
+            (f" {title} \n", "section_header"),
+            ("="*50 + "\n", "content"),
+        )
 
     def process_message_thread(self, msg):
         """在线程中处理消息"""
@@ -613,24 +564,24 @@ class ChatGUI:
             # 记录处理开始的更详细日志
             msg_type_str = "图片" if msg.type == 0x03 else "文本"
             room_str = f"群聊({msg.roomid})" if msg.roomid else "私聊"
-            self.root.after(0, lambda: self.add_log_message(
+            self.add_log_message(
                 f"开始处理{msg_type_str}消息: ID={msg.id}, 类型={msg_type_str}, 发送者={msg.sender}, 类型={room_str}",
                 "INFO"
-            ))
+            )
             
             # 记录消息内容
             content_preview = msg.content
             if msg.type == 0x03:
                 content_preview = f"[图片消息] 路径={self.mock_wcf.last_image_path}" if hasattr(self.mock_wcf, "last_image_path") else "[图片消息]"
                 # 添加图片路径详细信息
-                self.root.after(0, lambda: self.add_log_message(f"图片完整路径: {self.mock_wcf.last_image_path}", "INFO"))
+                self.add_log_message(f"图片完整路径: {self.mock_wcf.last_image_path}", "INFO")
             else:
                 content_preview = f"{msg.content[:50]}{'...' if len(msg.content) > 50 else ''}"
             
-            self.root.after(0, lambda: self.add_log_message(f"消息内容: {content_preview}", "INFO"))
+            self.add_log_message(f"消息内容: {content_preview}", "INFO")
             
             # 处理开始前记录
-            self.root.after(0, lambda: self.add_log_message("交给机器人处理中...", "INFO"))
+            self.add_log_message("交给机器人处理中...", "INFO")
             
             # 更新状态为处理中
             self.root.after(0, lambda: self.update_status("机器人处理中...", True))
@@ -638,18 +589,18 @@ class ChatGUI:
             # 处理消息前记录原始消息内容
             if msg.type == 0x03:
                 # 图片消息处理前，添加OCR处理章节
-                self.root.after(0, lambda: self.add_section_header("图片OCR处理"))
+                self.add_section_header("图片OCR处理")
                 
                 # 保存图片路径到wcf对象，以便get_user_img方法使用
                 if hasattr(self.mock_wcf, "last_image_path") and self.mock_wcf.last_image_path:
                     # 记录图片保存路径
-                    self.root.after(0, lambda: self.add_log_message(f"图片路径: {self.mock_wcf.last_image_path}", "INFO"))
+                    self.add_log_message(f"图片路径: {self.mock_wcf.last_image_path}", "INFO")
             else:
                 # 文本消息处理前，添加AI分析章节
-                self.root.after(0, lambda: self.add_section_header("AI分析处理"))
+                self.add_section_header("AI分析处理")
                 
                 # 记录完整的消息内容
-                self.root.after(0, lambda: self.add_log_message(f"完整消息内容:\n{msg.content}", "INFO"))
+                self.add_log_message(f"完整消息内容:\n{msg.content}", "INFO")
             
             # 处理消息
             self.robot.onMsg(msg)
@@ -658,15 +609,15 @@ class ChatGUI:
             self.root.after(0, lambda: self.update_status("处理完成", False))
             
             # 添加处理完成日志
-            self.root.after(0, lambda: self.add_log_message(f"消息处理完成: ID={msg.id}", "INFO"))
+            self.add_log_message(f"消息处理完成: ID={msg.id}", "INFO")
         except Exception as e:
             print(f"处理消息出错: {e}")
             # 记录详细错误日志
             error_msg = f"处理消息出错: {str(e)}"
             import traceback
             trace_info = traceback.format_exc()
-            self.root.after(0, lambda: self.add_log_message(error_msg, "ERROR"))
-            self.root.after(0, lambda: self.add_log_message(f"错误详情: {trace_info}", "ERROR"))
+            self.add_log_message(error_msg, "ERROR")
+            self.add_log_message(f"错误详情: {trace_info}", "ERROR")
             
             # 更新状态为错误
             self.root.after(0, lambda: self.update_status("处理出错", False))
@@ -675,44 +626,32 @@ class ChatGUI:
         """添加系统消息"""
         time_str = time.strftime("%H:%M:%S")
         
-        # 在文本末尾插入新行
-        self.chat_text.insert(tk.END, f"[{time_str}] ", "time")
-        self.chat_text.insert(tk.END, f"{text}\n", "system")
-        
-        # 滚动到底部
-        self.chat_text.see(tk.END)
+        self.log_sink.write(
+            (f"[{time_str}] ", "time"),
+            (f"{text}\n", "system"),
+        )
 
     def add_user_message(self, sender, text, is_self=False):
         """添加用户消息"""
         time_str = time.strftime("%H:%M:%S")
         
-        # 添加发送时间和发送者
-        self.chat_text.insert(tk.END, f"[{time_str}] ", "time")
-        
-        if is_self:
-            self.chat_text.insert(tk.END, f"我: ", "user")
-        else:
-            self.chat_text.insert(tk.END, f"{sender}: ", "user")
-            
-        # 添加消息内容
-        self.chat_text.insert(tk.END, f"{text}\n", "content")
-        
-        # 滚动到底部
-        self.chat_text.see(tk.END)
+        # 发送时间、发送者和消息内容
+        self.log_sink.write(
+            (f"[{time_str}] ", "time"),
+            ("我: " if is_self else f"{sender}: ", "user"),
+            (f"{text}\n", "content"),
+        )
 
     def add_robot_message(self, text):
         """添加机器人消息"""
         time_str = time.strftime("%H:%M:%S")
         
-        # 添加发送时间和发送者
-        self.chat_text.insert(tk.END, f"[{time_str}] ", "time")
-        self.chat_text.insert(tk.END, f"机器人: ", "robot")
-        
-        # 添加消息内容
-        self.chat_text.insert(tk.END, f"{text}\n", "content")
-        
-        # 滚动到底部
-        self.chat_text.see(tk.END)
+        # 发送时间、发送者和消息内容
+        self.log_sink.write(
+            (f"[{time_str}] ", "time"),
+            ("机器人: ", "robot"),
+            (f"{text}\n", "content"),
+        )
 
     def send_image(self):
         """发送图片消息"""
@@ -830,8 +769,8 @@ class ChatGUI:
         
     def clear_chat(self):
         """清空聊天记录"""
-        # 清空聊天文本
-        self.chat_text.delete(1.0, tk.END)
+        # 清空聊天文本和尚未显示的日志
+        self.log_sink.clear()
         
         # 显示清空成功消息
         self.add_system_message("聊天记录已清空")
@@ -878,31 +817,13 @@ class ChatGUI:
         if model_name in model_map:
             chat_type = model_map[model_name]
             self.robot = Robot(self.config, self.mock_wcf, chat_type)
-            self.robot.gui = self
+            self.attach_robot(self.robot)
             self.add_system_message(f"已切换到{model_name}模型")
 
     def run(self):
         self.root.mainloop()
 
 
-# 修改Robot类的sendTextMsg方法，使其在发送消息后通知GUI
-original_send_text_msg = Robot.sendTextMsg
-
-def patched_send_text_msg(self, msg, receiver, at_list=""):
-    """添加GUI回调的sendTextMsg方法"""
-    # 调用原始的发送方法
-    original_send_text_msg(self, msg, receiver, at_list)
-    
-    # 如果有GUI实例，记录日志并显示机器人消息
-    if hasattr(self, "gui") and self.gui:
-        # 添加发送日志
-        self.gui.root.after(0, lambda: self.gui.add_log_message(f"发送消息到 {receiver}: {msg[:30]}{'...' if len(msg) > 30 else ''}", "INFO"))
-        # 添加机器人消息
-        self.gui.root.after(0, lambda: self.gui.add_robot_message(msg))
-
-# 替换原方法
-Robot.sendTextMsg = patched_send_text_msg
-
 if __name__ == "__main__":
     app = ChatGUI()
     
@@ -4,7 +4,9 @@
 import signal
 from argparse import ArgumentParser
 
+from base import http_client
 from base.func_report_reminder import ReportReminder
+from base.func_warmup import Warmup
 from configuration import Config
 from constants import ChatType
 from robot import Robot, __version__
@@ -12,19 +14,29 @@ from wcferry import Wcf
 
 def main(chat_type: int):
     config = Config()
+
+    # 模型预热（创建、预加载、探测）在后台进行，与微信握手、获取联系人并行
+    warmup = None
+    if config.WARMUP.get("enable", True):
+        warmup = Warmup(lambda: Robot.createChat(config, chat_type), config.WARMUP.get("timeout", 60)).start()
+
     wcf = Wcf(debug=True)
 
     def handler(sig, frame):
         wcf.cleanup()  # 退出前清理环境
+        http_client.close_all()
         exit(0)
 
     signal.signal(signal.SIGINT, handler)
 
-    robot = Robot(config, wcf, chat_type)
+    robot = Robot(config, wcf, chat_type, warmup)
     robot.LOG.info(f"WeChatRobot【{__version__}】成功启动···")
 
-    # 机器人启动发送测试消息
-    robot.sendTextMsg("机器人启动成功！", "filehelper")
+    # 机器人启动发送测试消息，附带各模型冷启动耗时
+    if warmup:
+        robot.sendTextMsg(f"机器人启动成功！\n{warmup.report()}", "filehelper")
+    else:
+        robot.sendTextMsg("机器人启动成功！", "filehelper")
 
     # 接收消息
     # robot.enableRecvMsg()     # 可能会丢消息？
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""模拟的微信通信层
+
+MockWcf 实现机器人用到的 Wcf 接口，消息放在线程安全的队列里，get_msg 与 wcferry 一样
+阻塞等待、超时抛出 queue.Empty，机器人的 enableReceivingMsg 接收线程可以原样运行。
+不依赖图形界面，供 gui.py、simulator.py 和 benchmark 使用。
+"""
+
+import itertools
+import os
+import queue
+import shutil
+import time
+from typing import Callable, Optional
+
+from wcferry import WxMsg
+
+# 消息ID，毫秒时间戳起递增，快速连续发送时也不重复
+_MSG_IDS = itertools.count(int(time.time() * 1000))
+
+
+# 模拟的WCF类
+class MockWcf:
+    def __init__(self):
+        self._wxid = "wxid_test123"  # 模拟的微信ID
+        self.msg_queue = queue.Queue()  # 用于存储消息的队列
+        self.receiving_msg = True  # 消息接收状态
+        self.last_image_path = None  # 用于存储图片路径
+        self.gui = None  # 添加对GUI的引用
+        self.on_send: Optional[Callable[[str, str, Optional[str]], None]] = None  # 发送文本消息时的回调
+        self._in_flight = False  # 接收线程是否有取出但未处理完的消息
+        
+        # 创建图片保存目录
+        self.img_dir = os.path.abspath("img")
+        if not os.path.exists(self.img_dir):
+            os.makedirs(self.img_dir)
+            print(f"[模拟WCF] 创建图片目录: {self.img_dir}")
+
+    def get_self_wxid(self):
+        return self._wxid
+
+    def put_msg(self, msg) -> None:
+        """投递一条消息，由接收线程通过 get_msg 取出"""
+        self.msg_queue.put(msg)
+
+    def get_msg(self, block: bool = True, timeout: float = 1):
+        """取出一条消息，与 wcferry 相同，没有消息时抛出 queue.Empty
+        接收线程处理完一条消息才会再次调用，此时把上一条标记为完成，join 据此等待处理结束
+        """
+        if self._in_flight:
+            self._in_flight = False
+            self.msg_queue.task_done()
+        msg = self.msg_queue.get(block, timeout)
+        self._in_flight = True
+        return msg
+
+    def join(self) -> None:
+        """等待已投递的消息全部处理完，需要接收线程在运行"""
+        self.msg_queue.join()
+
+    def is_receiving_msg(self):
+        return self.receiving_msg
+
+    def enable_receiving_msg(self):
+        self.receiving_msg = True
+
+    def disable_receiving_msg(self):
+        self.receiving_msg = False
+
+    def enable_recv_msg(self, callback):
+        self.receiving_msg = True
+        return True
+
+    def send_text(self, msg: str, receiver: str, at_list=None):
+        """发送文本消息的模拟方法"""
+        print(f"[模拟WCF] 发送文本消息: {msg} 到 {receiver}, at列表={at_list}")
+        
+        if self.on_send:
+            self.on_send(msg, receiver, at_list)
+        
+        # 如果有GUI引用，在GUI中显示机器人回复
+        if hasattr(self, "gui") and self.gui:
+            self.gui.add_robot_message(msg)
+            
+        return True
+
+    def get_alias_in_chatroom(self, wxid, room_id):
+        return f"用户{wxid}"
+
+    def query_sql(self, db, sql):
+        # 返回一个模拟的联系人列表
+        return [{"UserName": "test_user", "NickName": "测试用户"}]
+        
+    def get_user_img(self, msg_id):
+        """模拟获取图片，直接返回图片路径"""
+        # 直接返回最后一次选择的图片路径
+        if hasattr(self, "last_image_path") and self.last_image_path:
+            print(f"[模拟WCF] 获取图片: msg_id={msg_id}, 返回路径={self.last_image_path}")
+            return self.last_image_path
+        print(f"[模拟WCF] 获取图片失败: msg_id={msg_id}")
+        return None
+        
+    def download_attach(self, id, thumb, extra):
+        """模拟下载附件"""
+        print(f"[模拟WCF] 模拟下载附件: id={id}, thumb={thumb}, extra={extra}")
+        
+        # 确保extra路径存在
+        if extra and os.path.exists(os.path.dirname(extra)):
+            # 创建一个空文件作为占位符
+            try:
+                with open(extra, 'w') as f:
+                    f.write(f"Mock attachment for message {id}")
+                print(f"[模拟WCF] 创建附件占位文件: {extra}")
+                return 0  # 返回成功
+            except Exception as e:
+                print(f"[模拟WCF] 创建附件占位文件失败: {str(e)}")
+                return -1
+        else:
+            print(f"[模拟WCF] 附件路径不存在: {extra}")
+            return -1
+        
+    def download_image(self, id, extra, dir):
+        """模拟下载图片"""
+        print(f"[模拟WCF] 模拟下载图片: id={id}, extra={extra}, dir={dir}")
+        
+        if not hasattr(self, "last_image_path") or not self.last_image_path or not os.path.exists(self.last_image_path):
+            print(f"[模拟WCF] 错误: 图片路径不存在或无效")
+            return None
+        
+        # 创建年月子目录
+        now = time.localtime()
+        year_month = f"{now.tm_year}-{now.tm_mon:02d}"
+        year_month_dir = os.path.join(dir, year_month)
+        if not os.path.exists(year_month_dir):
+            os.makedirs(year_month_dir)
+        
+        # 复制图片到目标目录
+        filename = f"{time.strftime('%Y%m%d_%H%M%S')}_{os.path.basename(self.last_image_path)}"
+        target_path = os.path.join(year_month_dir, filename)
+        try:
+            shutil.copy2(self.last_image_path, target_path)
+            print(f"[模拟WCF] 图片已保存到: {target_path}")
+            return target_path
+        except Exception as e:
+            print(f"[模拟WCF] 保存图片出错: {str(e)}")
+            return None
+
+# 模拟的消息类，用于模拟 WxMsg
+class MockWxMsg(WxMsg):
+    def __init__(self, content, sender, roomid, msg_type=0x01):
+        # 确保ID是整数
+        timestamp_id = int(time.time())
+        self.id = next(_MSG_IDS)
+        self.type = msg_type     # 消息类型
+        self.sender = sender     # 发送者
+        self.roomid = roomid     # 群id
+        self.content = content   # 消息内容
+        self.sign = ""          # 消息签名
+        self.thumb = ""         # 图片缩略图
+        self.extra = ""         # 附加信息
+        self.timestamp = timestamp_id  # 时间戳
+        print(f"[MockWxMsg] 创建消息: id={self.id}, type={self.type}, sender={self.sender}")
+
+    def __str__(self):
+        return f"[{self.type}]{'[Group]' if self.from_group() else ''} {self.sender}: {self.content}"
+
+    def from_group(self):
+        """是否是群消息"""
+        return bool(self.roomid)
+
+    def from_self(self):
+        """是否是自己发送的消息"""
+        return self.sender == "my_wechat_id"
+
+    def is_at(self, wxid):
+        """是否@了某人"""
+        # 更加健壮的@检测
+        return f"@{wxid}" in self.content or f"@{wxid} " in self.content or f" @{wxid}" in self.content
@@ -0,0 +1,337 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""策略回测
+
+从 robot_logger 记录的策略日志（JSONL，兼容旧的 JSON 数组文件）中读取历史策略，用本地 CSV/Parquet 的K线回放：
+价格进入 price_min-price_max 区间时成交，之后按止损、止盈离场，持有到期按收盘价离场。
+同一只股票的所有策略在一次向量化计算中完成，不同股票分到进程池中并行。
+
+K线目录下每只股票一个文件，文件名为股票代码，如 600519.csv、600519.parquet，
+需包含时间列和 open/high/low/close 列。
+
+用法: python -m plugin.backtest --bars data/bars [--log logs/strategies] [--horizon 20] [--workers 4]
+"""
+
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from plugin.strategy_log import read_strategy_log
+
+# 买入方向的操作按做多计算收益，卖出方向按卖出后少亏或踏空计算
+SELL_ACTIONS = ("sell", "reduce")
+
+# 离场原因
+TAKE_PROFIT = "take_profit"
+STOP_LOSS = "stop_loss"
+EXPIRED = "expired"
+NO_FILL = "no_fill"
+NO_DATA = "no_data"
+
+# K线文件中可识别的列名
+TIME_COLUMNS = ("datetime", "date", "time", "trade_date", "日期", "时间")
+PRICE_COLUMNS = {
+    "open": ("open", "开盘", "开盘价"),
+    "high": ("high", "最高", "最高价"),
+    "low": ("low", "最低", "最低价"),
+    "close": ("close", "收盘", "收盘价"),
+}
+
+
+class Signal(NamedTuple):
+    """日志中的一条策略"""
+    time: str  # 收到策略的时间，YYYY-mm-dd HH:MM:SS
+    source: str
+    stock_code: str
+    stock_name: str
+    action: str
+    price_min: float  # 未设置的价格为 NaN
+    price_max: float
+    stop_loss: float
+    take_profit: float
+
+
+class Trade(NamedTuple):
+    """一条策略的回测结果"""
+    signal: Signal
+    outcome: str
+    entry_price: float
+    exit_price: float
+    ret: float  # 收益率，未成交为 NaN
+    bars_held: int
+
+
+class Bars(NamedTuple):
+    """按时间升序的K线数组"""
+    time: np.ndarray  # datetime64[s]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+
+
+def _price(value) -> float:
+    try:
+        return float(value) if value not in (None, "") else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def load_signals(log_dir: str = "logs/strategies", start: str = None, end: str = None,
+                 source_key: str = "source_id") -> List[Signal]:
+    """读取策略日志
+    :param log_dir: 策略日志目录
+    :param start: 起始日期（含），如 2024-01-01
+    :param end: 结束日期（含）
+    :param source_key: 按哪个字段区分来源：source_id、source_type 或 sender
+    :return: 有股票代码和操作的策略，按时间升序
+    """
+    signals = []
+    for entry in read_strategy_log(log_dir, start, end):
+        strategy = entry.get("strategy") or {}
+        timestamp = entry.get("timestamp", "")
+        if not strategy.get("stock_code") or not strategy.get("action"):
+            continue
+        if (start and timestamp[:10] < start) or (end and timestamp[:10] > end):
+            continue
+        signals.append(Signal(
+            time=timestamp,
+            source=str(entry.get(source_key) or "未知"),
+            stock_code=str(strategy["stock_code"]),
+            stock_name=strategy.get("stock_name") or "",
+            action=strategy["action"],
+            price_min=_price(strategy.get("price_min")),
+            price_max=_price(strategy.get("price_max")),
+            stop_loss=_price(strategy.get("stop_loss_price")),
+            take_profit=_price(strategy.get("take_profit_price")),
+        ))
+    signals.sort(key=lambda s: s.time)
+    return signals
+
+
+def _column(columns: Iterable[str], names: Iterable[str]) -> Optional[str]:
+    lowered = {str(c).strip().lower(): c for c in columns}
+    return next((lowered[n] for n in names if n in lowered), None)
+
+
+def load_bars(bars_dir: str, stock_code: str) -> Optional[Bars]:
+    """读取一只股票的K线，优先 Parquet
+    :return: 找不到文件或缺少列时返回 None
+    """
+    for ext in (".parquet", ".csv"):
+        path = os.path.join(bars_dir, stock_code + ext)
+        if not os.path.exists(path):
+            continue
+        try:
+            df = pd.read_parquet(path) if ext == ".parquet" else pd.read_csv(path, dtype=str)
+        except ImportError:
+            # 读取 Parquet 需要 pyarrow 或 fastparquet
+            print(f"[回测] 缺少 Parquet 读取依赖，请安装 pyarrow: {path}")
+            continue
+        except Exception as e:
+            print(f"[回测] 读取K线失败 {path}: {str(e)}")
+            return None
+
+        time_col = _column(df.columns, TIME_COLUMNS)
+        price_cols = {field: _column(df.columns, names) for field, names in PRICE_COLUMNS.items()}
+        if time_col is None or None in price_cols.values():
+            print(f"[回测] K线缺少时间或开高低收列: {path}")
+            return None
+
+        times = pd.to_datetime(df[time_col].astype(str)).to_numpy().astype("datetime64[s]")
+        order = np.argsort(times, kind="stable")
+        prices = {field: pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)[order]
+                  for field, col in price_cols.items()}
+        return Bars(times[order], **prices)
+    return None
+
+
+def simulate(signals: List[Signal], bars: Bars, horizon: int = 20) -> List[Trade]:
+    """回测同一只股票的一组策略
+
+    每条策略取收到之后的 horizon 根K线（不含收到时所在的K线，避免用到已发生的价格）：
+    - 某根K线的最低、最高价与交易区间有交集即成交，成交价为开盘价限制在区间内；
+      只给出单边价格时另一边不限，都未给出时按第一根K线开盘价成交
+    - 成交后的K线最低价触及止损、最高价触及止盈即离场，跳空时按开盘价成交；
+      同一根K线两者都触及时按止损计算
+    - 都未触及时按最后一根K线收盘价离场
+    卖出类操作只判断成交，收益按卖出后的跌幅计算。
+    """
+    n = len(signals)
+    if n == 0:
+        return []
+    count = len(bars.time)
+    signal_times = np.array([s.time.replace(" ", "T") for s in signals], dtype="datetime64[s]")
+    first = np.searchsorted(bars.time, signal_times, side="right")
+
+    # (策略数, horizon) 的窗口，超出K线末尾的位置标记为无效
+    offsets = np.arange(horizon)
+    index = first[:, None] + offsets[None, :]
+    valid = index < count
+    index = np.minimum(index, max(count - 1, 0))
+    open_, high, low, close = (bars.open[index], bars.high[index], bars.low[index], bars.close[index])
+
+    lo = np.array([s.price_min for s in signals])
+    hi = np.array([s.price_max for s in signals])
+    stop = np.array([s.stop_loss for s in signals])
+    profit = np.array([s.take_profit for s in signals])
+    sell = np.array([s.action in SELL_ACTIONS for s in signals])
+    lo = np.where(np.isnan(lo), 0.0, lo)
+    hi = np.where(np.isnan(hi), np.inf, hi)
+
+    rows = np.arange(n)
+    with np.errstate(invalid="ignore"):
+        touched = valid & (low <= hi[:, None]) & (high >= lo[:, None])
+        filled = touched.any(axis=1)
+        entry = touched.argmax(axis=1)
+        entry_price = np.clip(open_[rows, entry], lo, hi)
+
+        # 成交后的K线才判断止损止盈，卖出类操作不设止损止盈
+        after = valid & (offsets[None, :] > entry[:, None]) & ~sell[:, None]
+        stop_hit = after & (low <= stop[:, None])
+        profit_hit = after & (high >= profit[:, None])
+    first_stop = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), horizon)
+    first_profit = np.where(profit_hit.any(axis=1), profit_hit.argmax(axis=1), horizon)
+    last = np.maximum(valid.sum(axis=1) - 1, 0)
+
+    stopped = filled & (first_stop < horizon) & (first_stop <= first_profit)
+    took_profit = filled & (first_profit < first_stop)
+    exit_bar = np.where(stopped, first_stop, np.where(took_profit, first_profit, last))
+    exit_price = np.where(
+        stopped, np.minimum(open_[rows, exit_bar], stop),
+        np.where(took_profit, np.maximum(open_[rows, exit_bar], profit), close[rows, last]))
+    direction = np.where(sell, -1.0, 1.0)
+    ret = np.where(filled, direction * (exit_price / entry_price - 1.0), np.nan)
+
+    has_data = valid[:, 0]
+    trades = []
+    for i, signal in enumerate(signals):
+        if not has_data[i]:
+            outcome = NO_DATA
+        elif not filled[i]:
+            outcome = NO_FILL
+        elif stopped[i]:
+            outcome = STOP_LOSS
+        elif took_profit[i]:
+            outcome = TAKE_PROFIT
+        else:
+            outcome = EXPIRED
+        if outcome in (NO_DATA, NO_FILL):
+            trades.append(Trade(signal, outcome, np.nan, np.nan, np.nan, 0))
+        else:
+            trades.append(Trade(signal, outcome, float(entry_price[i]), float(exit_price[i]),
+                                float(ret[i]), int(exit_bar[i] - entry[i])))
+    return trades
+
+
+def _backtest_stock(task) -> List[Trade]:
+    """进程池任务：读取一只股票的K线并回测它的所有策略"""
+    bars_dir, stock_code, signals, horizon = task
+    bars = load_bars(bars_dir, stock_code)
+    if bars is None or not len(bars.time):
+        return [Trade(s, NO_DATA, np.nan, np.nan, np.nan, 0) for s in signals]
+    return simulate(signals, bars, horizon)
+
+
+def run_backtest(signals: List[Signal], bars_dir: str, horizon: int = 20, workers: int = None) -> List[Trade]:
+    """按股票分组，在进程池中并行回测
+    :param signals: load_signals 的结果
+    :param bars_dir: K线目录
+    :param horizon: 每条策略最多持有的K线根数
+    :param workers: 进程数，默认为CPU核数，1 表示在当前进程中运行
+    """
+    grouped: Dict[str, List[Signal]] = {}
+    for signal in signals:
+        grouped.setdefault(signal.stock_code, []).append(signal)
+    tasks = [(bars_dir, code, group, horizon) for code, group in grouped.items()]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        results = map(_backtest_stock, tasks)
+        return [trade for trades in results for trade in trades]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        return [trade for trades in executor.map(_backtest_stock, tasks, chunksize=chunksize)
+                for trade in trades]
+
+
+def summarize(trades: Iterable[Trade]) -> Dict[str, dict]:
+    """按来源统计
+    :return: {来源: {signals, filled, take_profit, stop_loss, expired, no_data, fill_rate, hit_rate, avg_return}}
+    命中率为成交的策略中收益为正的比例
+    """
+    grouped: Dict[str, List[Trade]] = {}
+    for trade in trades:
+        grouped.setdefault(trade.signal.source, []).append(trade)
+
+    summary = {}
+    for source, group in sorted(grouped.items()):
+        outcomes = [t.outcome for t in group]
+        returns = np.array([t.ret for t in group if t.outcome not in (NO_DATA, NO_FILL)])
+        with_data = len(group) - outcomes.count(NO_DATA)
+        summary[source] = {
+            "signals": len(group),
+            "filled": len(returns),
+            TAKE_PROFIT: outcomes.count(TAKE_PROFIT),
+            STOP_LOSS: outcomes.count(STOP_LOSS),
+            EXPIRED: outcomes.count(EXPIRED),
+            NO_DATA: outcomes.count(NO_DATA),
+            "fill_rate": len(returns) / with_data if with_data else np.nan,
+            "hit_rate": float((returns > 0).mean()) if len(returns) else np.nan,
+            "avg_return": float(returns.mean()) if len(returns) else np.nan,
+        }
+    return summary
+
+
+def format_report(summary: Dict[str, dict]) -> str:
+    def pct(value: float) -> str:
+        return "-" if np.isnan(value) else f"{value * 100:.1f}%"
+
+    lines = [f"{'来源':<24}{'策略':>6}{'成交':>6}{'止盈':>6}{'止损':>6}{'到期':>6}{'无数据':>6}"
+             f"{'成交率':>8}{'命中率':>8}{'平均收益':>9}"]
+    for source, s in summary.items():
+        lines.append(f"{source[:24]:<26}{s['signals']:>8}{s['filled']:>8}{s[TAKE_PROFIT]:>8}{s[STOP_LOSS]:>8}"
+                     f"{s[EXPIRED]:>8}{s[NO_DATA]:>9}{pct(s['fill_rate']):>11}{pct(s['hit_rate']):>11}"
+                     f"{pct(s['avg_return']):>13}")
+    return "\n".join(lines)
+
+
+def save_trades(trades: Iterable[Trade], path: str) -> None:
+    """逐条导出回测结果为CSV"""
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(Signal._fields) + ["outcome", "entry_price", "exit_price", "ret", "bars_held"])
+        for t in trades:
+            writer.writerow(list(t.signal) + [t.outcome, t.entry_price, t.exit_price, t.ret, t.bars_held])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用历史K线回测策略日志")
+    parser.add_argument("--log", default="logs/strategies", help="策略日志目录")
+    parser.add_argument("--bars", required=True, help="K线目录，每只股票一个 <代码>.csv 或 <代码>.parquet")
+    parser.add_argument("--horizon", type=int, default=20, help="最多持有的K线根数")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument("--start", help="起始日期，如 2024-01-01")
+    parser.add_argument("--end", help="结束日期")
+    parser.add_argument("--by", default="source_id", choices=("source_id", "source_type", "sender"),
+                        help="按哪个字段统计来源")
+    parser.add_argument("--output", help="逐条结果导出的CSV路径")
+    args = parser.parse_args()
+
+    signals = load_signals(args.log, args.start, args.end, args.by)
+    print(f"[回测] 策略 {len(signals)} 条，股票 {len({s.stock_code for s in signals})} 只")
+    trades = run_backtest(signals, args.bars, args.horizon, args.workers)
+    print(format_report(summarize(trades)))
+    if args.output:
+        save_trades(trades, args.output)
+        print(f"[回测] 逐条结果已保存: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,14 @@ import base64
 import json
 from PIL import Image
 
+from plugin.metrics import OCR_SECONDS
+
 class BaiduOCR:
     """百度OCR插件，负责识别图片中的文字"""
     
+    # 接口地址，压测时指向本地模拟服务
+    base_url = "https://aip.baidubce.com"
+
     def __init__(self) -> None:
         """初始化百度OCR插件"""
         # 百度OCR API凭证
@@ -37,7 +42,7 @@ class BaiduOCR:
     
     def _get_access_token(self):
         """获取百度OCR API的access token"""
-        url = "https://aip.baidubce.com/oauth/2.0/token"
+        url = f"{self.base_url}/oauth/2.0/token"
         params = {
             "grant_type": "client_credentials",
             "client_id": self.api_key,
@@ -60,6 +65,7 @@ class BaiduOCR:
             print(f"[百度OCR] 获取授权令牌出错: {str(e)}")
             return False
     
+    @OCR_SECONDS.timed(backend="baidu")
     def extract_text(self, image_path: str) -> str:
         """
         使用百度OCR API从图片中提取文字
@@ -88,7 +94,7 @@ class BaiduOCR:
                 image_data = base64.b64encode(image_file.read()).decode('utf-8')
             
             # 调用百度OCR API的通用文字识别（高精度版）
-            request_url = "https://aip.baidubce.com/rest/2.0/ocr/v1/accurate_basic"
+            request_url = f"{self.base_url}/rest/2.0/ocr/v1/accurate_basic"
             
             params = {
                 "access_token": self.access_token
@@ -3,6 +3,9 @@ import sys
 import pytesseract
 from PIL import Image
 
+from plugin.metrics import OCR_SECONDS
+from plugin.tracing import traced
+
 class ImageOCR:
     """图片OCR插件，负责识别图片中的文字"""
     
@@ -41,6 +44,8 @@ class ImageOCR:
             print("4. 重启应用程序")
             print(f"[图片OCR] 错误详情: {str(e)}")
     
+    @traced("extract_text")
+    @OCR_SECONDS.timed(backend="tesseract")
     def extract_text(self, image_path: str) -> str:
         """
         从图片中提取文字
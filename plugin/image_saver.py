@@ -4,6 +4,8 @@ import re
 from datetime import datetime
 from wcferry import Wcf, WxMsg
 
+from plugin.tracing import traced
+
 class ImageSaver:
     """图片保存插件，负责将接收到的图片保存到指定文件夹"""
     
@@ -78,6 +80,7 @@ class ImageSaver:
             )
             return info
     
+    @traced("wait_for_file")
     def wait_for_file(self, file_path: str, timeout: int = 10, stable_threshold: int = 3) -> bool:
         """
         等待文件下载完成并且大小稳定
@@ -117,6 +120,7 @@ class ImageSaver:
         print(f"[图片保存] 等待超时: {timeout}秒")
         return False
     
+    @traced("save_image", lambda self, msg: {"msg.id": msg.id})
     def save_image(self, msg: WxMsg) -> str:
         if not self.wcf:
             print("[图片保存] 错误: wcf未初始化")
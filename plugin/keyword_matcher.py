@@ -0,0 +1,124 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+from plugin.strategy_extractor import ACTION_KEYWORDS
+
+
+class Hit(NamedTuple):
+    """一次关键词命中"""
+    start: int  # 关键词在文本中的起始位置
+    keyword: str
+    category: str
+
+
+class KeywordMatcher:
+    """Aho-Corasick 多模式匹配器
+
+    所有关键词表只建一次自动机，一次扫描文本就能找出全部命中及位置。
+    构建时把失败指针展开成完整的状态转移表，扫描每个字符只需查一次字典；
+    处于初始状态时用正则直接跳到下一个可能的关键词首字，闲聊文本几乎不逐字遍历。
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]) -> None:
+        """
+        :param keywords: 分类 -> 关键词列表，同一个关键词可以属于多个分类
+        """
+        self.keywords = {category: list(words) for category, words in keywords.items()}
+        goto = [{}]
+        outputs = [[]]
+        for category, words in self.keywords.items():
+            for word in words:
+                if not word:
+                    continue
+                state = 0
+                for ch in word:
+                    if ch not in goto[state]:
+                        goto.append({})
+                        outputs.append([])
+                        goto[state][ch] = len(goto) - 1
+                    state = goto[state][ch]
+                outputs[state].append((word, category))
+
+        # 按广度优先计算失败指针，并把失败路径上的转移和输出合并到每个状态
+        fail = [0] * len(goto)
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                queue.append(child)
+
+        self._delta = delta
+        self._outputs = [tuple(out) for out in outputs]
+        heads = "".join(re.escape(ch) for ch in goto[0])
+        self._head = re.compile(f"[{heads}]") if heads else None
+
+    def _scan(self, text: str):
+        """逐个产出 (结束位置, 该位置命中的关键词)"""
+        delta, outputs, head = self._delta, self._outputs, self._head
+        if head is None:
+            return
+        state, i, n = 0, 0, len(text)
+        while i < n:
+            if state == 0:
+                m = head.search(text, i)
+                if m is None:
+                    return
+                i = m.start()
+            state = delta[state].get(text[i], 0)
+            if outputs[state]:
+                yield i, outputs[state]
+            i += 1
+
+    def find_all(self, text: str) -> List[Hit]:
+        """一次扫描找出所有命中，按结束位置排序
+        :param text: 待匹配文本
+        """
+        hits = []
+        for end, found in self._scan(text):
+            for word, category in found:
+                hits.append(Hit(end - len(word) + 1, word, category))
+        return hits
+
+    def categories(self, text: str) -> Set[str]:
+        """文本命中的所有分类"""
+        return {hit.category for hit in self.find_all(text)}
+
+    def first(self, text: str, categories: Optional[Set[str]] = None) -> Optional[Hit]:
+        """第一个命中即返回，用于廉价的前置过滤
+        :param text: 待匹配文本
+        :param categories: 只关心的分类，为空时任意分类都算
+        """
+        for end, found in self._scan(text):
+            for word, category in found:
+                if categories is None or category in categories:
+                    return Hit(end - len(word) + 1, word, category)
+        return None
+
+
+# 股票相关内容的关键词，AI回复中出现任意一个才进行策略分析
+STRATEGY_KEYWORDS = ["股票", "买入", "卖出", "仓位", "价格", "止盈", "止损"]
+
+# 策略原文中的信号词，出自提示词中对各类策略的描述，命中任意一个才值得调用AI
+SIGNAL_KEYWORDS = [
+    "#大师实战演练", "操作建议", "选股理由", "建议数量",
+    "#加仓减仓", "建议加仓", "建议减仓", "加仓", "减仓",
+    "#止盈止损", "高抛", "兑现", "获利了结", "止盈", "止损",
+    "#持有", "耐心持股", "持股", "建仓", "清仓", "低吸", "仓位", "成仓",
+    "买入", "卖出", "交易价格", "目标价",
+]
+
+# 全局共享的匹配器
+matcher = KeywordMatcher({
+    "strategy": STRATEGY_KEYWORDS,
+    "signal": SIGNAL_KEYWORDS,
+    **ACTION_KEYWORDS,
+})
+
+# 调用AI之前的前置过滤：命中任意一个分类即放行
+GATE_CATEGORIES = {"strategy", "signal", *ACTION_KEYWORDS}
@@ -0,0 +1,201 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""消息归档
+
+把 RobotLogger 记录的私聊、群聊、图片和策略日志同时写入 SQLite（WAL 模式），
+消息内容、OCR文本和AI回复建立 FTS5 全文索引（trigram 分词，支持中文子串），
+可按发送者、群、股票代码和日期范围查询。
+
+用法: python -m plugin.message_archive [-q 关键词] [--code 002953] [--sender wxid] [--room roomid]
+                                       [--start 2024-01-01] [--end 2024-01-31] [--kind group_chat]
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+_CODE = re.compile(r"(?<!\d)([0368]\d{5})(?!\d)")
+
+COLUMNS = ("time", "kind", "room", "sender", "content", "ocr_text", "ai_response", "image_path", "extra")
+
+
+def stock_codes(row: dict) -> List[str]:
+    """记录中提到的A股代码"""
+    codes = set()
+    for field in ("content", "ocr_text", "ai_response"):
+        codes.update(_CODE.findall(row.get(field) or ""))
+    code = (row.get("extra") or {}).get("stock_code") if isinstance(row.get("extra"), dict) else None
+    if code:
+        codes.add(str(code))
+    return sorted(codes)
+
+
+class MessageArchive:
+    """消息归档库"""
+
+    def __init__(self, path: str = "logs/archive.db") -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        # 由日志写入线程批量写入，查询可能来自其他线程
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY,
+                time TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                room TEXT,
+                sender TEXT,
+                content TEXT,
+                ocr_text TEXT,
+                ai_response TEXT,
+                image_path TEXT,
+                extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS messages_time ON messages (time);
+            CREATE INDEX IF NOT EXISTS messages_sender ON messages (sender, time);
+            CREATE INDEX IF NOT EXISTS messages_room ON messages (room, time);
+            CREATE TABLE IF NOT EXISTS message_stocks (
+                code TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                PRIMARY KEY (code, message_id)
+            ) WITHOUT ROWID;
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content, ocr_text, ai_response, content='messages', content_rowid='id', tokenize='trigram'
+            );
+        """)
+
+    @classmethod
+    def from_config(cls, conf: dict) -> Optional["MessageArchive"]:
+        """按配置创建，未启用时返回 None
+        :param conf: config.yaml 中的 archive 配置
+        """
+        conf = conf or {}
+        if not conf.get("enable", False):
+            return None
+        try:
+            return cls(conf.get("path", "logs/archive.db"))
+        except sqlite3.Error as e:
+            # 旧版本 SQLite 不支持 FTS5 或 trigram 分词
+            print(f"[消息归档] 初始化失败: {str(e)}")
+            return None
+
+    def insert_many(self, rows: Iterable[dict]) -> int:
+        """在一个事务中批量写入
+        :param rows: 每条包含 COLUMNS 中的字段，缺少的为空；extra 为字典时保存为 JSON
+        :return: 写入的条数
+        """
+        count = 0
+        with self._lock:
+            cursor = self._db.cursor()
+            cursor.execute("BEGIN")
+            try:
+                for row in rows:
+                    values = [row.get(column) for column in COLUMNS]
+                    extra = row.get("extra")
+                    if extra is not None and not isinstance(extra, str):
+                        values[-1] = json.dumps(extra, ensure_ascii=False)
+                    cursor.execute(f"INSERT INTO messages ({', '.join(COLUMNS)}) "
+                                   f"VALUES ({', '.join('?' * len(COLUMNS))})", values)
+                    message_id = cursor.lastrowid
+                    cursor.execute("INSERT INTO messages_fts (rowid, content, ocr_text, ai_response) VALUES (?, ?, ?, ?)",
+                                   (message_id, row.get("content"), row.get("ocr_text"), row.get("ai_response")))
+                    cursor.executemany("INSERT OR IGNORE INTO message_stocks (code, message_id) VALUES (?, ?)",
+                                       [(code, message_id) for code in stock_codes(row)])
+                    count += 1
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        return count
+
+    def search(self, text: str = None, sender: str = None, room: str = None, stock_code: str = None,
+               start: str = None, end: str = None, kind: str = None, limit: int = 50) -> List[Dict]:
+        """查询归档，条件之间为“且”，按时间倒序
+        :param text: 在消息内容、OCR文本、AI回复中搜索的关键词
+        :param sender: 发送者ID
+        :param room: 群ID
+        :param stock_code: 提到的股票代码
+        :param start: 起始日期或时间（含），如 2024-01-01
+        :param end: 结束日期或时间（含）
+        :param kind: 记录类型：private_chat、group_chat、private_image、group_image、strategy
+        :param limit: 最多返回的条数
+        """
+        conditions, params = [], []
+        if text:
+            if len(text) >= 3:
+                # trigram 分词要求关键词至少3个字符，整体作为短语匹配
+                conditions.append("m.id IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+                params.append('"' + text.replace('"', '""') + '"')
+            else:
+                conditions.append("(m.content LIKE ? OR m.ocr_text LIKE ? OR m.ai_response LIKE ?)")
+                params.extend([f"%{text}%"] * 3)
+        if stock_code:
+            conditions.append("m.id IN (SELECT message_id FROM message_stocks WHERE code = ?)")
+            params.append(stock_code)
+        for column, value in (("sender", sender), ("room", room), ("kind", kind)):
+            if value:
+                conditions.append(f"m.{column} = ?")
+                params.append(value)
+        if start:
+            conditions.append("m.time >= ?")
+            params.append(start)
+        if end:
+            conditions.append("m.time <= ?")
+            params.append(end + " 23:59:59" if len(end) == 10 else end)
+
+        sql = "SELECT m.* FROM messages m"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY m.time DESC, m.id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params).fetchall()]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询消息归档")
+    parser.add_argument("--db", default="logs/archive.db", help="归档数据库路径")
+    parser.add_argument("-q", "--query", help="关键词")
+    parser.add_argument("--code", help="股票代码")
+    parser.add_argument("--sender", help="发送者ID")
+    parser.add_argument("--room", help="群ID")
+    parser.add_argument("--kind", help="记录类型")
+    parser.add_argument("--start", help="起始日期，如 2024-01-01")
+    parser.add_argument("--end", help="结束日期")
+    parser.add_argument("--limit", type=int, default=50, help="最多显示的条数")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"[消息归档] 数据库不存在: {args.db}")
+        return
+    archive = MessageArchive(args.db)
+    rows = archive.search(args.query, args.sender, args.room, args.code, args.start, args.end, args.kind, args.limit)
+    for row in rows:
+        where = f"群 {row['room']} " if row["room"] else ""
+        print(f"=== {row['time']} [{row['kind']}] {where}发送者 {row['sender']} ===")
+        for label, field in (("消息内容", "content"), ("OCR文本", "ocr_text"), ("AI回复", "ai_response")):
+            if row[field]:
+                print(f"{label}:\n{row[field]}")
+        print()
+    print(f"[消息归档] 共 {len(rows)} 条，库中共 {archive.count()} 条")
+
+
+if __name__ == "__main__":
+    main()
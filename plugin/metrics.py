@@ -0,0 +1,356 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""运行指标
+
+计数器、仪表和直方图保存在进程内，启用后由本地 HTTP 服务以 Prometheus 文本格式输出：
+    metrics:
+      enable: true
+      host: 127.0.0.1
+      port: 9108
+
+    curl http://127.0.0.1:9108/metrics
+
+队列长度、对话数等随时变化的值注册为采集函数，抓取时才计算。
+未启用时记录函数只多一次属性判断。
+"""
+
+import abc
+import bisect
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 秒，覆盖从本地处理到大模型长回复
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+MESSAGE_TYPES = {0x01: "text", 0x03: "image", 34: "voice", 37: "friend_request", 43: "video", 47: "emoji",
+                 49: "app", 10000: "system"}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(abc.ABC):
+    """按标签值分组保存的指标"""
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Prometheus 文本格式的样本行"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """当前值，可以直接设置，也可以注册抓取时调用的采集函数"""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels) -> None:
+        """注册采集函数，同一组标签重复注册时覆盖"""
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, function in functions:
+            try:
+                values[key] = float(function())
+            except Exception:
+                # 采集失败时不输出该组标签，其余指标照常
+                values.pop(key, None)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class _Timer:
+    """计时上下文管理器"""
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: dict) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """分桶统计耗时等分布"""
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 各桶计数（不累计）、总和、次数
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, **labels) -> _Timer:
+        """with histogram.time(backend="ChatGPT"): ..."""
+        return _Timer(self, labels)
+
+    def timed(self, **labels):
+        """装饰器：记录每次调用的耗时，标签固定"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.registry.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.metrics: Dict[str, _Metric] = {}
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        if name not in self.metrics:
+            self.metrics[name] = cls(self, name, documentation, labelnames, **kwargs)
+        return self.metrics[name]
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+    def configure(self, conf: dict) -> None:
+        """按配置启用指标并启动 HTTP 服务
+        :param conf: config.yaml 中的 metrics 配置
+        """
+        conf = conf or {}
+        self.enabled = bool(conf.get("enable", False))
+        if not self.enabled or self.server is not None:
+            return
+        host, port = conf.get("host", "127.0.0.1"), int(conf.get("port", 9108))
+        try:
+            self.server = ThreadingHTTPServer((host, port), _handler(self))
+        except OSError as e:
+            print(f"[运行指标] 无法监听 {host}:{port}: {str(e)}")
+            return
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True).start()
+        print(f"[运行指标] 已启动: http://{host}:{port}/metrics")
+
+    def shutdown(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def _handler(registry: Registry):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            # 抓取请求很频繁，不打印访问日志
+            pass
+
+    return MetricsHandler
+
+
+registry = Registry()
+
+MESSAGES_RECEIVED = registry.counter("robot_messages_received_total", "收到的消息数", ["type", "chat"])
+MESSAGES_PROCESSED = registry.counter("robot_messages_processed_total", "处理完成的消息数", ["type", "chat", "result"])
+MESSAGE_SECONDS = registry.histogram("robot_message_processing_seconds", "单条消息处理耗时", ["type"])
+MESSAGES_SENT = registry.counter("robot_messages_sent_total", "发送的消息数，静默模式只记录不发送", ["mode"])
+SEND_RATE_LIMITED = registry.counter("robot_send_rate_limited_total", "超过每分钟发送上限而未发送的消息数")
+LLM_SECONDS = registry.histogram("robot_llm_request_seconds", "大模型请求耗时", ["backend"])
+LLM_FAILURES = registry.counter("robot_llm_failures_total", "大模型未返回回复的次数", ["backend"])
+LLM_PROMPT_TOKENS = registry.counter("robot_llm_prompt_tokens_total", "提示词 token 数", ["backend"])
+LLM_CACHED_TOKENS = registry.counter("robot_llm_cached_tokens_total", "命中前缀缓存的提示词 token 数", ["backend"])
+AI_SKIPPED = registry.counter("robot_ai_skipped_total", "未调用大模型直接得出结果的消息数", ["reason"])
+OCR_SECONDS = registry.histogram("robot_ocr_seconds", "图片文字识别耗时", ["backend"])
+STRATEGY_API_SECONDS = registry.histogram("robot_strategy_api_seconds", "策略接口请求耗时", ["method", "endpoint"])
+STRATEGY_API_ERRORS = registry.counter("robot_strategy_api_errors_total", "策略接口失败次数",
+                                       ["method", "endpoint", "reason"])
+QUEUE_DEPTH = registry.gauge("robot_queue_depth", "排队中的条数", ["queue"])
+QUEUE_LAG = registry.gauge("robot_queue_lag_seconds", "最早一条排队记录已等待的秒数", ["queue"])
+CONVERSATIONS = registry.gauge("robot_conversations", "内存中保存的对话数", ["backend"])
+
+
+def message_type(msg) -> str:
+    return MESSAGE_TYPES.get(msg.type, str(msg.type))
+
+
+def track_message(func):
+    """装饰 processMsg：按消息类型统计收到、处理完成（成功或异常）的条数和处理耗时"""
+    @wraps(func)
+    def wrapper(self, msg, *args, **kwargs):
+        if not registry.enabled:
+            return func(self, msg, *args, **kwargs)
+        kind = message_type(msg)
+        chat = "group" if msg.from_group() else "private"
+        MESSAGES_RECEIVED.inc(type=kind, chat=chat)
+        result = "error"
+        start = time.perf_counter()
+        try:
+            value = func(self, msg, *args, **kwargs)
+            result = "ok"
+            return value
+        finally:
+            MESSAGE_SECONDS.observe(time.perf_counter() - start, type=kind)
+            MESSAGES_PROCESSED.inc(type=kind, chat=chat, result=result)
+    return wrapper
+
+
+_last_usage: Dict[str, dict] = {}
+
+
+def observe_usage(chat) -> None:
+    """记录模型最近一次请求的提示词和缓存命中 token 数，缓存命中率 = cached / prompt"""
+    usage = getattr(chat, "last_usage", None)
+    if not registry.enabled or not usage:
+        return
+    backend = chat.__class__.__name__
+    if _last_usage.get(backend) is usage:
+        # 请求失败时 last_usage 仍是上一次的，不重复计数
+        return
+    _last_usage[backend] = usage
+    LLM_PROMPT_TOKENS.inc(usage.get("prompt_tokens", 0), backend=backend)
+    LLM_CACHED_TOKENS.inc(usage.get("cached_tokens", 0), backend=backend)
+
+
+# 各模型保存对话的属性，ZhiPu 的属性名与其他模型不同
+CONVERSATION_STORES = {
+    "ChatGPT": "conversation_list",
+    "ChatGLM": "conversation_list",
+    "Ollama": "conversation_list",
+    "ZhiPu": "converstion_list",
+}
+
+
+def watch_conversations(chat) -> None:
+    """注册模型对话数的采集函数
+    多模型路由（ChatRouter）本身不保存对话，逐个注册它的各个后端；模型不保存对话时忽略
+    """
+    if chat is None:
+        return
+    providers = getattr(chat, "providers", None)
+    for backend in (providers.values() if providers else [chat]):
+        name = backend.__class__.__name__
+        store = CONVERSATION_STORES.get(name)
+        if store and hasattr(backend, store):
+            CONVERSATIONS.set_function(lambda b=backend, s=store: len(getattr(b, s)), backend=name)
+
+
+configure = registry.configure
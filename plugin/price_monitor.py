@@ -0,0 +1,266 @@
+import abc
+import csv
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from plugin.strategy_index import StrategyIndex
+
+# 触发类型
+ENTRY = 0  # 价格进入 price_min-price_max 区间
+STOP_LOSS = 1  # 价格跌破止损价
+TAKE_PROFIT = 2  # 价格突破止盈价
+KIND_TEXT = {ENTRY: "进入交易区间", STOP_LOSS: "触及止损", TAKE_PROFIT: "触及止盈"}
+
+ACTION_TEXT = {"buy": "买入", "sell": "卖出", "add": "加仓", "reduce": "减仓", "hold": "持有"}
+
+Tick = Tuple[str, float]  # (股票代码, 最新价)
+
+
+class Alert(NamedTuple):
+    """一次价格触发"""
+    strategy_id: Optional[int]
+    stock_name: str
+    stock_code: str
+    action: str
+    kind: int
+    price: float
+    level: float  # 触发的价位：区间触发时为区间下沿
+
+    def message(self) -> str:
+        action = ACTION_TEXT.get(self.action, self.action)
+        if self.kind == ENTRY:
+            detail = f"现价 {self.price} 元，已进入{action}区间"
+        else:
+            detail = f"现价 {self.price} 元，{KIND_TEXT[self.kind]} {self.level} 元"
+        return f"【价格提醒】{self.stock_name}（{self.stock_code}）{action}策略\n{detail}"
+
+
+class StrategyTable:
+    """活跃策略的列式存储，每个字段一个 NumPy 数组，缺失的价格为 NaN"""
+
+    def __init__(self, strategies: Iterable = ()) -> None:
+        strategies = list(strategies)
+        self.strategies = strategies
+        self.code_index: Dict[str, int] = {}
+        code_ids = []
+        for s in strategies:
+            code_ids.append(self.code_index.setdefault(s.stock_code, len(self.code_index)))
+        self.code_ids = np.array(code_ids, dtype=np.int64)
+
+        def column(field: str) -> np.ndarray:
+            return np.array([np.nan if getattr(s, field) is None else float(getattr(s, field))
+                             for s in strategies], dtype=np.float64)
+
+        self.price_min = column("price_min")
+        self.price_max = column("price_max")
+        self.stop_loss = column("stop_loss_price")
+        self.take_profit = column("take_profit_price")
+        # 只给出单边价格时，另一边视为不限
+        self.price_min = np.where(np.isnan(self.price_min) & ~np.isnan(self.price_max), 0.0, self.price_min)
+        self.price_max = np.where(np.isnan(self.price_max) & ~np.isnan(self.price_min), np.inf, self.price_max)
+
+    def __len__(self) -> int:
+        return len(self.strategies)
+
+
+def _band(s) -> Optional[Tuple[float, float]]:
+    """策略的交易区间，只给出单边价格时另一边视为不限，都没有时为 None"""
+    if s.price_min is None and s.price_max is None:
+        return None
+    return (0.0 if s.price_min is None else s.price_min,
+            float("inf") if s.price_max is None else s.price_max)
+
+
+class PriceMonitor:
+    """价格触发引擎
+
+    不传 index 时，每批行情只做一次向量化计算，同时判断所有策略的入场、止损、止盈条件。
+    传入 StrategyIndex 时，每条行情只按该股票查询索引：区间树找出覆盖现价的策略，
+    有序价位找出与上一次价格之间被穿越的止损、止盈，不扫描其他策略。
+    同一策略的同一类触发只提醒一次，价格离开触发条件后才会再次提醒。
+    """
+
+    def __init__(self, notify: Callable[[Alert], None], index: StrategyIndex = None) -> None:
+        """
+        :param notify: 触发时的回调，如发送微信或短信
+        :param index: 策略价格索引，由 StrategyManager 增量维护，不传时使用向量化计算
+        """
+        self.notify = notify
+        self.index = index
+        self._lock = threading.Lock()
+        self._code_prices: Dict[str, float] = {}  # 使用索引时每只股票的上一次价格
+        self.table = StrategyTable()
+        self.fired = np.zeros((0, 3), dtype=bool)
+        self.last_price = np.zeros(0)
+        self.ticks = 0
+        self.last_eval_seconds = 0.0
+
+    def load(self, strategies: Iterable) -> None:
+        """重新加载活跃策略，已提醒过的状态按策略ID保留，最新价按股票代码保留
+        使用索引时重建索引，新出现的策略在下次行情时按现价完整判断
+        """
+        if self.index is not None:
+            self.index.load(strategies)
+            return
+        table = StrategyTable(strategies)
+        fired = np.zeros((len(table), 3), dtype=bool)
+        last_price = np.full(len(table.code_index), np.nan)
+        with self._lock:
+            old = getattr(self, "table", None)
+            if old is not None and len(old):
+                previous = {s.id: i for i, s in enumerate(old.strategies) if s.id is not None}
+                for i, s in enumerate(table.strategies):
+                    j = previous.get(s.id)
+                    if j is not None:
+                        fired[i] = self.fired[j]
+                for code, i in table.code_index.items():
+                    j = old.code_index.get(code)
+                    if j is not None:
+                        last_price[i] = self.last_price[j]
+            self.table = table
+            self.fired = fired
+            self.last_price = last_price
+
+    def on_ticks(self, ticks: Iterable[Tick]) -> List[Alert]:
+        """处理一批行情
+        :param ticks: [(股票代码, 最新价)]
+        :return: 本批新产生的提醒
+        """
+        with self._lock:
+            alerts = self._evaluate(ticks) if self.index is None else self._evaluate_indexed(ticks)
+
+        for alert in alerts:
+            try:
+                self.notify(alert)
+            except Exception as e:
+                print(f"[价格监控] 发送提醒失败: {str(e)}")
+        return alerts
+
+    def _evaluate(self, ticks: Iterable[Tick]) -> List[Alert]:
+        table = self.table
+        if not len(table):
+            return []
+        start = time.perf_counter()
+        code_index, last_price = table.code_index, self.last_price
+        for code, price in ticks:
+            i = code_index.get(code)
+            if i is not None:
+                last_price[i] = price
+            self.ticks += 1
+
+        prices = last_price[table.code_ids]
+        # NaN 参与比较结果均为 False，没有行情或未设置价格的策略不会触发
+        with np.errstate(invalid="ignore"):
+            conditions = np.column_stack((
+                (prices >= table.price_min) & (prices <= table.price_max),
+                prices <= table.stop_loss,
+                prices >= table.take_profit,
+            ))
+        new = conditions & ~self.fired
+        # 已触发且条件仍满足的保持静默，条件消失后重新布防；还没有行情的策略保留原状态
+        self.fired = np.where(np.isnan(prices)[:, None], self.fired, conditions)
+        rows, kinds = np.nonzero(new)
+        self.last_eval_seconds = time.perf_counter() - start
+
+        levels = (table.price_min, table.stop_loss, table.take_profit)
+        alerts = []
+        for row, kind in zip(rows.tolist(), kinds.tolist()):
+            s = table.strategies[row]
+            alerts.append(Alert(s.id, s.stock_name, s.stock_code, s.action, kind,
+                                float(prices[row]), float(levels[kind][row])))
+        return alerts
+
+    def _evaluate_indexed(self, ticks: Iterable[Tick]) -> List[Alert]:
+        start = time.perf_counter()
+        index, alerts = self.index, []
+        for code, price in ticks:
+            self.ticks += 1
+            previous = self._code_prices.get(code)
+            self._code_prices[code] = price
+
+            def alert(s, kind: int, level: float) -> None:
+                alerts.append(Alert(s.id, s.stock_name, s.stock_code, s.action, kind, float(price), float(level)))
+
+            # 新加入的策略还没有比较基准，按现价完整判断一次
+            fresh = index.pop_fresh(code)
+            for s in fresh:
+                band = _band(s)
+                if band is not None and band[0] <= price <= band[1]:
+                    alert(s, ENTRY, band[0])
+                if s.stop_loss_price is not None and price <= s.stop_loss_price:
+                    alert(s, STOP_LOSS, s.stop_loss_price)
+                if s.take_profit_price is not None and price >= s.take_profit_price:
+                    alert(s, TAKE_PROFIT, s.take_profit_price)
+            skip = {s.id for s in fresh}
+
+            # 其余策略只在条件由不满足变为满足时提醒，第一次有行情时视为从不满足开始
+            for s in index.containing(code, price):
+                band = _band(s)
+                if s.id not in skip and (previous is None or not band[0] <= previous <= band[1]):
+                    alert(s, ENTRY, band[0])
+            for s in index.stops_crossed(code, float("inf") if previous is None else previous, price):
+                if s.id not in skip:
+                    alert(s, STOP_LOSS, s.stop_loss_price)
+            for s in index.take_profits_crossed(code, float("-inf") if previous is None else previous, price):
+                if s.id not in skip:
+                    alert(s, TAKE_PROFIT, s.take_profit_price)
+        self.last_eval_seconds = time.perf_counter() - start
+        return alerts
+
+    def run(self, feed: "PriceFeed", stop: threading.Event = None) -> None:
+        """持续从行情源读取并处理，直到行情结束或 stop 被设置"""
+        for batch in feed.batches():
+            if stop is not None and stop.is_set():
+                break
+            self.on_ticks(batch)
+
+    def start(self, feed: "PriceFeed") -> threading.Event:
+        """在后台线程运行，返回用于停止的事件"""
+        stop = threading.Event()
+        threading.Thread(target=self.run, args=(feed, stop), name="PriceMonitor", daemon=True).start()
+        return stop
+
+
+class PriceFeed(abc.ABC):
+    """行情源接口：按批产出 [(股票代码, 最新价)]"""
+
+    @abc.abstractmethod
+    def batches(self) -> Iterator[List[Tick]]:
+        pass
+
+
+class CsvReplayFeed(PriceFeed):
+    """从CSV回放行情，用于测试和复盘
+
+    CSV 需包含 code、price 列，可选 time 列；time 相同的行作为同一批，没有 time 列时按 batch_size 分批。
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, interval: float = 0.0) -> None:
+        """
+        :param path: CSV 文件路径
+        :param batch_size: 没有 time 列时每批的行数
+        :param interval: 每批之间的间隔秒数，0 表示尽快回放
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+
+    def batches(self) -> Iterator[List[Tick]]:
+        with open(self.path, encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            has_time = "time" in (reader.fieldnames or [])
+            batch, batch_time = [], None
+            for row in reader:
+                row_time = row["time"] if has_time else None
+                if batch and (row_time != batch_time if has_time else len(batch) >= self.batch_size):
+                    yield batch
+                    batch = []
+                    if self.interval:
+                        time.sleep(self.interval)
+                batch_time = row_time
+                batch.append((row["code"].strip(), float(row["price"])))
+            if batch:
+                yield batch
@@ -0,0 +1,146 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""采样性能分析
+
+后台线程按固定间隔读取所有线程当前的调用栈（sys._current_frames），按栈计数，
+结束后写入 logs/profiles/profile_YYYYmmdd_HHMMSS.folded（collapsed stack 格式，每行“栈 次数”），
+可直接用 flamegraph.pl、speedscope 或 inferno 生成火焰图。
+
+采样的是挂钟时间，等待网络和锁的线程同样计入，适合查看消息处理各环节的耗时分布。
+同一时间只运行一次分析，时长有上限，不同栈的数量有上限，不需要重启机器人。
+
+控制命令（给文件传输助手发送）:
+    ^性能分析$        采样默认时长
+    ^性能分析 60$     采样 60 秒
+    ^停止分析$        提前结束并写入文件
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+PROFILE_COMMAND = re.compile(r"^\^性能分析(?:\s+(\d+))?\$$")
+STOP_COMMAND = "^停止分析$"
+
+
+class SamplingProfiler:
+    """采样分析器"""
+
+    def __init__(self, output_dir: str = "logs/profiles", interval: float = 0.01, default_seconds: int = 30,
+                 max_seconds: int = 600, max_depth: int = 128, max_stacks: int = 50000) -> None:
+        """
+        :param output_dir: 结果目录
+        :param interval: 采样间隔秒数
+        :param default_seconds: 未指定时长时的采样秒数
+        :param max_seconds: 单次采样的最长秒数
+        :param max_depth: 每个栈最多记录的层数，更深的部分截断
+        :param max_stacks: 最多记录的不同栈数量，超过后计入 [其他]
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._labels = {}  # code 对象 -> 栈帧名称，避免每次采样重复格式化
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: int = None, on_done: Callable[[str, int], None] = None) -> Tuple[bool, str]:
+        """开始采样
+        :param seconds: 采样秒数，超过上限时按上限
+        :param on_done: 结束后在采样线程中调用，参数为结果文件路径和采样次数
+        :return: (是否开始, 提示信息)
+        """
+        seconds = min(max(int(seconds or self.default_seconds), 1), self.max_seconds)
+        with self._lock:
+            if self.running:
+                return False, "性能分析正在进行中"
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(seconds, on_done), name="Profiler", daemon=True)
+            self._thread.start()
+        return True, f"开始性能分析，采样 {seconds} 秒，间隔 {self.interval * 1000:.0f} 毫秒"
+
+    def stop(self) -> Tuple[bool, str]:
+        """提前结束采样，结果照常写入"""
+        if not self.running:
+            return False, "没有正在进行的性能分析"
+        self._stop.set()
+        return True, "正在结束性能分析"
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            if len(self._labels) < 100000:
+                self._labels[code] = label
+        return label
+
+    def _sample(self, stacks: Counter, own_id: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            if frame is not None:
+                labels.append("[截断]")
+            labels.append(names.get(thread_id, f"thread-{thread_id}"))
+            stack = ";".join(reversed(labels))
+            if stack not in stacks and len(stacks) >= self.max_stacks:
+                stack = names.get(thread_id, f"thread-{thread_id}") + ";[其他]"
+            stacks[stack] += 1
+
+    def _run(self, seconds: int, on_done: Optional[Callable[[str, int], None]]) -> None:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+        next_sample = time.monotonic()
+        try:
+            while not self._stop.is_set() and time.monotonic() < deadline:
+                self._sample(stacks, own_id)
+                samples += 1
+                # 按固定节拍采样，采样本身的耗时不累积到间隔里
+                next_sample += self.interval
+                delay = next_sample - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+                else:
+                    next_sample = time.monotonic()
+            path = self._write(stacks)
+            print(f"[性能分析] 完成，采样 {samples} 次，{len(stacks)} 个不同的栈: {path}")
+        except Exception as e:
+            print(f"[性能分析] 出错: {str(e)}")
+            return
+        finally:
+            self._labels.clear()
+        if on_done is not None:
+            try:
+                on_done(path, samples)
+            except Exception as e:
+                print(f"[性能分析] 回调出错: {str(e)}")
+
+    def _write(self, stacks: Counter) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,215 @@
+import glob
+import json
+import math
+import os
+import random
+import re
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+# 训练数据中助手回复为该值的样本视为无关
+IRRELEVANT_ANSWER = "无相关信息"
+
+_SPACES = re.compile(r"\s+")
+
+
+def _features(text: str, ngram: int) -> dict:
+    """字符 1..ngram 元组特征，取值按文本长度归一化"""
+    text = _SPACES.sub("", text)
+    grams = set()
+    for n in range(1, ngram + 1):
+        for i in range(len(text) - n + 1):
+            grams.add(text[i:i + n])
+    if not grams:
+        return {}
+    value = 1.0 / math.sqrt(len(grams))
+    return dict.fromkeys(grams, value)
+
+
+def load_training_samples(training_dir: str) -> List[Tuple[str, bool]]:
+    """读取 training/ 下的标注数据
+    :param training_dir: 训练数据目录，*.jsonl 每行一条对话，*.json 为对话数组
+    :return: [(用户消息, 是否相关)]，按用户消息去重
+    """
+    conversations = []
+    for path in sorted(glob.glob(os.path.join(training_dir, "*.jsonl"))):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    conversations.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"[相关性分类] 跳过无法解析的行: {path}")
+    for path in sorted(glob.glob(os.path.join(training_dir, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            print(f"[相关性分类] 跳过无法解析的文件: {path}")
+            continue
+        if isinstance(data, list):
+            conversations.extend(data)
+
+    samples = {}
+    for conversation in conversations:
+        messages = conversation.get("messages", []) if isinstance(conversation, dict) else []
+        user = next((m["content"] for m in messages if m.get("role") == "user"), None)
+        answer = next((m["content"] for m in messages if m.get("role") == "assistant"), None)
+        if user and answer is not None:
+            samples[user] = answer.strip() != IRRELEVANT_ANSWER
+    return list(samples.items())
+
+
+class RelevanceClassifier:
+    """调用AI之前的相关性分类器
+
+    字符 n 元组特征的逻辑回归，用 training/ 下的标注数据训练：助手回复"无相关信息"的为负样本。
+    影子模式下只记录判断结果，不跳过消息，用AI的实际回复统计召回率，确认阈值后再正式启用。
+    """
+
+    def __init__(self, ngram: int = 3, threshold: float = 0.5, shadow: bool = True) -> None:
+        """
+        :param ngram: 最长的字符 n 元组
+        :param threshold: 相关概率低于该值的消息跳过AI
+        :param shadow: 影子模式，只统计不跳过
+        """
+        self.ngram = ngram
+        self.threshold = threshold
+        self.shadow = shadow
+        self.weights = {}
+        self.bias = 0.0
+        self._lock = threading.Lock()
+        # 影子模式统计：按AI实际回复划分的 真/假 阳性、阴性
+        self.counts = {"tp": 0, "fn": 0, "fp": 0, "tn": 0}
+
+    @classmethod
+    def from_config(cls, conf: dict, training_dir: str = "training") -> Optional["RelevanceClassifier"]:
+        """按配置创建：有已保存的模型就直接加载，否则用训练数据现场训练
+        :param conf: config.yaml 中的 prefilter 配置
+        :param training_dir: 训练数据目录
+        """
+        if not conf.get("classifier", False):
+            return None
+        classifier = cls(threshold=float(conf.get("threshold", 0.5)), shadow=conf.get("shadow", True))
+        model_path = conf.get("model_path")
+        if model_path and os.path.exists(model_path):
+            classifier.load(model_path)
+            return classifier
+
+        samples = load_training_samples(training_dir)
+        if not samples or all(label for _, label in samples) or not any(label for _, label in samples):
+            print(f"[相关性分类] 训练数据不足，不启用分类器: {training_dir}")
+            return None
+        classifier.fit(samples)
+        if model_path:
+            classifier.save(model_path)
+        return classifier
+
+    def fit(self, samples: Iterable[Tuple[str, bool]], epochs: int = 60, lr: float = 0.5, l2: float = 1e-4) -> None:
+        """随机梯度下降训练
+        :param samples: [(文本, 是否相关)]
+        """
+        data = [(_features(text, self.ngram), 1.0 if label else 0.0) for text, label in samples]
+        positives = sum(label for _, label in data)
+        # 按类别比例加权，避免样本不均衡时偏向多数类
+        class_weight = {1.0: len(data) / (2 * positives), 0.0: len(data) / (2 * (len(data) - positives))}
+        weights, bias = {}, 0.0
+        rng = random.Random(0)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            step = lr / (1 + epoch * 0.1)
+            for features, label in data:
+                z = bias + sum(weights.get(k, 0.0) * v for k, v in features.items())
+                grad = (_sigmoid(z) - label) * class_weight[label]
+                for k, v in features.items():
+                    w = weights.get(k, 0.0)
+                    weights[k] = w - step * (grad * v + l2 * w)
+                bias -= step * grad
+        self.weights, self.bias = weights, bias
+        print(f"[相关性分类] 训练完成: {len(data)} 条样本，{len(weights)} 个特征")
+
+    def predict_proba(self, text: str) -> float:
+        """文本与股票策略相关的概率"""
+        weights = self.weights
+        z = self.bias + sum(weights.get(k, 0.0) * v for k, v in _features(text, self.ngram).items())
+        return _sigmoid(z)
+
+    def is_relevant(self, text: str) -> Tuple[bool, float]:
+        """:return: (是否相关, 相关概率)"""
+        score = self.predict_proba(text)
+        return score >= self.threshold, score
+
+    def observe(self, text: str, relevant: bool) -> None:
+        """影子模式下用AI的实际回复校验分类结果
+        :param text: 消息文本
+        :param relevant: AI是否给出了策略（回复不是"无相关信息"）
+        """
+        predicted, _ = self.is_relevant(text)
+        key = ("tp" if predicted else "fn") if relevant else ("fp" if predicted else "tn")
+        with self._lock:
+            self.counts[key] += 1
+
+    def recall(self) -> Optional[float]:
+        """相关消息中被分类器放行的比例，没有样本时返回 None"""
+        with self._lock:
+            positives = self.counts["tp"] + self.counts["fn"]
+            return self.counts["tp"] / positives if positives else None
+
+    def stats(self) -> str:
+        with self._lock:
+            c = dict(self.counts)
+        recall = self.recall()
+        negatives = c["fp"] + c["tn"]
+        skipped = c["tn"] / negatives if negatives else None
+        return (f"相关性分类: 阈值 {self.threshold}, 召回率 {'-' if recall is None else f'{recall:.1%}'}, "
+                f"可跳过的无关消息 {'-' if skipped is None else f'{skipped:.1%}'}, 统计 {c}")
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"ngram": self.ngram, "bias": self.bias, "weights": self.weights}, f, ensure_ascii=False)
+        print(f"[相关性分类] 模型已保存: {path}")
+
+    def load(self, path: str) -> None:
+        with open(path, encoding="utf-8") as f:
+            model = json.load(f)
+        self.ngram = model["ngram"]
+        self.bias = model["bias"]
+        self.weights = model["weights"]
+        print(f"[相关性分类] 模型已加载: {path}")
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="训练并评估相关性分类器")
+    parser.add_argument("--training", default="training", help="训练数据目录")
+    parser.add_argument("--threshold", type=float, default=0.5, help="相关概率阈值")
+    parser.add_argument("--save", help="模型保存路径")
+    args = parser.parse_args()
+
+    samples = load_training_samples(args.training)
+    print(f"样本: {len(samples)} 条，其中相关 {sum(label for _, label in samples)} 条")
+
+    # 留一法评估召回率
+    evaluation = RelevanceClassifier(threshold=args.threshold)
+    for i, (text, label) in enumerate(samples):
+        evaluation.fit(samples[:i] + samples[i + 1:])
+        evaluation.observe(text, label)
+        print(f"{'相关' if label else '无关'} 概率 {evaluation.predict_proba(text):.3f} {text[:30]!r}")
+    print(evaluation.stats())
+
+    if args.save:
+        final = RelevanceClassifier(threshold=args.threshold)
+        final.fit(samples)
+        final.save(args.save)
@@ -1,30 +1,70 @@
+import atexit
 import os
 import json
+import queue
+import threading
 import time
 from datetime import datetime
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from typing import Dict, Optional, Any, List
 
+from plugin.strategy_log import INDEX_ENTRY, StrategyLogFile, migrate, truncate_partial_line
+
 class RobotLogger:
-    """机器人日志管理器，用于记录机器人处理的消息和结果"""
+    """机器人日志管理器，用于记录机器人处理的消息和结果
+
+    消息日志只在调用线程中入队，由一个后台线程批量写入：按天保持文件打开、跨过零点自动切换，
+    定期 fsync；队列满时丢弃并计数，不阻塞回复。
+    """
     
-    def __init__(self) -> None:
-        """初始化日志管理器"""
+    def __init__(self, max_queue: int = 10000, flush_interval: float = 0.5, fsync_interval: float = 5.0,
+                 archive=None) -> None:
+        """初始化日志管理器
+        :param max_queue: 队列最多缓存的日志条数，超出后丢弃
+        :param flush_interval: 空闲时写入线程的检查间隔秒数
+        :param fsync_interval: 两次 fsync 之间的最长间隔秒数
+        :param archive: 可选的 MessageArchive，日志同时批量写入归档库
+        """
         # 基本日志目录
         self.log_dir = os.path.abspath("logs")
         
         # 创建日志目录
         self._create_log_dirs()
         
-        # 配置标准Python日志
+        # 配置标准Python日志，robot.log 同样经队列由后台线程写入
         self.logger = logging.getLogger("RobotLogger")
         self.logger.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
-        
-        # 创建日志处理器
-        file_handler = logging.FileHandler(os.path.join(self.log_dir, "robot.log"))
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+        self._listener = None
+        if not self.logger.handlers:
+            formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+            
+            # 创建日志处理器
+            file_handler = logging.FileHandler(os.path.join(self.log_dir, "robot.log"))
+            file_handler.setFormatter(formatter)
+            self._listener = QueueListener(queue.Queue(), file_handler)
+            self.logger.addHandler(QueueHandler(self._listener.queue))
+            self._listener.start()
+
+        # 旧的 JSON 数组策略日志转换为 JSONL，须在写入线程打开文件之前完成
+        try:
+            migrate(os.path.join(self.log_dir, "strategies"))
+        except Exception as e:
+            self.logger.error(f"转换策略日志出错: {str(e)}")
+
+        # 消息日志写入线程
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.archive = archive
+        self.written = 0
+        self.dropped = 0
+        self._drop_lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._files = {}  # (子目录, 文件名前缀, 扩展名) -> (日期, 文件对象)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="RobotLogger", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
         
         self.logger.info("日志管理器初始化完成")
     
@@ -49,6 +89,146 @@ class RobotLogger:
         """
         today = datetime.now().strftime("%Y-%m-%d")
         return f"{prefix}_{today}.{extension}"
+
+    def _append(self, subdir: str, prefix: str, text: str, extension: str = "txt", archive_row: dict = None) -> None:
+        """日志入队，由写入线程追加到当天的文件
+        :param subdir: 日志子目录
+        :param prefix: 文件名前缀
+        :param text: 要追加的内容
+        :param extension: 文件扩展名
+        :param archive_row: 写入归档库的记录，未启用归档时忽略
+        """
+        # 日期在入队时确定，零点前后的日志写入各自的文件
+        record = (subdir, prefix, extension, datetime.now().strftime("%Y-%m-%d"), text,
+                  archive_row if self.archive is not None else None)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped % 100 == 1:
+                self.logger.warning(f"日志队列已满，已丢弃 {dropped} 条")
+
+    def _file(self, subdir: str, prefix: str, extension: str, date: str):
+        """取得某类日志当天的文件，跨过零点时关闭前一天的文件
+        jsonl 以二进制追加，便于记录每行的字节偏移；idx 为对应的偏移索引
+        """
+        key = (subdir, prefix, extension)
+        current = self._files.get(key)
+        if current and current[0] == date:
+            return current[1]
+        if current:
+            current[1].close()
+        path = os.path.join(self.log_dir, subdir, f"{prefix}_{date}.{extension}")
+        f = open(path, "ab") if extension in ("jsonl", "idx") else open(path, "a", encoding="utf-8")
+        self._files[key] = (date, f)
+        return f
+
+    def _write_jsonl(self, key: tuple, texts: List[str]) -> None:
+        """追加 JSONL 记录，数据写入后再追加每行的偏移索引"""
+        current = self._files.get(key[:3])
+        path = os.path.join(self.log_dir, key[0], f"{key[1]}_{key[3]}.jsonl")
+        if (not current or current[0] != key[3]) and os.path.exists(path):
+            # 上次退出时可能留下写了一半的行，截掉后再追加，否则新记录会接在残行后面无法解析
+            torn = truncate_partial_line(path)
+            if torn:
+                self.logger.warning(f"策略日志末尾有未写完整的行，已截掉 {torn} 字节: {path}")
+            # 索引可能落后于数据，先补齐再继续追加
+            StrategyLogFile(path).write_index()
+        f = self._file(*key)
+        offset = f.tell()
+        data = [text.encode("utf-8") for text in texts]
+        f.write(b"".join(data))
+        f.flush()
+
+        offsets = []
+        for line in data:
+            offsets.append(INDEX_ENTRY.pack(offset))
+            offset += len(line)
+        index = self._file(key[0], key[1], "idx", key[3])
+        index.write(b"".join(offsets))
+        index.flush()
+
+    def _close_stale(self) -> None:
+        """空闲时关闭前一天的文件"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        for key, (date, f) in list(self._files.items()):
+            if date != today:
+                f.close()
+                del self._files[key]
+
+    def _write_loop(self) -> None:
+        """写入线程：一次取出队列中积压的全部日志，按文件合并写入"""
+        last_sync, dirty = time.monotonic(), False
+        while True:
+            try:
+                records = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                records = []
+            while records and len(records) < 1000:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in records
+            batches, archive_rows = {}, []
+            for record in records:
+                if record is not None:
+                    batches.setdefault(record[:4], []).append(record[4])
+                    if record[5] is not None:
+                        archive_rows.append(record[5])
+            try:
+                for key, texts in batches.items():
+                    if key[2] == "jsonl":
+                        self._write_jsonl(key, texts)
+                        continue
+                    f = self._file(*key)
+                    f.write("".join(texts))
+                    f.flush()
+                self.written += len(records) - stop
+                dirty = dirty or bool(batches)
+                if dirty and (stop or time.monotonic() - last_sync >= self.fsync_interval):
+                    for _, f in self._files.values():
+                        os.fsync(f.fileno())
+                    last_sync, dirty = time.monotonic(), False
+                if not records:
+                    self._close_stale()
+            except Exception as e:
+                self.logger.error(f"写入日志出错: {str(e)}")
+
+            if archive_rows:
+                # 归档库每批一个事务
+                try:
+                    self.archive.insert_many(archive_rows)
+                except Exception as e:
+                    self.logger.error(f"写入归档库出错: {str(e)}")
+
+            if stop:
+                for _, f in self._files.values():
+                    f.close()
+                self._files.clear()
+                if self.archive is not None:
+                    self.archive.close()
+                return
+
+    def close(self, timeout: float = 5.0) -> None:
+        """写完队列中剩余的日志并关闭文件"""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._writer.join(timeout)
+        if self._listener is not None:
+            self._listener.stop()
+
+    def stats(self) -> Dict[str, int]:
+        """写入统计：已写入、排队中、已丢弃的条数"""
+        return {"written": self.written, "queued": self._queue.qsize(), "dropped": self.dropped}
     
     def log_private_chat(self, sender: str, content: str, ai_response: str) -> None:
         """记录私聊消息及回复
@@ -56,17 +236,16 @@ class RobotLogger:
         :param content: 消息内容
         :param ai_response: AI回复内容
         """
-        filename = self._get_date_filename("private_chat")
-        log_file = os.path.join(self.log_dir, "private_chat", filename)
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"=== {timestamp} ===\n")
-            f.write(f"发送者: {sender}\n")
-            f.write(f"消息内容:\n{content}\n")
-            f.write(f"AI回复:\n{ai_response}\n")
-            f.write("="*50 + "\n\n")
+        self._append("private_chat", "private_chat",
+                     f"=== {timestamp} ===\n"
+                     f"发送者: {sender}\n"
+                     f"消息内容:\n{content}\n"
+                     f"AI回复:\n{ai_response}\n"
+                     + "="*50 + "\n\n",
+                     archive_row={"time": timestamp, "kind": "private_chat", "sender": sender,
+                                  "content": content, "ai_response": ai_response})
         
         self.logger.info(f"已记录私聊消息 - 发送者: {sender}")
     
@@ -77,18 +256,17 @@ class RobotLogger:
         :param content: 消息内容
         :param ai_response: AI回复内容
         """
-        filename = self._get_date_filename("group_chat")
-        log_file = os.path.join(self.log_dir, "group_chat", filename)
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"=== {timestamp} ===\n")
-            f.write(f"群ID: {group_id}\n")
-            f.write(f"发送者: {sender}\n")
-            f.write(f"消息内容:\n{content}\n")
-            f.write(f"AI回复:\n{ai_response}\n")
-            f.write("="*50 + "\n\n")
+        self._append("group_chat", "group_chat",
+                     f"=== {timestamp} ===\n"
+                     f"群ID: {group_id}\n"
+                     f"发送者: {sender}\n"
+                     f"消息内容:\n{content}\n"
+                     f"AI回复:\n{ai_response}\n"
+                     + "="*50 + "\n\n",
+                     archive_row={"time": timestamp, "kind": "group_chat", "room": group_id, "sender": sender,
+                                  "content": content, "ai_response": ai_response})
         
         self.logger.info(f"已记录群聊消息 - 群ID: {group_id}, 发送者: {sender}")
     
@@ -99,18 +277,17 @@ class RobotLogger:
         :param ocr_text: OCR识别文本
         :param ai_response: AI回复内容
         """
-        filename = self._get_date_filename("private_images")
-        log_file = os.path.join(self.log_dir, "private_images", filename)
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"=== {timestamp} ===\n")
-            f.write(f"发送者: {sender}\n")
-            f.write(f"图片路径: {image_path}\n")
-            f.write(f"OCR文本:\n{ocr_text}\n")
-            f.write(f"AI回复:\n{ai_response}\n")
-            f.write("="*50 + "\n\n")
+        self._append("private_images", "private_images",
+                     f"=== {timestamp} ===\n"
+                     f"发送者: {sender}\n"
+                     f"图片路径: {image_path}\n"
+                     f"OCR文本:\n{ocr_text}\n"
+                     f"AI回复:\n{ai_response}\n"
+                     + "="*50 + "\n\n",
+                     archive_row={"time": timestamp, "kind": "private_image", "sender": sender,
+                                  "image_path": image_path, "ocr_text": ocr_text, "ai_response": ai_response})
         
         self.logger.info(f"已记录私聊图片消息 - 发送者: {sender}")
     
@@ -122,19 +299,18 @@ class RobotLogger:
         :param ocr_text: OCR识别文本
         :param ai_response: AI回复内容
         """
-        filename = self._get_date_filename("group_images")
-        log_file = os.path.join(self.log_dir, "group_images", filename)
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(f"=== {timestamp} ===\n")
-            f.write(f"群ID: {group_id}\n")
-            f.write(f"发送者: {sender}\n")
-            f.write(f"图片路径: {image_path}\n")
-            f.write(f"OCR文本:\n{ocr_text}\n")
-            f.write(f"AI回复:\n{ai_response}\n")
-            f.write("="*50 + "\n\n")
+        self._append("group_images", "group_images",
+                     f"=== {timestamp} ===\n"
+                     f"群ID: {group_id}\n"
+                     f"发送者: {sender}\n"
+                     f"图片路径: {image_path}\n"
+                     f"OCR文本:\n{ocr_text}\n"
+                     f"AI回复:\n{ai_response}\n"
+                     + "="*50 + "\n\n",
+                     archive_row={"time": timestamp, "kind": "group_image", "room": group_id, "sender": sender,
+                                  "image_path": image_path, "ocr_text": ocr_text, "ai_response": ai_response})
         
         self.logger.info(f"已记录群聊图片消息 - 群ID: {group_id}, 发送者: {sender}")
     
@@ -150,9 +326,6 @@ class RobotLogger:
         :param success: 策略处理是否成功
         :param message: 处理结果消息
         """
-        filename = self._get_date_filename("strategy", "json")
-        log_file = os.path.join(self.log_dir, "strategies", filename)
-        
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # 准备日志数据
@@ -168,25 +341,16 @@ class RobotLogger:
             "message": message
         }
         
-        # 读取现有数据
+        # 每条一行追加到当天的 JSONL，不再读取和改写整个文件
         try:
-            if os.path.exists(log_file) and os.path.getsize(log_file) > 0:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            else:
-                data = []
-        except Exception as e:
-            self.logger.error(f"读取策略日志出错: {str(e)}")
-            data = []
+            line = json.dumps(log_data, ensure_ascii=False) + "\n"
+        except (TypeError, ValueError) as e:
+            self.logger.error(f"序列化策略日志出错: {str(e)}")
+            return
+        self._append("strategies", "strategy", line, "jsonl",
+                     archive_row={"time": timestamp, "kind": "strategy",
+                                  "room": source_id if source_type == "群聊" else None, "sender": sender,
+                                  "content": content, "ai_response": ai_response,
+                                  "extra": {**(strategy or {}), "success": success, "message": message}})
         
-        # 添加新数据
-        data.append(log_data)
-        
-        # 写入文件
-        try:
-            with open(log_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            self.logger.info(f"已记录策略分析 - 类型: {source_type}, ID: {source_id}")
-        except Exception as e:
-            self.logger.error(f"写入策略日志出错: {str(e)}") 
\ No newline at end of file
+        self.logger.info(f"已记录策略分析 - 类型: {source_type}, ID: {source_id}")
@@ -159,53 +159,100 @@ class SmsSender:
                 return False
                 
             self.LOG.info(f"短信模板参数: {strategy}")
-                
-            # 构建请求对象
-            runtime = util_models.RuntimeOptions()
-            
-            # 确保所有参数都是字符串类型，并且使用正确的键名
-            template_params = {
-                "name": str(strategy.get("name", "")),
-                "code": str(strategy.get("code", "")),
-                "type": str(strategy.get("type", "")),
-                "low": str(strategy.get("low", "")),
-                "high": str(strategy.get("high", "")),
-                "ratio": str(strategy.get("ratio", ""))
-            }
-            
-            # 打印完整的参数内容
-            self.LOG.info(f"完整的模板参数: {template_params}")
-            param_json = json.dumps(template_params, ensure_ascii=False)
-            self.LOG.info(f"JSON格式的模板参数: {param_json}")
-            
-            send_req = dysmsapi_models.SendSmsRequest(
-                phone_numbers=phone,
-                sign_name=self.config.get("sign_name"),
-                template_code=self.config.get("template_code"),
-                template_param=param_json
-            )
-            
-            self.LOG.info(f"发送短信请求: phone={phone}, "
-                         f"sign={self.config.get('sign_name')}, "
-                         f"template={self.config.get('template_code')}, "
-                         f"params={param_json}")
-            
-            # 发送短信
-            result = self.client.send_sms_with_options(send_req, runtime)
-            success = result.body.code == "OK"
-            
-            if success:
-                self.LOG.info(f"短信发送成功: {result.body.message}")
-                self.LOG.info(f"短信发送状态: code={result.body.code}, message={result.body.message}, requestId={result.body.request_id}")
-            else:
-                self.LOG.error(f"短信发送失败: code={result.body.code}, message={result.body.message}")
-                
-            return success
+            return self._send_template(phone, strategy)
             
         except Exception as e:
             self.LOG.error(f"发送短信时发生错误: {str(e)}")
             return False
 
+    def send_price_alert(self, stock_name: str, stock_code: str, action: str, price: float) -> bool:
+        """发送价格触发提醒短信，复用策略短信模板
+        
+        Args:
+            stock_name: 股票名称
+            stock_code: 股票代码
+            action: 触发后的操作，如 买入、卖出、止损、止盈
+            price: 触发时的价格
+            
+        Returns:
+            bool: 发送是否成功
+        """
+        if not self.config.get("enabled", False):
+            self.LOG.info("短信功能未启用，跳过发送")
+            return False
+
+        try:
+            phone = self.config.get("phone_number")
+            if not phone or not re.match(r'^1[3-9]\d{9}$', phone):
+                self.LOG.error(f"手机号码格式错误: {phone}")
+                return False
+
+            action_map = {"买入": "启动", "加仓": "扩容", "卖出": "停止", "减仓": "缩容",
+                          "止损": "停止", "止盈": "停止"}
+            return self._send_template(phone, {
+                "name": stock_name,
+                "code": f"SRV{stock_code}",
+                "type": action_map.get(action, "维持"),
+                "low": price,
+                "high": price,
+                "ratio": "",
+            })
+        except Exception as e:
+            self.LOG.error(f"发送价格提醒短信时发生错误: {str(e)}")
+            return False
+
+    def _send_template(self, phone: str, strategy: dict) -> bool:
+        """按模板发送短信
+        
+        Args:
+            phone: 手机号
+            strategy: 模板参数
+            
+        Returns:
+            bool: 发送是否成功
+        """
+        # 构建请求对象
+        runtime = util_models.RuntimeOptions()
+        
+        # 确保所有参数都是字符串类型，并且使用正确的键名
+        template_params = {
+            "name": str(strategy.get("name", "")),
+            "code": str(strategy.get("code", "")),
+            "type": str(strategy.get("type", "")),
+            "low": str(strategy.get("low", "")),
+            "high": str(strategy.get("high", "")),
+            "ratio": str(strategy.get("ratio", ""))
+        }
+        
+        # 打印完整的参数内容
+        self.LOG.info(f"完整的模板参数: {template_params}")
+        param_json = json.dumps(template_params, ensure_ascii=False)
+        self.LOG.info(f"JSON格式的模板参数: {param_json}")
+        
+        send_req = dysmsapi_models.SendSmsRequest(
+            phone_numbers=phone,
+            sign_name=self.config.get("sign_name"),
+            template_code=self.config.get("template_code"),
+            template_param=param_json
+        )
+        
+        self.LOG.info(f"发送短信请求: phone={phone}, "
+                     f"sign={self.config.get('sign_name')}, "
+                     f"template={self.config.get('template_code')}, "
+                     f"params={param_json}")
+        
+        # 发送短信
+        result = self.client.send_sms_with_options(send_req, runtime)
+        success = result.body.code == "OK"
+        
+        if success:
+            self.LOG.info(f"短信发送成功: {result.body.message}")
+            self.LOG.info(f"短信发送状态: code={result.body.code}, message={result.body.message}, requestId={result.body.request_id}")
+        else:
+            self.LOG.error(f"短信发送失败: code={result.body.code}, message={result.body.message}")
+            
+        return success
+
     @staticmethod
     def value_check(conf: dict) -> bool:
         """检查配置是否有效
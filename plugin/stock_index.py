@@ -0,0 +1,248 @@
+import csv
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    from pypinyin import Style, lazy_pinyin
+    PINYIN_AVAILABLE = True
+except ImportError:
+    PINYIN_AVAILABLE = False
+
+# CSV 中可识别的列名
+CODE_COLUMNS = ("code", "symbol", "ts_code", "证券代码", "股票代码", "代码")
+NAME_COLUMNS = ("name", "证券简称", "股票简称", "股票名称", "名称", "简称")
+
+_CODE = re.compile(r"(?<!\d)(\d{6})(?!\d)")
+# 名称中常见的无意义字符，比较前去掉
+_NAME_NOISE = re.compile(r"[\s*＊]")
+
+
+class StockMatch(NamedTuple):
+    """文本中识别出的一只股票"""
+    start: int
+    code: str
+    name: str
+
+
+class _Trie:
+    """紧凑前缀树：节点为 [子节点字典, 股票代码]，不为每个节点创建对象"""
+
+    def __init__(self) -> None:
+        self.root = [{}, None]
+
+    def insert(self, key: str, code: str) -> None:
+        node = self.root
+        for ch in key:
+            node = node[0].setdefault(ch, [{}, None])
+        node[1] = code
+
+    def get(self, key: str) -> Optional[str]:
+        node = self.root
+        for ch in key:
+            node = node[0].get(ch)
+            if node is None:
+                return None
+        return node[1]
+
+    def longest_at(self, text: str, start: int) -> Tuple[int, Optional[str]]:
+        """从 start 开始能匹配的最长键：(结束位置, 股票代码)"""
+        node, end, code = self.root, start, None
+        for i in range(start, len(text)):
+            node = node[0].get(text[i])
+            if node is None:
+                break
+            if node[1] is not None:
+                end, code = i + 1, node[1]
+        return end, code
+
+    def prefix(self, key: str, limit: int = 10) -> List[str]:
+        """以 key 开头的股票代码"""
+        node = self.root
+        for ch in key:
+            node = node[0].get(ch)
+            if node is None:
+                return []
+        codes, stack = [], [node]
+        while stack and len(codes) < limit:
+            node = stack.pop()
+            if node[1] is not None:
+                codes.append(node[1])
+            stack.extend(node[0].values())
+        return codes
+
+    def fuzzy(self, key: str, max_distance: int) -> List[Tuple[int, str]]:
+        """编辑距离不超过 max_distance 的键，沿前缀树逐行计算距离，提前剪枝
+        :return: [(编辑距离, 股票代码)]，按距离升序
+        """
+        results = []
+        first_row = list(range(len(key) + 1))
+
+        def walk(node, ch, prev_row):
+            row = [prev_row[0] + 1]
+            for i in range(1, len(key) + 1):
+                cost = 0 if key[i - 1] == ch else 1
+                row.append(min(row[i - 1] + 1, prev_row[i] + 1, prev_row[i - 1] + cost))
+            if node[1] is not None and row[-1] <= max_distance:
+                results.append((row[-1], node[1]))
+            if min(row) <= max_distance:
+                for next_ch, child in node[0].items():
+                    walk(child, next_ch, row)
+
+        for ch, child in self.root[0].items():
+            walk(child, ch, first_row)
+        results.sort()
+        return results
+
+
+class StockIndex:
+    """A股证券代码表索引
+
+    名称、拼音首字母和代码各一棵前缀树，用于在本地识别文本中的股票、
+    纠正OCR造成的名称错误，并在调用接口前校验代码和名称是否对应。
+    """
+
+    def __init__(self) -> None:
+        self.names: Dict[str, str] = {}  # 代码 -> 名称，保留原样（如 *ST 前缀），用于显示和纠正
+        self._keys: Dict[str, str] = {}  # 代码 -> 规范化后的名称，只用于比较和查找
+        self._by_name = _Trie()
+        self._by_pinyin = _Trie()
+        self._by_code = _Trie()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        return _NAME_NOISE.sub("", name or "").upper()
+
+    def add(self, code: str, name: str) -> None:
+        # 兼容 600519、600519.SH、sh600519 等写法
+        m = _CODE.search(code)
+        key = self.normalize(name)
+        if not m or not key:
+            return
+        code = m.group(1)
+        self.names[code] = name.strip()
+        self._keys[code] = key
+        self._by_name.insert(key, code)
+        self._by_code.insert(code, code)
+        if PINYIN_AVAILABLE:
+            initials = "".join(lazy_pinyin(key, style=Style.FIRST_LETTER)).lower()
+            self._by_pinyin.insert(initials, code)
+
+    def load_csv(self, path: str) -> int:
+        """从CSV加载代码表，自动识别代码、名称列
+        :param path: CSV 文件路径，UTF-8 或 GBK 编码
+        :return: 加载的股票数量
+        """
+        for encoding in ("utf-8-sig", "gbk"):
+            try:
+                with open(path, encoding=encoding, newline="") as f:
+                    reader = csv.DictReader(f)
+                    fields = reader.fieldnames or []
+                    code_col = next((c for c in CODE_COLUMNS if c in fields), None)
+                    name_col = next((c for c in NAME_COLUMNS if c in fields), None)
+                    if not code_col or not name_col:
+                        print(f"[股票索引] CSV 缺少代码或名称列: {fields}")
+                        return 0
+                    before = len(self.names)
+                    for row in reader:
+                        self.add(row[code_col] or "", row[name_col] or "")
+                print(f"[股票索引] 已加载 {len(self.names) - before} 只股票: {path}")
+                return len(self.names) - before
+            except UnicodeDecodeError:
+                continue
+        print(f"[股票索引] 无法识别文件编码: {path}")
+        return 0
+
+    def name_of(self, code: str) -> Optional[str]:
+        return self.names.get(code)
+
+    def code_of(self, name: str) -> Optional[str]:
+        """按名称或拼音首字母查找代码"""
+        name = self.normalize(name)
+        return self._by_name.get(name) or self._by_pinyin.get(name.lower())
+
+    def search(self, prefix: str, limit: int = 10) -> List[Tuple[str, str]]:
+        """按代码、名称或拼音首字母前缀查找
+        :return: [(代码, 名称)]
+        """
+        key = self.normalize(prefix)
+        if key.isdigit():
+            codes = self._by_code.prefix(key, limit)
+        else:
+            codes = self._by_name.prefix(key, limit) or self._by_pinyin.prefix(key.lower(), limit)
+        return [(code, self.names[code]) for code in codes]
+
+    def fuzzy(self, name: str, max_distance: int = 1) -> List[Tuple[str, str]]:
+        """按编辑距离模糊匹配名称，用于纠正OCR识别错误
+        :return: [(代码, 名称)]，距离近的在前
+        """
+        return [(code, self.names[code]) for _, code in self._by_name.fuzzy(self.normalize(name), max_distance)]
+
+    def find_in_text(self, text: str) -> List[StockMatch]:
+        """找出文本中出现的所有股票：已知的6位代码和最长匹配的名称"""
+        found = {}
+        for m in _CODE.finditer(text):
+            code = m.group(1)
+            if code in self.names:
+                found.setdefault(code, StockMatch(m.start(), code, self.names[code]))
+
+        upper = text.upper()
+        i = 0
+        while i < len(upper):
+            end, code = self._by_name.longest_at(upper, i)
+            if code:
+                found.setdefault(code, StockMatch(i, code, self.names[code]))
+                i = end
+            else:
+                i += 1
+        return sorted(found.values())
+
+    def validate(self, code: Optional[str], name: Optional[str]) -> Tuple[bool, Optional[str], Optional[str]]:
+        """校验代码和名称是否对应，能纠正时返回纠正后的值，名称为代码表中的原样名称
+        :return: (是否有效, 代码, 名称)
+        """
+        known_key = self._keys.get(code) if code else None
+        if known_key:
+            known_name = self.names[code]
+            if not name or self.normalize(name) == known_key:
+                return True, code, known_name
+            # 名称被OCR识别错了几个字，以代码为准
+            if _distance(self.normalize(name), known_key) <= max(1, len(known_key) // 3):
+                return True, code, known_name
+
+        if name:
+            # 代码缺失或识别错误，以名称为准
+            matched = self.code_of(name)
+            if matched:
+                return True, matched, self.names[matched]
+            candidates = self.fuzzy(name)
+            if len(candidates) == 1:
+                return True, candidates[0][0], candidates[0][1]
+        return False, code, name
+
+
+def _distance(a: str, b: str) -> int:
+    """编辑距离"""
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+
+def load_stock_index(conf: dict) -> Optional[StockIndex]:
+    """按配置加载股票索引，未配置或文件不存在时返回 None
+    :param conf: config.yaml 中的 stock_index 配置
+    """
+    path = (conf or {}).get("path")
+    if not path:
+        return None
+    if not os.path.exists(path):
+        print(f"[股票索引] 代码表不存在: {path}")
+        return None
+    index = StockIndex()
+    return index if index.load_csv(path) else None
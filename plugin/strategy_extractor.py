@@ -0,0 +1,216 @@
+import re
+from typing import Optional
+
+# 所有正则在模块加载时编译一次，提取时不再经过 re 的缓存查找
+
+# 股票名称和代码，按优先级排列，与 StrategyManager.extract_stock_info 一致
+_STOCK_PATTERNS = [
+    re.compile(r"(?:【|###)\s*股票名称\s*(?:】|\n)\s*(.*?)\s*[（(](\d{6})[)）]", re.DOTALL),
+    re.compile(r"###\s*股票名称\s*(.*?)\s*[（(](\d{6})[)）]", re.DOTALL),
+    re.compile(r"【(.*?)】\s*[（(](\d{6})[)）]", re.DOTALL),
+]
+
+# 标签后面的取值，在标签结束位置用 match 解析
+_RANGE_VALUE = re.compile(r"\s*(\d+\.?\d*)-(\d+\.?\d*)元")
+_INTERVAL_VALUE = re.compile(r"\s*最低\s*(\d+\.?\d*)\s*元\s*-\s*最高\s*(\d+\.?\d*)\s*元")
+_SINGLE_VALUE = re.compile(r"\s*(\d+\.?\d*)元")
+_REASON_POINTS = re.compile(r"[-•]\s*(.*?)(?=[-•]|$)", re.DOTALL)
+
+# 价格标签 -> 类别，(买入|卖出)价格 合并为同一类别
+_PRICE_LABELS = {"交易价格": "trade", "价格区间": "interval", "目标价格": "target",
+                 "买入价格": "side", "卖出价格": "side"}
+_RANGE_ORDER = ["trade", "interval", "target", "side"]
+_SINGLE_ORDER = ["trade", "target", "side"]
+
+_STOP_LOSS_ORDER = ["止损价格", "止损价位", "止损位", "止损设置"]
+_TAKE_PROFIT_ORDER = ["止盈价格", "止盈价位", "止盈位", "止盈目标"]
+
+# 操作类型关键词，按优先级排列
+ACTION_KEYWORDS = {
+    "buy": ["买入策略", "建仓策略", "入场策略", "买入时机"],
+    "sell": ["卖出策略", "清仓策略", "离场策略", "卖出时机"],
+    "hold": ["持有建议", "继续持有", "持股待涨"],
+}
+_ACTION_OF = {kw: action for action, kws in ACTION_KEYWORDS.items() for kw in kws}
+
+# 固定模板的策略原文，如 "操作建议：日丰股份 002953"、"操作建议：掌趣科技300315"
+_TEMPLATE_STOCK = re.compile(r"操作建议[：:]\s*([^\s\d：:，,（(]{2,10}?)\s*[（(]?(\d{6})(?!\d)")
+_TEMPLATE_ACTION = re.compile(r"操作要求[：:]\s*(买入|卖出|加仓|减仓|持有)")
+_TEMPLATE_RATIO = re.compile(r"(\d+|[一二三四五六七八九十])成仓位?")
+_TEMPLATE_REASON = re.compile(r"(?:选股理由|操作理由)[：:]?\s*(.*?)(?=大师指标|【风险提示】|###|$)", re.DOTALL)
+_ACTION_WORDS = {"买入": "buy", "卖出": "sell", "加仓": "add", "减仓": "reduce", "持有": "hold"}
+_CHINESE_DIGITS = "一二三四五六七八九十"
+
+# 一次扫描识别所有字段的起点
+# 【 和 ### 用零宽断言，不消耗字符，保证重叠的股票标题也能被识别
+_TOKEN = re.compile(
+    r"(?P<head>(?=【|###))"
+    r"|(?P<price>" + "|".join(_PRICE_LABELS) + r")[：:]"
+    r"|(?P<stop>" + "|".join(_STOP_LOSS_ORDER) + r")[：:]"
+    r"|(?P<profit>" + "|".join(_TAKE_PROFIT_ORDER) + r")[：:]"
+    r"|(?P<reason>持股理由)[：:]"
+    r"|(?P<ratio>\d+)%仓位"
+    r"|(?P<action>" + "|".join(_ACTION_OF) + r")"
+)
+
+
+class StrategyExtractor:
+    """预编译、单次扫描的策略文本提取器
+
+    与 StrategyManager.extract_* 的提取结果保持一致，但只扫描一遍文本，
+    不打印日志，可以在调用服务端之前做廉价的本地预解析。
+    """
+
+    def extract(self, text: str) -> dict:
+        """提取策略文本中的所有字段
+        :param text: 策略文本
+        :return: 字段字典，无法提取的字段为 None
+        """
+        stocks = [None, None, None]
+        ranges = {}
+        singles = {}
+        stops = {}
+        profits = {}
+        ratio = None
+        reason_pos = None
+        actions = set()
+
+        for m in _TOKEN.finditer(text):
+            kind = m.lastgroup
+            if kind == "head":
+                pos = m.start()
+                if stocks[0]:
+                    continue
+                for i, pattern in enumerate(_STOCK_PATTERNS):
+                    if stocks[i] is None:
+                        stock_match = pattern.match(text, pos)
+                        if stock_match:
+                            stocks[i] = (stock_match.group(1).strip(), stock_match.group(2))
+            elif kind == "price":
+                category = _PRICE_LABELS[m.group("price")]
+                if category == "interval":
+                    if category not in ranges:
+                        value = _INTERVAL_VALUE.match(text, m.end())
+                        if value:
+                            ranges[category] = value
+                    continue
+                if category not in ranges:
+                    value = _RANGE_VALUE.match(text, m.end())
+                    if value:
+                        ranges[category] = value
+                if category not in singles:
+                    value = _SINGLE_VALUE.match(text, m.end())
+                    if value:
+                        singles[category] = value
+            elif kind == "stop":
+                label = m.group("stop")
+                if label not in stops:
+                    value = _SINGLE_VALUE.match(text, m.end())
+                    if value:
+                        stops[label] = float(value.group(1))
+            elif kind == "profit":
+                label = m.group("profit")
+                if label not in profits:
+                    value = _SINGLE_VALUE.match(text, m.end())
+                    if value:
+                        profits[label] = float(value.group(1))
+            elif kind == "ratio":
+                if ratio is None:
+                    ratio = float(m.group("ratio")) / 100
+            elif kind == "reason":
+                if reason_pos is None:
+                    reason_pos = m.end()
+            else:
+                actions.add(_ACTION_OF[m.group("action")])
+
+        result = {
+            "stock_name": None,
+            "stock_code": None,
+            "action": None,
+            "price_min": None,
+            "price_max": None,
+            "position_ratio": ratio,
+            "take_profit_price": _first(profits, _TAKE_PROFIT_ORDER),
+            "stop_loss_price": _first(stops, _STOP_LOSS_ORDER),
+            "reason": _reason(text, reason_pos),
+        }
+
+        # 名称为空时与原有逻辑一致，视为没有股票信息
+        stock = next((s for s in stocks if s), None)
+        if stock and stock[0]:
+            result["stock_name"], result["stock_code"] = stock
+            result["action"] = next((a for a in ACTION_KEYWORDS if a in actions), None)
+
+        price = _first(ranges, _RANGE_ORDER)
+        if price:
+            result["price_min"], result["price_max"] = float(price.group(1)), float(price.group(2))
+        else:
+            price = _first(singles, _SINGLE_ORDER)
+            if price:
+                result["price_min"] = result["price_max"] = float(price.group(1))
+
+        return result
+
+    def extract_template(self, text: str) -> dict:
+        """提取固定模板原文中 extract 覆盖不到的字段
+        :param text: 策略原文，如 "#大师实战演练 操作建议：日丰股份 002953 交易价格：..."
+        :return: stock_name, stock_code, action, position_ratio, reason，无法提取的为 None
+        """
+        result = {"stock_name": None, "stock_code": None, "action": None,
+                  "position_ratio": None, "reason": None}
+
+        stock = _TEMPLATE_STOCK.search(text)
+        if stock:
+            result["stock_name"], result["stock_code"] = stock.group(1), stock.group(2)
+
+        # 操作类型：优先取明确的操作要求，其次看栏目标签
+        action = _TEMPLATE_ACTION.search(text)
+        if action:
+            result["action"] = _ACTION_WORDS[action.group(1)]
+        elif "#大师实战演练" in text:
+            result["action"] = "buy"
+        elif "#止盈止损" in text:
+            result["action"] = "sell"
+        elif "#加仓减仓" in text:
+            body = text.replace("#加仓减仓", "")
+            if "减仓" in body:
+                result["action"] = "reduce"
+            elif "加仓" in body:
+                result["action"] = "add"
+
+        # 仓位：N成仓位，1成即10%
+        ratio = _TEMPLATE_RATIO.search(text)
+        if ratio:
+            value = ratio.group(1)
+            tenths = int(value) if value.isdigit() else _CHINESE_DIGITS.index(value) + 1
+            result["position_ratio"] = tenths / 10
+
+        reason = _TEMPLATE_REASON.search(text)
+        if reason:
+            lines = [line.strip(" -•\t") for line in reason.group(1).splitlines()]
+            result["reason"] = "；".join(line for line in lines if line) or None
+
+        return result
+
+
+def _first(found: dict, order: list):
+    """按优先级取第一个找到的值"""
+    for key in order:
+        if key in found:
+            return found[key]
+    return None
+
+
+def _reason(text: str, pos: Optional[int]) -> Optional[str]:
+    """持股理由：从标签到下一个 ### 或文本结尾，按分点合并"""
+    if pos is None:
+        return None
+    end = text.find("###", pos)
+    reason = text[pos:end if end >= 0 else len(text)].strip()
+    points = _REASON_POINTS.findall(reason)
+    if points:
+        return "；".join(point.strip() for point in points if point.strip())
+    return reason
+
+
+extractor = StrategyExtractor()
@@ -0,0 +1,290 @@
+import bisect
+import random
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class _Node:
+    """区间树节点，按 (price_min, 策略ID) 排序，max_hi 为子树中最大的 price_max"""
+    __slots__ = ("key", "lo", "hi", "item", "prio", "max_hi", "left", "right")
+
+    def __init__(self, lo: float, hi: float, item) -> None:
+        self.key = (lo, item.id)
+        self.lo = lo
+        self.hi = hi
+        self.item = item
+        self.prio = random.random()
+        self.max_hi = hi
+        self.left = None
+        self.right = None
+
+    def update(self) -> "_Node":
+        max_hi = self.hi
+        if self.left is not None and self.left.max_hi > max_hi:
+            max_hi = self.left.max_hi
+        if self.right is not None and self.right.max_hi > max_hi:
+            max_hi = self.right.max_hi
+        self.max_hi = max_hi
+        return self
+
+
+def _split(node: Optional[_Node], key: tuple) -> Tuple[Optional[_Node], Optional[_Node]]:
+    """按 key 拆成 (< key, >= key) 两棵树"""
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return node.update(), right
+    left, node.left = _split(node.left, key)
+    return left, node.update()
+
+
+def _merge(a: Optional[_Node], b: Optional[_Node]) -> Optional[_Node]:
+    """合并两棵树，a 中所有键都小于 b"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        return a.update()
+    b.left = _merge(a, b.left)
+    return b.update()
+
+
+class IntervalTree:
+    """基于树堆（treap）的区间树，支持增量插入、删除和 O(log n + k) 的点查询"""
+
+    def __init__(self) -> None:
+        self.root = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def insert(self, lo: float, hi: float, item) -> None:
+        node = _Node(lo, hi, item)
+        left, right = _split(self.root, node.key)
+        self.root = _merge(_merge(left, node), right)
+        self.size += 1
+
+    def build(self, intervals: Iterable[Tuple[float, float, object]]) -> None:
+        """批量建树：排序后直接构造平衡树，按层序分配优先级，避免逐个插入
+        :param intervals: [(lo, hi, 条目)]
+        """
+        nodes = sorted((_Node(lo, hi, item) for lo, hi, item in intervals), key=lambda n: n.key)
+
+        def link(start: int, end: int) -> Optional[_Node]:
+            if start >= end:
+                return None
+            mid = (start + end) // 2
+            node = nodes[mid]
+            node.left = link(start, mid)
+            node.right = link(mid + 1, end)
+            return node.update()
+
+        self.root = link(0, len(nodes))
+        self.size = len(nodes)
+        # 越靠近根优先级越高，满足堆序，之后的增量插入照常按随机优先级旋转
+        priorities = sorted((random.random() for _ in nodes), reverse=True)
+        level, i = [self.root] if self.root else [], 0
+        while level:
+            following = []
+            for node in level:
+                node.prio = priorities[i]
+                i += 1
+                following.extend(child for child in (node.left, node.right) if child is not None)
+            level = following
+
+    def remove(self, lo: float, item_id) -> bool:
+        key = (lo, item_id)
+        left, rest = _split(self.root, key)
+        middle, right = _split(rest, (lo, item_id, 0))  # (lo, id) < (lo, id, 0)，middle 只含该节点
+        self.root = _merge(left, right)
+        if middle is not None:
+            self.size -= 1
+            return True
+        return False
+
+    def stab(self, x: float) -> list:
+        """所有满足 lo <= x <= hi 的条目"""
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            # 子树中没有区间能覆盖到 x
+            if node is None or node.max_hi < x:
+                continue
+            stack.append(node.left)
+            if node.lo <= x:
+                if x <= node.hi:
+                    found.append(node.item)
+                # 右子树的 lo 都不小于当前节点，当前节点已大于 x 时右子树无需再看
+                stack.append(node.right)
+        return found
+
+
+class _Levels:
+    """有序价位列表，查询两次价格之间穿越的价位"""
+
+    def __init__(self) -> None:
+        self.keys: List[Tuple[float, int]] = []
+
+    def add(self, price: float, item_id) -> None:
+        bisect.insort(self.keys, (price, item_id))
+
+    def build(self, keys: Iterable[Tuple[float, int]]) -> None:
+        self.keys = sorted(keys)
+
+    def remove(self, price: float, item_id) -> None:
+        i = bisect.bisect_left(self.keys, (price, item_id))
+        if i < len(self.keys) and self.keys[i] == (price, item_id):
+            del self.keys[i]
+
+    def between(self, low: float, high: float, include_low: bool, include_high: bool) -> List[int]:
+        keys = self.keys
+        start = bisect.bisect_left(keys, (low,)) if include_low else bisect.bisect_right(keys, (low, float("inf")))
+        end = bisect.bisect_right(keys, (high, float("inf"))) if include_high else bisect.bisect_left(keys, (high,))
+        return [item_id for _, item_id in keys[start:end]]
+
+
+class _StockIndex:
+    """单只股票的索引：交易区间树、止损价位和止盈价位"""
+    __slots__ = ("bands", "stops", "profits")
+
+    def __init__(self) -> None:
+        self.bands = IntervalTree()
+        self.stops = _Levels()
+        self.profits = _Levels()
+
+
+class StrategyIndex:
+    """按股票代码组织的策略价格索引
+
+    - 交易区间 [price_min, price_max] 放在区间树中，查询覆盖某个价格的策略为 O(log n + k)
+    - 止损、止盈价放在有序数组中，用二分查找两次价格之间被穿越的价位
+    随策略的新增、更新、停用增量维护，不需要每次全量重建。
+    新加入或更新过的策略记为“待检查”，由价格监控在该股票下次有行情时按当前价完整判断一次。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stocks: Dict[str, _StockIndex] = {}
+        self._items: Dict[int, object] = {}
+        self._fresh: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def load(self, strategies: Iterable) -> None:
+        """用完整的活跃策略列表重建索引"""
+        grouped = {}
+        for strategy in strategies:
+            if strategy.id is not None:
+                grouped.setdefault(strategy.stock_code, []).append(strategy)
+
+        stocks, items = {}, {}
+        for code, group in grouped.items():
+            stock = stocks[code] = _StockIndex()
+            bands, stops, profits = [], [], []
+            for strategy in group:
+                lo, hi = strategy.price_min, strategy.price_max
+                if lo is not None or hi is not None:
+                    lo = 0.0 if lo is None else lo
+                    bands.append((lo, float("inf") if hi is None else hi, strategy))
+                if strategy.stop_loss_price is not None:
+                    stops.append((strategy.stop_loss_price, strategy.id))
+                if strategy.take_profit_price is not None:
+                    profits.append((strategy.take_profit_price, strategy.id))
+                items[strategy.id] = (strategy, lo, strategy.stop_loss_price, strategy.take_profit_price)
+            stock.bands.build(bands)
+            stock.stops.build(stops)
+            stock.profits.build(profits)
+
+        with self._lock:
+            # 重建前已有的策略不再重复检查
+            for strategy_id, (strategy, *_) in items.items():
+                if strategy_id not in self._items:
+                    self._fresh.setdefault(strategy.stock_code, set()).add(strategy_id)
+            self._stocks = stocks
+            self._items = items
+
+    def upsert(self, strategy) -> None:
+        """新增或更新一条策略，停用的策略会被移除"""
+        if strategy is None or strategy.id is None:
+            return
+        with self._lock:
+            self._remove(strategy.id)
+            if strategy.is_active:
+                self._add(strategy)
+
+    def remove(self, strategy_id: int) -> None:
+        with self._lock:
+            self._remove(strategy_id)
+
+    def get(self, strategy_id: int):
+        entry = self._items.get(strategy_id)
+        return entry[0] if entry else None
+
+    def _add(self, strategy) -> None:
+        if strategy.id is None:
+            return
+        stock = self._stocks.setdefault(strategy.stock_code, _StockIndex())
+        lo, hi = strategy.price_min, strategy.price_max
+        if lo is not None or hi is not None:
+            # 只给出单边价格时，另一边视为不限
+            lo = 0.0 if lo is None else lo
+            stock.bands.insert(lo, float("inf") if hi is None else hi, strategy)
+        if strategy.stop_loss_price is not None:
+            stock.stops.add(strategy.stop_loss_price, strategy.id)
+        if strategy.take_profit_price is not None:
+            stock.profits.add(strategy.take_profit_price, strategy.id)
+        # 记下建索引时的价位，策略对象之后被原地修改也能正确移除
+        self._items[strategy.id] = (strategy, lo, strategy.stop_loss_price, strategy.take_profit_price)
+        self._fresh.setdefault(strategy.stock_code, set()).add(strategy.id)
+
+    def _remove(self, strategy_id: int) -> None:
+        entry = self._items.pop(strategy_id, None)
+        if entry is None:
+            return
+        strategy, lo, stop_loss, take_profit = entry
+        self._fresh.get(strategy.stock_code, set()).discard(strategy_id)
+        stock = self._stocks[strategy.stock_code]
+        if lo is not None:
+            stock.bands.remove(lo, strategy_id)
+        if stop_loss is not None:
+            stock.stops.remove(stop_loss, strategy_id)
+        if take_profit is not None:
+            stock.profits.remove(take_profit, strategy_id)
+
+    def pop_fresh(self, stock_code: str) -> list:
+        """取出该股票待检查的策略并清空"""
+        with self._lock:
+            ids = self._fresh.pop(stock_code, ())
+            return [self._items[i][0] for i in ids if i in self._items]
+
+    def containing(self, stock_code: str, price: float) -> list:
+        """交易区间覆盖 price 的策略"""
+        with self._lock:
+            stock = self._stocks.get(stock_code)
+            return stock.bands.stab(price) if stock else []
+
+    def stops_crossed(self, stock_code: str, previous: float, current: float) -> list:
+        """价格从 previous 跌到 current 时被跌破的止损（previous > 止损价 >= current）"""
+        if current >= previous:
+            return []
+        with self._lock:
+            stock = self._stocks.get(stock_code)
+            if not stock:
+                return []
+            return [self._items[i][0] for i in stock.stops.between(current, previous, True, False)]
+
+    def take_profits_crossed(self, stock_code: str, previous: float, current: float) -> list:
+        """价格从 previous 涨到 current 时被突破的止盈（previous < 止盈价 <= current）"""
+        if current <= previous:
+            return []
+        with self._lock:
+            stock = self._stocks.get(stock_code)
+            if not stock:
+                return []
+            return [self._items[i][0] for i in stock.profits.between(previous, current, False, True)]
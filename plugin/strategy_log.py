@@ -0,0 +1,205 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""策略日志读取
+
+策略日志按天写入 logs/strategies/strategy_YYYY-MM-DD.jsonl，每行一条 JSON，只追加不改写；
+同名的 .idx 文件按顺序保存每一行的字节偏移（8字节小端无符号整数），可按序号直接定位。
+旧版本的日志是整个 JSON 数组的 strategy_YYYY-MM-DD.json，读取时同样支持，也可以用 migrate 转换。
+
+用法: python -m plugin.strategy_log [--dir logs/strategies] [--migrate] [--date 2024-01-02 --tail 10]
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+from typing import Iterator, List, Optional
+
+INDEX_ENTRY = struct.Struct("<Q")
+
+
+def index_path(path: str) -> str:
+    """JSONL 日志对应的偏移索引文件"""
+    return os.path.splitext(path)[0] + ".idx"
+
+
+def truncate_partial_line(path: str, chunk: int = 65536) -> int:
+    """截掉文件末尾未写完整的行（进程在写入中途退出），之后追加的记录从新的一行开始
+    :return: 截掉的字节数
+    """
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(end - chunk, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+        return size - end
+
+
+class StrategyLogFile:
+    """单日 JSONL 策略日志，按偏移索引随机读取
+
+    索引缺失或落后于数据时（旧版本写入、写索引前进程退出），从最后一个已索引的位置向后扫描补齐；
+    末尾未写完整的行和无法解析的行会被跳过。
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.offsets = self._load_offsets()
+
+    def _load_offsets(self) -> List[int]:
+        offsets = []
+        size = os.path.getsize(self.path)
+        try:
+            with open(index_path(self.path), "rb") as f:
+                data = f.read()
+            data = data[:len(data) - len(data) % INDEX_ENTRY.size]
+            offsets = [offset for offset, in INDEX_ENTRY.iter_unpack(data)]
+        except OSError:
+            pass
+        while offsets and offsets[-1] >= size:
+            offsets.pop()
+
+        with open(self.path, "rb") as f:
+            position = offsets[-1] if offsets else 0
+            f.seek(position)
+            if offsets:
+                # 最后一个已索引的行
+                position += len(f.readline())
+            for line in f:
+                if line.endswith(b"\n"):
+                    offsets.append(position)
+                position += len(line)
+        return offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, i: int) -> Optional[dict]:
+        """第 i 条记录，支持负数下标，无法解析的行返回 None"""
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[i])
+            try:
+                return json.loads(f.readline())
+            except ValueError:
+                return None
+
+    def __iter__(self) -> Iterator[dict]:
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def tail(self, n: int) -> List[dict]:
+        """最后 n 行中可以解析的记录"""
+        entries = (self[i] for i in range(max(len(self) - n, 0), len(self)))
+        return [entry for entry in entries if entry is not None]
+
+    def write_index(self) -> None:
+        """把补齐后的偏移写回索引文件"""
+        with open(index_path(self.path), "wb") as f:
+            f.write(b"".join(INDEX_ENTRY.pack(offset) for offset in self.offsets))
+
+
+def log_files(log_dir: str = "logs/strategies") -> List[str]:
+    """按日期排序的策略日志文件，同一天旧格式在前"""
+    paths = glob.glob(os.path.join(log_dir, "strategy_*.json")) + glob.glob(os.path.join(log_dir, "strategy_*.jsonl"))
+    return sorted(paths, key=lambda p: (os.path.basename(p).split(".")[0], p.endswith(".jsonl")))
+
+
+def read_strategy_log(log_dir: str = "logs/strategies", start: str = None, end: str = None) -> Iterator[dict]:
+    """按时间顺序读取策略日志，兼容旧的 JSON 数组文件
+    :param log_dir: 策略日志目录
+    :param start: 起始日期（含），如 2024-01-01
+    :param end: 结束日期（含）
+    """
+    for path in log_files(log_dir):
+        date = os.path.basename(path).split(".")[0][len("strategy_"):]
+        if (start and date < start) or (end and date > end):
+            continue
+        if path.endswith(".jsonl"):
+            yield from StrategyLogFile(path)
+            continue
+        try:
+            with open(path, encoding="utf-8") as f:
+                yield from json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[策略日志] 读取失败 {path}: {str(e)}")
+
+
+def migrate(log_dir: str = "logs/strategies", keep: bool = True) -> int:
+    """把旧的 JSON 数组日志转换为 JSONL 和偏移索引
+    同一天已有 JSONL 时，旧记录放在前面
+    :param keep: 是否把旧文件保留为 .json.bak
+    :return: 转换的文件数
+    """
+    migrated = 0
+    for path in sorted(glob.glob(os.path.join(log_dir, "strategy_*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[策略日志] 跳过无法解析的文件 {path}: {str(e)}")
+            continue
+
+        target = path + "l"
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+        existing = b""
+        if os.path.exists(target):
+            with open(target, "rb") as f:
+                existing = f.read()
+        temp = target + ".tmp"
+        with open(temp, "wb") as f:
+            f.write(lines.encode("utf-8") + existing)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, target)
+        if os.path.exists(index_path(target)):
+            os.remove(index_path(target))
+        StrategyLogFile(target).write_index()
+
+        if keep:
+            os.replace(path, path + ".bak")
+        else:
+            os.remove(path)
+        migrated += 1
+        print(f"[策略日志] 已转换 {path}: {len(entries)} 条")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="策略日志工具")
+    parser.add_argument("--dir", default="logs/strategies", help="策略日志目录")
+    parser.add_argument("--migrate", action="store_true", help="把旧的 JSON 数组日志转换为 JSONL")
+    parser.add_argument("--date", help="查看某一天的日志，如 2024-01-02")
+    parser.add_argument("--tail", type=int, default=10, help="查看最后几条")
+    args = parser.parse_args()
+
+    if args.migrate:
+        print(f"[策略日志] 共转换 {migrate(args.dir)} 个文件")
+    if args.date:
+        path = os.path.join(args.dir, f"strategy_{args.date}.jsonl")
+        if not os.path.exists(path):
+            print(f"[策略日志] 文件不存在: {path}")
+            return
+        log = StrategyLogFile(path)
+        print(f"[策略日志] {path}: {len(log)} 条")
+        for entry in log.tail(args.tail):
+            print(json.dumps(entry, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,38 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
+# 解析接口返回的 JSON：有 msgspec 或 orjson 时使用，否则用标准库
+try:
+    import msgspec
+    loads = msgspec.json.decode
+    JSON_BACKEND = "msgspec"
+except ImportError:
+    try:
+        import orjson
+        loads = orjson.loads
+        JSON_BACKEND = "orjson"
+    except ImportError:
+        loads = json.loads
+        JSON_BACKEND = "json"
+
+from base.http_client import get_session
+from plugin.keyword_matcher import matcher
+from plugin.metrics import STRATEGY_API_ERRORS, STRATEGY_API_SECONDS
+from plugin.stock_index import StockIndex, load_stock_index
+from plugin.strategy_extractor import extractor
+from plugin.strategy_index import StrategyIndex
+from plugin.strategy_outbox import StrategyOutbox
+from plugin.tracing import traced
+
 class Strategy:
-    """策略数据模型"""
+    """策略数据模型
+
+    使用 __slots__，不为每个实例创建 __dict__；created_at 在首次访问时才解析，
+    列表接口批量创建时不必为每条策略解析时间。
+    """
+    __slots__ = ("id", "stock_name", "stock_code", "action", "price_min", "price_max", "position_ratio",
+                 "take_profit_price", "stop_loss_price", "reason", "_created_at", "is_active", "execution_status")
+
     def __init__(self, 
                  stock_name: str,
                  stock_code: str,
@@ -27,12 +57,25 @@ class Strategy:
         self.take_profit_price = take_profit_price
         self.stop_loss_price = stop_loss_price
         self.reason = reason
-        self.created_at = datetime.now()
+        self._created_at = datetime.now()
         self.is_active = True
         self.execution_status = "pending"  # pending, executed, expired
 
+    @property
+    def created_at(self) -> datetime:
+        """创建时间，接口返回的 ISO 字符串在首次访问时解析"""
+        value = self._created_at
+        if isinstance(value, str):
+            value = self._created_at = datetime.fromisoformat(value)
+        return value
+
+    @created_at.setter
+    def created_at(self, value) -> None:
+        self._created_at = value
+
     def to_dict(self) -> dict:
         """转换为字典格式"""
+        created_at = self._created_at
         data = {
             "stock_name": self.stock_name,
             "stock_code": self.stock_code,
@@ -43,7 +86,7 @@ class Strategy:
             "take_profit_price": self.take_profit_price,
             "stop_loss_price": self.stop_loss_price,
             "reason": self.reason,
-            "created_at": self.created_at.isoformat(),
+            "created_at": created_at if isinstance(created_at, str) else created_at.isoformat(),
             "is_active": self.is_active
         }
         
@@ -56,40 +99,91 @@ class Strategy:
     @classmethod
     def from_dict(cls, data: dict) -> 'Strategy':
         """从字典创建策略对象"""
-        strategy = cls(
-            stock_name=data["stock_name"],
-            stock_code=data["stock_code"],
-            action=data["action"],
-            price_min=data.get("price_min"),
-            price_max=data.get("price_max"),
-            position_ratio=data.get("position_ratio"),
-            take_profit_price=data.get("take_profit_price"),
-            stop_loss_price=data.get("stop_loss_price"),
-            reason=data.get("reason")
-        )
-        strategy.id = data.get("id")
-        strategy.created_at = datetime.fromisoformat(data["created_at"])
-        strategy.is_active = data.get("is_active", True)
-        strategy.execution_status = data.get("execution_status", "pending")
+        strategy = cls.__new__(cls)
+        strategy.stock_name = data["stock_name"]
+        strategy.stock_code = data["stock_code"]
+        strategy.action = data["action"]
+        get = data.get
+        strategy.price_min = get("price_min")
+        strategy.price_max = get("price_max")
+        strategy.position_ratio = get("position_ratio")
+        strategy.take_profit_price = get("take_profit_price")
+        strategy.stop_loss_price = get("stop_loss_price")
+        strategy.reason = get("reason")
+        strategy.id = get("id")
+        strategy._created_at = data["created_at"]
+        strategy.is_active = get("is_active", True)
+        strategy.execution_status = get("execution_status", "pending")
         return strategy
 
+    # 取值重复较多的字段，批量创建时共享同一个字符串对象
+    SHARED_FIELDS = ("stock_name", "stock_code", "action", "reason", "execution_status")
+
+    @classmethod
+    def from_list(cls, records: List[dict]) -> List['Strategy']:
+        """批量创建策略对象，用于列表接口
+        同一只股票的名称、代码、理由等字符串在整批中只保留一份
+        """
+        strategies = []
+        shared = {}
+        for data in records:
+            strategy = cls.from_dict(data)
+            for field in cls.SHARED_FIELDS:
+                value = getattr(strategy, field)
+                if value is not None:
+                    setattr(strategy, field, shared.setdefault(value, value))
+            strategies.append(strategy)
+        return strategies
+
+
 class StrategyManager:
     """策略管理器"""
-    def __init__(self):
-        from configuration import Config
-        config = Config()
-        self.base_url = config.API["base_url"].rstrip('/')
+    # 本地股票代码表，未配置时为 None，不做校验
+    stock_index: Optional[StockIndex] = None
+    # 策略发件箱，未启用时为 None
+    outbox: Optional[StrategyOutbox] = None
 
-    def _call_api(self, method: str, endpoint: str, data: dict = None) -> Optional[dict]:
+    def __init__(self, config=None):
+        """
+        :param config: 配置对象，不传时读取 config.yaml
+        """
+        if config is None:
+            from configuration import Config
+            config = Config()
+        self.base_url = config.API["base_url"].rstrip('/')
+        stock_index_conf = getattr(config, "STOCK_INDEX", {})
+        self.stock_index = load_stock_index(stock_index_conf)
+        self.strict_stock_check = stock_index_conf.get("strict", False)
+        # 活跃策略的价格索引，随新增、更新、停用增量维护
+        self.strategy_index = StrategyIndex()
+        # 策略先写入本地发件箱再由后台线程补发，未启用时同步调用接口
+        # 补发线程由机器人启动（outbox.start()），基准测试等直接创建的实例不会启动后台线程
+        self.outbox = StrategyOutbox.from_config(getattr(config, "OUTBOX", {}), self._replay_strategy)
+
+    def resolve_stock(self, stock_name: Optional[str], stock_code: Optional[str]) -> Tuple[bool, Optional[str], Optional[str]]:
+        """用本地代码表校验并纠正股票名称和代码
+        :return: (是否有效, 股票名称, 股票代码)，未加载代码表时原样返回并视为有效
+        """
+        if not self.stock_index:
+            return True, stock_name, stock_code
+        valid, code, name = self.stock_index.validate(stock_code, stock_name)
+        if valid and (code, name) != (stock_code, stock_name):
+            print(f"[策略管理] 股票信息已纠正: {stock_name}({stock_code}) -> {name}({code})")
+        return valid, name, code
+
+    @traced("_call_api", lambda self, method, endpoint, *args, **kwargs: {"http.method": method, "endpoint": endpoint})
+    def _call_api(self, method: str, endpoint: str, data: dict = None, headers: dict = None) -> Optional[dict]:
         """调用API接口
         :param method: 请求方法（GET, POST, PUT, DELETE）
         :param endpoint: 接口路径
         :param data: 请求数据
+        :param headers: 额外的请求头
         :return: 响应数据
         """
+        # 路径中的策略ID替换为占位符，避免指标的标签无限增长
+        endpoint_label = re.sub(r"/\d+", "/{id}", endpoint)
+        start = time.perf_counter()
         try:
-            import requests
-            
             url = f"{self.base_url}/{endpoint.lstrip('/')}"
             print(f"\n===========调用接口==========")
             print(f"请求方法：{method}")
@@ -97,23 +191,33 @@ class StrategyManager:
             if data:
                 print(f"请求数据：{json.dumps(data, ensure_ascii=False, indent=2)}")
             
-            response = requests.request(method, url, json=data)
+            response = get_session().request(method, url, json=data, headers=headers)
             
             if response.status_code == 200:
-                result = response.json()
-                print(f"返回结果：{json.dumps(result, ensure_ascii=False, indent=2)}")
+                result = loads(response.content)
+                if isinstance(result.get("data"), list):
+                    # 列表接口可能返回上千条，只打印条数
+                    print(f"返回结果：共 {len(result['data'])} 条")
+                else:
+                    print(f"返回结果：{json.dumps(result, ensure_ascii=False, indent=2)}")
                 if result.get("code") == 200:
                     return result.get("data")
                 else:
                     print(f"[策略管理] 接口调用失败: {result.get('message')}")
+                    STRATEGY_API_ERRORS.inc(method=method, endpoint=endpoint_label, reason="code")
             else:
                 print(f"[策略管理] 接口调用失败: HTTP {response.status_code}")
+                STRATEGY_API_ERRORS.inc(method=method, endpoint=endpoint_label, reason=f"http_{response.status_code}")
                 
             return None
         except Exception as e:
             print(f"[策略管理] 接口调用出错: {str(e)}")
+            STRATEGY_API_ERRORS.inc(method=method, endpoint=endpoint_label, reason=e.__class__.__name__)
             return None
+        finally:
+            STRATEGY_API_SECONDS.observe(time.perf_counter() - start, method=method, endpoint=endpoint_label)
 
+    @traced("add_strategy", lambda self, strategy: {"stock_code": strategy.stock_code})
     def add_strategy(self, strategy: Strategy) -> Tuple[bool, str, Optional[Strategy]]:
         """添加新策略
         :return: (是否成功, 消息, 更新后的策略对象)
@@ -123,7 +227,35 @@ class StrategyManager:
         print("="*50)
         print(f"检查股票：{strategy.stock_name}({strategy.stock_code})")
         print(f"操作类型：{'买入' if strategy.action == 'buy' else '卖出'}")
-        
+
+        # 调用接口前先校验股票，纠正OCR造成的名称错误，避免服务端查重失败
+        valid, stock_name, stock_code = self.resolve_stock(strategy.stock_name, strategy.stock_code)
+        if valid:
+            strategy.stock_name, strategy.stock_code = stock_name, stock_code
+        else:
+            print(f"代码表中未找到股票：{strategy.stock_name}({strategy.stock_code})")
+            if self.strict_stock_check:
+                return False, f"未找到股票{strategy.stock_name}({strategy.stock_code})喵~", None
+
+        if self.outbox is not None:
+            key = self.outbox.enqueue(strategy.to_dict())
+            print(f"策略已写入发件箱：{key}")
+            print("="*50)
+            return True, f"已记录{strategy.stock_name}的{strategy.action}策略，正在同步喵~", strategy
+        return self._write_strategy(strategy)
+
+    def _replay_strategy(self, payload: dict, key: str) -> bool:
+        """发件箱的补发函数"""
+        success, _, _ = self._write_strategy(Strategy.from_dict(payload), key)
+        return success
+
+    def _write_strategy(self, strategy: Strategy, idempotency_key: str = None) -> Tuple[bool, str, Optional[Strategy]]:
+        """查重后更新或创建策略
+        :param idempotency_key: 幂等键，重试时服务端据此去重
+        :return: (是否成功, 消息, 更新后的策略对象)
+        """
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+
         # 检查是否存在重复策略
         existing_strategy = self.find_duplicate_strategy(strategy)
         if existing_strategy:
@@ -141,17 +273,19 @@ class StrategyManager:
             }
             
             # 检查仓位变化和执行状态
-            if strategy.position_ratio > existing_strategy.position_ratio:
-                print(f"仓位增加：{existing_strategy.position_ratio * 100}% -> {strategy.position_ratio * 100}%")
+            # 仓位可能未给出，按 0 比较
+            if (strategy.position_ratio or 0) > (existing_strategy.position_ratio or 0):
+                print(f"仓位增加：{(existing_strategy.position_ratio or 0) * 100}% -> {strategy.position_ratio * 100}%")
                 if existing_strategy.execution_status == "executed":
                     print("原策略已全部执行，更新状态为部分执行")
                     updates["execution_status"] = "partial"
             
             # 调用更新接口
-            result = self._call_api("PUT", f"/strategies/{existing_strategy.id}", updates)
+            result = self._call_api("PUT", f"/strategies/{existing_strategy.id}", updates, headers)
             if result:
                 # 更新本地Strategy对象的状态
                 existing_strategy = Strategy.from_dict(result)
+                self.strategy_index.upsert(existing_strategy)
                 print(f"更新策略成功：ID={existing_strategy.id}")
                 print("="*50)
                 return True, f"已更新{strategy.stock_name}的{strategy.action}策略喵~", existing_strategy
@@ -159,10 +293,11 @@ class StrategyManager:
                 return False, "更新策略失败喵~", None
 
         # 调用创建策略接口
-        result = self._call_api("POST", "/strategies", strategy.to_dict())
+        result = self._call_api("POST", "/strategies", strategy.to_dict(), headers)
         if result:
             # 创建新的Strategy对象
             new_strategy = Strategy.from_dict(result)
+            self.strategy_index.upsert(new_strategy)
             print(f"新增策略成功：ID={new_strategy.id}")
             print("="*50)
             return True, f"已添加{strategy.stock_name}的{strategy.action}策略喵~", new_strategy
@@ -195,6 +330,10 @@ class StrategyManager:
         """
         result = self._call_api("PUT", f"/strategies/{strategy_id}", updates)
         if result:
+            if isinstance(result, dict) and "stock_code" in result:
+                self.strategy_index.upsert(Strategy.from_dict(result))
+            elif updates.get("is_active") is False:
+                self.strategy_index.remove(strategy_id)
             return True, f"已更新策略喵~"
         return False, "更新策略失败喵~"
 
@@ -209,7 +348,9 @@ class StrategyManager:
         """获取所有有效策略"""
         result = self._call_api("GET", "/strategies", {"is_active": True})
         if result:
-            return [Strategy.from_dict(data) for data in result]
+            strategies = Strategy.from_list(result)
+            self.strategy_index.load(strategies)
+            return strategies
         return []
 
     def cleanup_expired_strategies(self) -> None:
@@ -227,11 +368,13 @@ class StrategyManager:
             expire_time = datetime.now() - timedelta(days=7)
             
             # 遍历策略，检查是否过期
-            for strategy_data in result:
-                strategy = Strategy.from_dict(strategy_data)
+            for strategy in Strategy.from_list(result):
                 if strategy.created_at < expire_time:
-                    # 调用停用策略接口
-                    self._call_api("POST", f"/strategies/{strategy.id}/deactivate")
+                    # 调用停用策略接口，停用失败的策略仍在服务端生效，保留在价格索引中
+                    if self._call_api("POST", f"/strategies/{strategy.id}/deactivate") is None:
+                        print(f"[策略管理] 停用过期策略失败：{strategy.stock_name}({strategy.stock_code})")
+                        continue
+                    self.strategy_index.remove(strategy.id)
                     print(f"[策略管理] 清理过期策略：{strategy.stock_name}({strategy.stock_code})")
                     
         except Exception as e:
@@ -264,14 +407,13 @@ class StrategyManager:
             print(f"[策略管理] 无法匹配股票信息")
             return None, None, None
 
-        # 提取操作类型
+        # 提取操作类型，一次扫描得到所有命中的分类，再按 买入、卖出、持有 的优先级选取
         action = None
-        if any(keyword in text for keyword in ["买入策略", "建仓策略", "入场策略", "买入时机"]):
-            action = "buy"
-        elif any(keyword in text for keyword in ["卖出策略", "清仓策略", "离场策略", "卖出时机"]):
-            action = "sell"
-        elif any(keyword in text for keyword in ["持有建议", "继续持有", "持股待涨"]):
-            action = "hold"
+        categories = matcher.categories(text)
+        for candidate in ("buy", "sell", "hold"):
+            if candidate in categories:
+                action = candidate
+                break
 
         print(f"[策略管理] 提取结果: 股票={stock_name}, 代码={stock_code}, 操作={action}")
         return stock_name, stock_code, action
@@ -378,6 +520,13 @@ class StrategyManager:
             return reason
         return None
 
+    def extract_all(self, text: str) -> dict:
+        """一次扫描提取所有字段，结果与各 extract_* 方法一致，不打印日志
+        :param text: 策略文本
+        :return: 字段字典，无法提取的字段为 None
+        """
+        return extractor.extract(text)
+
     def _markdown_to_json(self, text: str) -> dict:
         """将Markdown格式的策略文本转换为JSON格式
         :param text: Markdown格式的策略文本
@@ -441,28 +590,130 @@ class StrategyManager:
             print(f"[策略管理] Markdown解析错误: {str(e)}")
             return {}
 
+    # 本地解析各字段的权重，合计为 1
+    LOCAL_FIELD_WEIGHTS = {
+        "stock": 0.3,
+        "action": 0.2,
+        "price": 0.25,
+        "position_ratio": 0.1,
+        "stop": 0.1,
+        "reason": 0.05,
+    }
+
+    def parse_local(self, text: str) -> Tuple[dict, float]:
+        """本地确定性解析策略文本，不调用AI和策略分析接口
+        :param text: 策略原文或AI整理后的Markdown文本
+        :return: (策略数据, 置信度0-1)，无法识别股票时返回 ({}, 0.0)
+        """
+        # AI整理的文本带有 **加粗**，去掉后与原文模板的写法一致
+        clean = text.replace("**", "")
+        data = self._markdown_to_json(clean) if "###" in clean else {}
+        fields = extractor.extract(clean)
+        template = extractor.extract_template(clean)
+
+        # _markdown_to_json 的操作类型是粗略推断，优先使用明确的操作要求或栏目标签
+        action = template["action"] or fields["action"]
+        if action:
+            data["action"] = action
+        for source in (fields, template):
+            for key, value in source.items():
+                if data.get(key) is None and value is not None:
+                    data[key] = value
+
+        # 固定格式中找不到股票时，用代码表在全文中识别，只有一只时才采用
+        if self.stock_index and not (data.get("stock_name") and data.get("stock_code")):
+            matches = self.stock_index.find_in_text(clean)
+            if len(matches) == 1:
+                data["stock_name"], data["stock_code"] = matches[0].name, matches[0].code
+
+        if not data.get("stock_name") or not data.get("stock_code"):
+            return {}, 0.0
+
+        weights = self.LOCAL_FIELD_WEIGHTS
+        confidence = weights["stock"]
+        valid, data["stock_name"], data["stock_code"] = self.resolve_stock(data["stock_name"], data["stock_code"])
+        if not valid:
+            confidence *= 0.5
+        if data.get("action"):
+            confidence += weights["action"]
+        if data.get("price_min") is not None and data.get("price_max") is not None:
+            confidence += weights["price"]
+        if data.get("position_ratio") is not None:
+            confidence += weights["position_ratio"]
+        if data.get("stop_loss_price") is not None or data.get("take_profit_price") is not None:
+            confidence += weights["stop"]
+        if data.get("reason"):
+            confidence += weights["reason"]
+
+        # 字段之间相互矛盾时降低置信度，交给AI和策略分析接口处理
+        price_min, price_max = data.get("price_min"), data.get("price_max")
+        stop_loss, take_profit = data.get("stop_loss_price"), data.get("take_profit_price")
+        if price_min is not None and price_max is not None and price_min > price_max:
+            confidence *= 0.5
+        if data.get("position_ratio") is not None and not 0 < data["position_ratio"] <= 1:
+            confidence *= 0.5
+        if data.get("action") in ("buy", "add") and price_min is not None:
+            if stop_loss is not None and stop_loss >= price_min:
+                confidence *= 0.7
+            if take_profit is not None and take_profit <= price_max:
+                confidence *= 0.7
+
+        confidence = round(confidence, 2)
+        print(f"[策略管理] 本地解析: {data.get('stock_name')}({data.get('stock_code')}) "
+              f"操作={data.get('action')} 置信度={confidence}")
+        return data, confidence
+
+    def to_markdown(self, data: dict) -> str:
+        """将策略数据转换为与AI回复相同格式的Markdown文本，供短信和日志使用
+        :param data: 策略数据
+        :return: Markdown格式的策略文本
+        """
+        def fmt(value) -> str:
+            return f"{value:g}"
+
+        action_text = {"buy": "买入", "sell": "卖出", "add": "加仓", "reduce": "减仓"}.get(data.get("action"), "持有")
+        lines = [
+            "### 股票名称",
+            f"{data.get('stock_name')}（{data.get('stock_code')}）",
+            "",
+            "### 操作建议",
+            "1. **执行策略**",
+            f"    - **操作要求**：{action_text}",
+        ]
+        if data.get("price_min") is not None and data.get("price_max") is not None:
+            lines.append(f"    - **交易价格**：{fmt(data['price_min'])}-{fmt(data['price_max'])}元")
+        if data.get("position_ratio") is not None:
+            lines.append(f"    - **建议数量**：{fmt(data['position_ratio'] * 100)}%仓位")
+
+        index = 2
+        if data.get("stop_loss_price") is not None:
+            lines += ["", f"{index}. **止损策略**", f"    - **止损价格**：{fmt(data['stop_loss_price'])}元下方"]
+            index += 1
+        if data.get("take_profit_price") is not None:
+            lines += ["", f"{index}. **止盈策略**", f"    - **止盈价格**：{fmt(data['take_profit_price'])}元上方"]
+            index += 1
+        if data.get("reason"):
+            lines += ["", f"{index}. **操作理由**"]
+            lines += [f"    - {point}" for point in data["reason"].split("；") if point]
+        return "\n".join(lines)
+
+    @traced("analyze_strategy")
     def analyze_strategy(self, text: str) -> Optional[dict]:
         """调用策略分析接口
         :param text: 策略文本
         :return: 分析结果
         """
         try:
-            import requests
-            from configuration import Config
-            
             print("\n===========获取到用户发送信息========")
             print(f"信息内容：\n{text}")
             
-            # 从配置中获取API URL
-            config = Config()
-            base_url = config.API["base_url"]
-            url = f"{base_url.rstrip('/')}/analyze_strategy"
+            url = f"{self.base_url}/analyze_strategy"
             
             print("\n===========调用策略分析接口==========")
             print(f"接口地址：{url}")
             print(f"传入参数：{{'strategy_text': {text}}}")
             
-            response = requests.post(url, json={"strategy_text": text})
+            response = get_session().post(url, json={"strategy_text": text})
             
             if response.status_code == 200:
                 result = response.json()
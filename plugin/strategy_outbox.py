@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Optional
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"  # 超过最大重试次数，不再补发
+
+# 本地出错（补发函数抛出异常）时重试不会自行恢复，未设置最大次数时按这个次数放弃
+LOCAL_ERROR_ATTEMPTS = 5
+PRUNE_INTERVAL = 3600  # 清理已发送记录的间隔秒数
+STUCK_ATTEMPTS = 10  # 单条记录被拒绝达到这个次数仍在重试时提醒一次
+
+
+class StrategyOutbox:
+    """策略写入发件箱
+
+    策略先写入本地 SQLite（WAL 模式，提交即落盘），再由后台线程按顺序批量补发到服务端，
+    消息处理不再等待接口返回，QMT 服务重启期间收到的策略也不会丢失。
+    每条记录带一个幂等键，通过 Idempotency-Key 请求头发送，重试时不会重复创建。
+    """
+
+    def __init__(self, path: str, send: Callable[[dict, str], bool], batch_size: int = 20,
+                 interval: float = 1.0, max_backoff: float = 60.0, max_attempts: int = 0,
+                 retention_days: int = 7, on_failed: Callable[[dict, str, bool], None] = None) -> None:
+        """
+        :param path: 数据库文件路径
+        :param send: 补发一条记录的函数，参数为 (策略数据, 幂等键)，成功返回 True
+        :param batch_size: 每轮最多补发的条数
+        :param interval: 空闲时检查的间隔秒数，也是失败重试的初始间隔
+        :param max_backoff: 失败重试的最大间隔秒数
+        :param max_attempts: 单条记录被服务端拒绝的最大次数，超过后放弃，0 表示一直重试
+        :param retention_days: 已发送的记录保留天数，后台线程定时清理，0 表示不清理
+        :param on_failed: 记录被放弃或长时间被拒绝时的回调，参数为 (策略数据, 错误信息, 是否已放弃)
+        """
+        self.path = path
+        self.send = send
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self.on_failed = on_failed
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._failures = 0  # 连续失败次数，用于整体退避
+        self._notices = []  # 本轮需要提醒的失败记录 (幂等键, 错误信息, 是否已放弃)
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_at REAL NOT NULL DEFAULT 0,
+                last_error TEXT,
+                sent_at REAL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status, id)")
+
+    @classmethod
+    def from_config(cls, conf: dict, send: Callable[[dict, str], bool]) -> Optional["StrategyOutbox"]:
+        """按配置创建，未启用时返回 None
+        :param conf: config.yaml 中的 outbox 配置
+        """
+        conf = conf or {}
+        if not conf.get("enable", False):
+            return None
+        return cls(conf.get("path", "logs/strategy_outbox.db"), send,
+                   batch_size=int(conf.get("batch_size", 20)),
+                   interval=float(conf.get("interval", 1.0)),
+                   max_backoff=float(conf.get("max_backoff", 60.0)),
+                   max_attempts=int(conf.get("max_attempts", 0)),
+                   retention_days=int(conf.get("retention_days", 7)))
+
+    def enqueue(self, payload: dict, key: str = None) -> str:
+        """写入一条待发送的策略，返回幂等键"""
+        key = key or uuid.uuid4().hex
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO outbox (key, payload, created_at) VALUES (?, ?, ?)",
+                             (key, json.dumps(payload, ensure_ascii=False), time.time()))
+        self._wakeup.set()
+        return key
+
+    def flush(self) -> int:
+        """补发一批到期的记录
+        某条失败而后面一条成功时，只让失败的那条单独退避；连续两条失败视为服务端不可用，停止本轮。
+        补发函数抛出异常属于本地错误，与服务端是否可用无关，直接单独退避并计入重试次数
+        :return: 本轮成功的条数
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, key, payload, created_at, attempts FROM outbox "
+                "WHERE status = ? AND next_at <= ? ORDER BY id LIMIT ?",
+                (PENDING, now, self.batch_size)).fetchall()
+
+        sent, updates, failed = 0, [], None
+        for row_id, key, payload, created_at, attempts in rows:
+            try:
+                ok = bool(self.send(json.loads(payload), key))
+            except Exception as e:
+                updates.append(self._failure(row_id, key, attempts, f"本地错误: {str(e)}", row_backoff=True, local=True))
+                continue
+
+            if not ok:
+                if failed is not None:
+                    break
+                failed = (row_id, key, attempts, None)
+                continue
+
+            now = time.time()
+            lag = now - created_at
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            updates.append(("UPDATE outbox SET status = ?, sent_at = ?, attempts = ? WHERE id = ?",
+                            (SENT, now, attempts + 1, row_id)))
+            sent += 1
+            if attempts:
+                print(f"[发件箱] 补发成功 {key}，延迟 {lag:.1f}s，重试 {attempts} 次")
+            if failed is not None:
+                # 服务端正常，只是前一条被拒绝，让它单独退避，不阻塞后面的记录
+                updates.append(self._failure(*failed, row_backoff=True))
+                failed = None
+
+        if failed is not None:
+            updates.append(self._failure(*failed, row_backoff=False))
+        if updates:
+            # 一轮的状态更新放在同一个事务中提交
+            with self._lock:
+                self._db.execute("BEGIN")
+                for sql, params in updates:
+                    self._db.execute(sql, params)
+                self._db.execute("COMMIT")
+        if self._notices:
+            payloads = {key: payload for _, key, payload, _, _ in rows}
+            notices, self._notices = self._notices, []
+            for key, error, gave_up in notices:
+                self._notify(json.loads(payloads[key]), error, gave_up)
+        self._failures = self._failures + 1 if failed is not None else 0
+        return sent
+
+    def _failure(self, row_id: int, key: str, attempts: int, error: Optional[str], row_backoff: bool,
+                 local: bool = False) -> tuple:
+        """记录一次发送失败，返回待执行的更新语句"""
+        attempts += 1
+        max_attempts = self.max_attempts or (LOCAL_ERROR_ATTEMPTS if local else 0)
+        # 服务端不可用时由整体退避控制重试，保持原有顺序，也不会因此放弃
+        status = FAILED if row_backoff and max_attempts and attempts >= max_attempts else PENDING
+        next_at = time.time() + self._backoff(attempts) if row_backoff else 0
+        print(f"[发件箱] 发送失败 {key}，第 {attempts} 次{'，已放弃' if status == FAILED else ''}")
+        if status == FAILED or (row_backoff and attempts == STUCK_ATTEMPTS):
+            self._notices.append((key, error or "接口调用失败", status == FAILED))
+        return ("UPDATE outbox SET status = ?, attempts = ?, next_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, next_at, error or "接口调用失败", row_id))
+
+    def _notify(self, payload: dict, error: str, gave_up: bool) -> None:
+        """放弃或长时间被拒绝的记录交给 on_failed 回调提醒"""
+        if self.on_failed is None:
+            return
+        try:
+            self.on_failed(payload, error, gave_up)
+        except Exception as e:
+            print(f"[发件箱] 失败提醒出错: {str(e)}")
+
+    def _backoff(self, failures: int) -> float:
+        return min(self.max_backoff, self.interval * 2 ** (failures - 1))
+
+    def _run(self) -> None:
+        retry_at, pruned_at = 0.0, 0.0
+        while not self._stop.is_set():
+            if self.retention_days and time.time() - pruned_at >= PRUNE_INTERVAL:
+                pruned_at = time.time()
+                try:
+                    pruned = self.prune(self.retention_days)
+                    if pruned:
+                        print(f"[发件箱] 已清理 {pruned} 条 {self.retention_days} 天前发送的记录")
+                except Exception as e:
+                    print(f"[发件箱] 清理出错: {str(e)}")
+            if time.time() >= retry_at:
+                try:
+                    sent = self.flush()
+                except Exception as e:
+                    print(f"[发件箱] 补发出错: {str(e)}")
+                    sent, self._failures = 0, self._failures + 1
+                # 连续失败时整体退避，新写入的记录也不会提前触发请求
+                retry_at = time.time() + self._backoff(self._failures) if self._failures else 0.0
+                if not self._failures and sent >= self.batch_size:
+                    continue  # 可能还有积压，立即处理下一批
+            self._wakeup.wait(max(retry_at - time.time(), 0.0) or self.interval)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """启动后台补发线程，上次退出时未发送的记录会继续补发"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="StrategyOutbox", daemon=True)
+            self._thread.start()
+            pending = self.pending()
+            if pending:
+                print(f"[发件箱] 有 {pending} 条策略待补发")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM outbox WHERE status = ?", (PENDING,)).fetchone()[0]
+
+    def lag(self) -> float:
+        """最早一条待发送记录的等待秒数，没有待发送时为 0"""
+        with self._lock:
+            oldest = self._db.execute("SELECT MIN(created_at) FROM outbox WHERE status = ?",
+                                      (PENDING,)).fetchone()[0]
+        return time.time() - oldest if oldest else 0.0
+
+    def stats(self) -> dict:
+        """发件箱状态：待发送、已发送、已放弃的条数，最早一条待发送的等待秒数（补发延迟）"""
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        return {
+            PENDING: counts.get(PENDING, 0),
+            SENT: counts.get(SENT, 0),
+            FAILED: counts.get(FAILED, 0),
+            "lag": self.lag(),
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
+
+    def prune(self, days: int = 7) -> int:
+        """删除 days 天前已发送的记录"""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM outbox WHERE status = ? AND sent_at < ?",
+                                      (SENT, time.time() - days * 86400))
+        return cursor.rowcount
@@ -0,0 +1,308 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""消息处理链路追踪
+
+用法:
+    from plugin.tracing import span, traced
+
+    @traced("processMsg", lambda self, msg: {"msg.type": msg.type})
+    def processMsg(self, msg): ...
+
+    with span("get_answer", backend="ChatGPT"):
+        ...
+
+没有父 span 时开始一条新的 trace，同一条消息处理过程中的 span 共享 trace ID（通过 contextvars 传递）。
+结束的 span 进入内存环形缓冲区，并由后台线程批量导出为 JSONL 或 OpenTelemetry OTLP/JSON。
+未启用时 span() 返回共享的空对象，traced 装饰的函数只多一次属性判断。
+
+统计导出的 JSONL: python -m plugin.tracing logs/traces.jsonl
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """一次计时，作为上下文管理器使用"""
+    __slots__ = ("tracer", "trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns",
+                 "error", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"], attributes: dict) -> None:
+        self.tracer = tracer
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error = None
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NoopSpan:
+    """未启用追踪时使用的空 span"""
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonlExporter:
+    """每个 span 一行 JSON"""
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(s.to_dict(), ensure_ascii=False) + "\n" for s in spans))
+
+
+class OtlpJsonExporter:
+    """OpenTelemetry OTLP/JSON 格式
+
+    配置 endpoint 时发送到 OTLP/HTTP 接收端（如 http://127.0.0.1:4318/v1/traces），
+    配置 path 时每批追加一行 ExportTraceServiceRequest，可用 Collector 的 otlpjsonfile 接收器读取。
+    """
+
+    def __init__(self, path: str = None, endpoint: str = None, service_name: str = "wechat-robot") -> None:
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.endpoint = endpoint
+        self.service_name = service_name
+
+    @staticmethod
+    def _value(value) -> dict:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def payload(self, spans: List[Span]) -> dict:
+        otlp_spans = []
+        for s in spans:
+            item = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": self._value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            otlp_spans.append(item)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "plugin.tracing"}, "spans": otlp_spans}],
+        }]}
+
+    def export(self, spans: List[Span]) -> None:
+        payload = self.payload(spans)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        if self.endpoint:
+            from base.http_client import get_session
+            get_session().post(self.endpoint, json=payload, timeout=5)
+
+
+class Tracer:
+    """追踪器：环形缓冲区加后台导出线程"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.buffer = deque(maxlen=2048)
+        self.exporters = []
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+
+    def configure(self, conf: dict) -> None:
+        """按配置启用或关闭
+        :param conf: config.yaml 中的 tracing 配置
+        """
+        conf = conf or {}
+        self.enabled = bool(conf.get("enable", False))
+        if not self.enabled:
+            return
+        self.buffer = deque(self.buffer, maxlen=int(conf.get("buffer_size", 2048)))
+        self.exporters = []
+        if conf.get("jsonl"):
+            self.exporters.append(JsonlExporter(conf["jsonl"]))
+        if conf.get("otlp_file") or conf.get("otlp_endpoint"):
+            self.exporters.append(OtlpJsonExporter(conf.get("otlp_file"), conf.get("otlp_endpoint"),
+                                                   conf.get("service_name", "wechat-robot")))
+        if self.exporters and self._thread is None:
+            self._queue = queue.Queue(maxsize=int(conf.get("queue_size", 10000)))
+            self._thread = threading.Thread(target=self._export_loop, name="TraceExporter", daemon=True)
+            self._thread.start()
+
+    def span(self, name: str, **attributes):
+        """创建 span，未启用时返回空对象"""
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, _current.get(), attributes)
+
+    def traced(self, name: str = None, attributes: Callable[..., dict] = None):
+        """装饰器：函数每次调用记为一个 span
+        :param name: span 名称，默认为函数名
+        :param attributes: 根据调用参数生成属性的函数
+        """
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                attrs = {}
+                if attributes is not None:
+                    try:
+                        attrs = attributes(*args, **kwargs)
+                    except Exception:
+                        pass
+                with Span(self, span_name, _current.get(), attrs):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, span: Span) -> None:
+        self.buffer.append(span)
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+
+    def _export_loop(self) -> None:
+        while True:
+            spans = [self._queue.get()]
+            while len(spans) < 500:
+                try:
+                    spans.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for exporter in self.exporters:
+                try:
+                    exporter.export(spans)
+                except Exception as e:
+                    print(f"[链路追踪] 导出失败 {exporter.__class__.__name__}: {str(e)}")
+
+    def recent(self, limit: int = 100) -> List[dict]:
+        """最近结束的 span"""
+        return [s.to_dict() for s in list(self.buffer)[-limit:]]
+
+    def trace(self, trace_id: str) -> List[dict]:
+        """缓冲区中某条 trace 的所有 span，按开始时间排序"""
+        return sorted((s.to_dict() for s in list(self.buffer) if s.trace_id == trace_id), key=lambda d: d["start"])
+
+
+def current_trace_id() -> Optional[str]:
+    """当前消息的 trace ID，不在 span 中时为 None"""
+    current = _current.get()
+    return current.trace_id if current else None
+
+
+def summarize(spans: List[dict]) -> Dict[str, dict]:
+    """按 span 名称统计次数、错误数和耗时分位数（毫秒）"""
+    grouped: Dict[str, List[dict]] = {}
+    for s in spans:
+        grouped.setdefault(s["name"], []).append(s)
+    summary = {}
+    for name, group in grouped.items():
+        durations = sorted(s["duration_ms"] for s in group)
+
+        def pct(p: float) -> float:
+            return durations[min(len(durations) - 1, int(p * len(durations)))]
+
+        summary[name] = {
+            "count": len(group),
+            "errors": sum(1 for s in group if s.get("error")),
+            "p50": pct(0.5),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "max": durations[-1],
+            "total": sum(durations),
+        }
+    return summary
+
+
+tracer = Tracer()
+span = tracer.span
+traced = tracer.traced
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="统计链路追踪 JSONL")
+    parser.add_argument("path", nargs="?", default="logs/traces.jsonl", help="JSONL 文件路径")
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    print(f"span: {len(records)} 个，trace: {len({r['trace_id'] for r in records})} 条")
+    print(f"{'名称':<22}{'次数':>8}{'错误':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'最大(ms)':>10}{'合计(ms)':>12}")
+    for name, s in sorted(summarize(records).items(), key=lambda item: -item[1]["total"]):
+        print(f"{name:<24}{s['count']:>8}{s['errors']:>6}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}"
+              f"{s['max']:>10.1f}{s['total']:>12.1f}")
@@ -17,11 +17,16 @@ from base.func_chatgpt import ChatGPT
 from base.func_chengyu import cy
 from base.func_weather import Weather
 from base.func_news import News
+from base.func_router import ChatRouter
 from base.func_tigerbot import TigerBot
+from base.func_warmup import Warmup
 from base.func_xinghuo_web import XinghuoWeb
 from configuration import Config
 from constants import ChatType
 from job_mgmt import Job
+from plugin import metrics
+from plugin.profiler import PROFILE_COMMAND, STOP_COMMAND, profiler
+from plugin.tracing import span, traced, tracer
 
 __version__ = "39.2.4.0"
 
@@ -30,52 +35,76 @@ class Robot(Job):
     """个性化自己的机器人
     """
 
-    def __init__(self, config: Config, wcf: Wcf, chat_type: int) -> None:
+    def __init__(self, config: Config, wcf: Wcf, chat_type: int, warmup: Warmup = None) -> None:
         self.wcf = wcf
         self.config = config
         self.LOG = logging.getLogger("Robot")
         self.wxid = self.wcf.get_self_wxid()
         self.allContacts = self.getAllContacts()
         self._msg_timestamps = []
+        tracer.configure(getattr(self.config, "TRACING", {}))
+        metrics.configure(getattr(self.config, "METRICS", {}))
 
+        if warmup:
+            # 模型已在后台创建和预热，与微信握手、获取联系人并行进行
+            self.chat = warmup.wait()
+        else:
+            self.chat = Robot.createChat(self.config, chat_type)
+
+        self.LOG.info(f"已选择: {self.chat}")
+        metrics.watch_conversations(self.chat)
+
+    @staticmethod
+    def createChat(config: Config, chat_type: int):
+        """根据配置和启动参数创建模型对象，未配置时返回 None
+        """
         if ChatType.is_in_chat_types(chat_type):
-            if chat_type == ChatType.TIGER_BOT.value and TigerBot.value_check(self.config.TIGERBOT):
-                self.chat = TigerBot(self.config.TIGERBOT)
-            elif chat_type == ChatType.CHATGPT.value and ChatGPT.value_check(self.config.CHATGPT):
-                self.chat = ChatGPT(self.config.CHATGPT)
-            elif chat_type == ChatType.XINGHUO_WEB.value and XinghuoWeb.value_check(self.config.XINGHUO_WEB):
-                self.chat = XinghuoWeb(self.config.XINGHUO_WEB)
-            elif chat_type == ChatType.CHATGLM.value and ChatGLM.value_check(self.config.CHATGLM):
-                self.chat = ChatGLM(self.config.CHATGLM)
-            elif chat_type == ChatType.BardAssistant.value and BardAssistant.value_check(self.config.BardAssistant):
-                self.chat = BardAssistant(self.config.BardAssistant)
-            elif chat_type == ChatType.ZhiPu.value and ZhiPu.value_check(self.config.ZhiPu):
-                self.chat = ZhiPu(self.config.ZhiPu)
-            elif chat_type == ChatType.OLLAMA.value and Ollama.value_check(self.config.OLLAMA):
-                self.chat = Ollama(self.config.OLLAMA)
+            if chat_type == ChatType.TIGER_BOT.value and TigerBot.value_check(config.TIGERBOT):
+                return TigerBot(config.TIGERBOT)
+            elif chat_type == ChatType.CHATGPT.value and ChatGPT.value_check(config.CHATGPT):
+                return ChatGPT(config.CHATGPT)
+            elif chat_type == ChatType.XINGHUO_WEB.value and XinghuoWeb.value_check(config.XINGHUO_WEB):
+                return XinghuoWeb(config.XINGHUO_WEB)
+            elif chat_type == ChatType.CHATGLM.value and ChatGLM.value_check(config.CHATGLM):
+                return ChatGLM(config.CHATGLM)
+            elif chat_type == ChatType.BardAssistant.value and BardAssistant.value_check(config.BardAssistant):
+                return BardAssistant(config.BardAssistant)
+            elif chat_type == ChatType.ZhiPu.value and ZhiPu.value_check(config.ZhiPu):
+                return ZhiPu(config.ZhiPu)
+            elif chat_type == ChatType.OLLAMA.value and Ollama.value_check(config.OLLAMA):
+                return Ollama(config.OLLAMA)
+            elif chat_type == ChatType.ROUTER.value and ChatRouter.value_check(config.ROUTER):
+                return ChatRouter(config.ROUTER, Robot.routerProviderConfs(config))
             else:
-                self.LOG.warning("未配置模型")
-                self.chat = None
+                logging.getLogger("Robot").warning("未配置模型")
         else:
-            if TigerBot.value_check(self.config.TIGERBOT):
-                self.chat = TigerBot(self.config.TIGERBOT)
-            elif ChatGPT.value_check(self.config.CHATGPT):
-                self.chat = ChatGPT(self.config.CHATGPT)
-            elif Ollama.value_check(self.config.OLLAMA):
-                self.chat = Ollama(self.config.OLLAMA)
-            elif XinghuoWeb.value_check(self.config.XINGHUO_WEB):
-                self.chat = XinghuoWeb(self.config.XINGHUO_WEB)
-            elif ChatGLM.value_check(self.config.CHATGLM):
-                self.chat = ChatGLM(self.config.CHATGLM)
-            elif BardAssistant.value_check(self.config.BardAssistant):
-                self.chat = BardAssistant(self.config.BardAssistant)
-            elif ZhiPu.value_check(self.config.ZhiPu):
-                self.chat = ZhiPu(self.config.ZhiPu)
+            if TigerBot.value_check(config.TIGERBOT):
+                return TigerBot(config.TIGERBOT)
+            elif ChatGPT.value_check(config.CHATGPT):
+                return ChatGPT(config.CHATGPT)
+            elif Ollama.value_check(config.OLLAMA):
+                return Ollama(config.OLLAMA)
+            elif XinghuoWeb.value_check(config.XINGHUO_WEB):
+                return XinghuoWeb(config.XINGHUO_WEB)
+            elif ChatGLM.value_check(config.CHATGLM):
+                return ChatGLM(config.CHATGLM)
+            elif BardAssistant.value_check(config.BardAssistant):
+                return BardAssistant(config.BardAssistant)
+            elif ZhiPu.value_check(config.ZhiPu):
+                return ZhiPu(config.ZhiPu)
             else:
-                self.LOG.warning("未配置模型")
-                self.chat = None
+                logging.getLogger("Robot").warning("未配置模型")
+        return None
 
-        self.LOG.info(f"已选择: {self.chat}")
+    @staticmethod
+    def routerProviderConfs(config: Config) -> dict:
+        """多模型路由可用的模型配置"""
+        return {
+            "chatgpt": config.CHATGPT,
+            "zhipu": config.ZhiPu,
+            "ollama": config.OLLAMA,
+            "chatglm": config.CHATGLM,
+        }
 
     @staticmethod
     def value_check(args: dict) -> bool:
@@ -124,7 +153,12 @@ class Robot(Job):
             rsp = "你@我干嘛？"
         else:  # 接了 ChatGPT，智能回复
             q = re.sub(r"@.*?[\u2005|\s]", "", msg.content).replace(" ", "")
-            rsp = self.chat.get_answer(q, (msg.roomid if msg.from_group() else msg.sender))
+            backend = self.chat.__class__.__name__
+            with span("get_answer", backend=backend), metrics.LLM_SECONDS.time(backend=backend):
+                rsp = self.chat.get_answer(q, (msg.roomid if msg.from_group() else msg.sender))
+            metrics.observe_usage(self.chat)
+            if not rsp:
+                metrics.LLM_FAILURES.inc(backend=backend)
 
         if rsp:
             if msg.from_group():
@@ -137,6 +171,8 @@ class Robot(Job):
             self.LOG.error(f"无法从 ChatGPT 获得答案")
             return False
 
+    @traced("processMsg", lambda self, msg: {"msg.id": msg.id, "msg.type": msg.type, "msg.from_group": msg.from_group()})
+    @metrics.track_message
     def processMsg(self, msg: WxMsg) -> None:
         """当接收到消息的时候，会调用本方法。如果不实现本方法，则打印原始消息。
         此处可进行自定义发送的内容,如通过 msg.content 关键字自动获取当前天气信息，并发送到对应的群组@发送者
@@ -173,6 +209,11 @@ class Robot(Job):
                 if msg.content == "^更新$":
                     self.config.reload()
                     self.LOG.info("已更新")
+                elif msg.content == STOP_COMMAND:
+                    self.sendTextMsg(self.stopProfiler(), "filehelper")
+                elif PROFILE_COMMAND.match(msg.content):
+                    seconds = PROFILE_COMMAND.match(msg.content).group(1)
+                    self.sendTextMsg(self.startProfiler(int(seconds) if seconds else None), "filehelper")
             else:
                 self.toChitchat(msg)  # 闲聊
 
@@ -203,6 +244,7 @@ class Robot(Job):
         self.wcf.enable_receiving_msg()
         Thread(target=innerProcessMsg, name="GetMessage", args=(self.wcf,), daemon=True).start()
 
+    @traced("sendTextMsg", lambda self, msg, receiver, *args, **kwargs: {"receiver": receiver})
     def sendTextMsg(self, msg: str, receiver: str, at_list: str = "") -> None:
         """ 发送消息
         :param msg: 消息字符串
@@ -216,7 +258,8 @@ class Robot(Job):
             # 清除超过1分钟的记录
             self._msg_timestamps = [t for t in self._msg_timestamps if now - t < 60]
             if len(self._msg_timestamps) >= self.config.SEND_RATE_LIMIT:
-                self.LOG.warning("发送消息过快，已达到每分钟"+self.config.SEND_RATE_LIMIT+"条上限。")
+                self.LOG.warning(f"发送消息过快，已达到每分钟{self.config.SEND_RATE_LIMIT}条上限。")
+                metrics.SEND_RATE_LIMITED.inc()
                 return
             self._msg_timestamps.append(now)
 
@@ -238,6 +281,25 @@ class Robot(Job):
         else:
             self.LOG.info(f"To {receiver}: {ats}\r{msg}")
             self.wcf.send_text(f"{ats}\n\n{msg}", receiver, at_list)
+        metrics.MESSAGES_SENT.inc(mode="send")
+
+    def startProfiler(self, seconds: int = None) -> str:
+        """开始采样性能分析，结束后把结果文件路径发给文件传输助手
+        :param seconds: 采样秒数，不填时使用默认时长
+        :return: 提示信息
+        """
+        def on_done(path: str, samples: int) -> None:
+            self.sendTextMsg(f"性能分析完成，采样 {samples} 次: {path}", "filehelper")
+
+        _, message = profiler.start(seconds, on_done)
+        self.LOG.info(message)
+        return message
+
+    def stopProfiler(self) -> str:
+        """提前结束性能分析"""
+        _, message = profiler.stop()
+        self.LOG.info(message)
+        return message
 
     def getAllContacts(self) -> dict:
         """
@@ -2,10 +2,12 @@
 
 import logging
 import re
+import textwrap
 import time
 import xml.etree.ElementTree as ET
 from queue import Empty
 from threading import Thread
+from typing import Optional
 from base.func_zhipu import ZhiPu
 
 from wcferry import Wcf, WxMsg
@@ -15,13 +17,20 @@ from base.func_chatglm import ChatGLM
 from base.func_chatgpt import ChatGPT
 from base.func_chengyu import cy
 from base.func_news import News
+from base.func_router import ChatRouter
 from base.func_tigerbot import TigerBot
 from base.func_xinghuo_web import XinghuoWeb
 from configuration import Config
 from constants import ChatType
 from job_mgmt import Job
 import os
+from plugin.keyword_matcher import GATE_CATEGORIES, matcher
+from plugin import metrics
+from plugin.message_archive import MessageArchive
+from plugin.profiler import PROFILE_COMMAND, STOP_COMMAND, profiler
+from plugin.relevance_classifier import IRRELEVANT_ANSWER, RelevanceClassifier
 from plugin.strategy_manager import StrategyManager
+from plugin.tracing import span, traced, tracer
 from plugin.robot_logger import RobotLogger
 from plugin.sms_sender import SmsSender
 
@@ -38,12 +47,15 @@ class Robot(Job):
         self.wcf = wcf
         self.config = config
         self.LOG = logging.getLogger("Robot")
+        tracer.configure(getattr(self.config, "TRACING", {}))
+        metrics.configure(getattr(self.config, "METRICS", {}))
         self.wxid = self.wcf.get_self_wxid()
         self.allContacts = self.getAllContacts()
         
-        # 初始化日志管理器
-        self.robot_logger = RobotLogger()
+        # 初始化日志管理器，启用归档时日志同时写入 SQLite
+        self.robot_logger = RobotLogger(archive=MessageArchive.from_config(getattr(self.config, "ARCHIVE", {})))
         self.LOG.info("日志管理器已初始化")
+        metrics.QUEUE_DEPTH.set_function(self.robot_logger._queue.qsize, queue="robot_logger")
         
         # GUI引用，用于显示日志
         self.gui = None
@@ -56,34 +68,46 @@ class Robot(Job):
         # 设置OCR插件的robot引用，以便记录日志
         self.image_ocr.robot = self
         
-        self.strategy_manager = StrategyManager()
+        self.strategy_manager = StrategyManager(self.config)
+        if self.strategy_manager.outbox is not None:
+            self.strategy_manager.outbox.on_failed = self.onOutboxFailed
+            self.strategy_manager.outbox.start()
+            metrics.QUEUE_DEPTH.set_function(self.strategy_manager.outbox.pending, queue="strategy_outbox")
+            metrics.QUEUE_LAG.set_function(self.strategy_manager.outbox.lag, queue="strategy_outbox")
+        # 调用AI之前的相关性分类器，未启用时为 None
+        self.relevance = RelevanceClassifier.from_config(getattr(self.config, "PREFILTER", {}))
+
+        # 提示词只构建一次，作为系统消息固定在对话最前面，服务端可以复用前缀缓存
+        self.ai_prompt = self.get_ai_prompt()
 
         # 初始化AI模型
         if ChatType.is_in_chat_types(chat_type):
             if chat_type == ChatType.TIGER_BOT.value and TigerBot.value_check(self.config.TIGERBOT):
                 self.chat = TigerBot(self.config.TIGERBOT)
             elif chat_type == ChatType.CHATGPT.value and ChatGPT.value_check(self.config.CHATGPT):
-                self.chat = ChatGPT(self.config.CHATGPT)
+                self.chat = ChatGPT({**self.config.CHATGPT, "prompt": self.ai_prompt})
             elif chat_type == ChatType.XINGHUO_WEB.value and XinghuoWeb.value_check(self.config.XINGHUO_WEB):
                 self.chat = XinghuoWeb(self.config.XINGHUO_WEB)
             elif chat_type == ChatType.CHATGLM.value and ChatGLM.value_check(self.config.CHATGLM):
-                self.chat = ChatGLM(self.config.CHATGLM)
+                self.chat = ChatGLM({**self.config.CHATGLM, "prompt": self.ai_prompt})
             elif chat_type == ChatType.BardAssistant.value and BardAssistant.value_check(self.config.BardAssistant):
                 self.chat = BardAssistant(self.config.BardAssistant)
             elif chat_type == ChatType.ZhiPu.value and ZhiPu.value_check(self.config.ZhiPu):
                 # 使用自定义prompt初始化智谱AI
                 zhipu_config = self.config.ZhiPu.copy()
-                zhipu_config["prompt"] = self.get_ai_prompt()
+                zhipu_config["prompt"] = self.ai_prompt
                 self.chat = ZhiPu(zhipu_config)
+            elif chat_type == ChatType.ROUTER.value and ChatRouter.value_check(self.config.ROUTER):
+                self.chat = ChatRouter(self.config.ROUTER, self.routerProviderConfs())
             elif chat_type == ChatType.WenXin.value and WenXin.value_check(self.config.WenXin):
                 # 使用自定义prompt初始化文心一言
                 wenxin_config = self.config.WenXin.copy()
-                wenxin_config["prompt"] = self.get_ai_prompt()
+                wenxin_config["prompt"] = self.ai_prompt
                 self.chat = WenXin(wenxin_config)
             elif chat_type == ChatType.QianWen.value and QianWen.value_check(self.config.QianWen):
                 # 使用自定义prompt初始化通义千问
                 qianwen_config = self.config.QianWen.copy()
-                qianwen_config["prompt"] = self.get_ai_prompt()
+                qianwen_config["prompt"] = self.ai_prompt
                 self.chat = QianWen(qianwen_config)
             else:
                 self.LOG.warning("未配置AI模型")
@@ -92,23 +116,27 @@ class Robot(Job):
             if TigerBot.value_check(self.config.TIGERBOT):
                 self.chat = TigerBot(self.config.TIGERBOT)
             elif ChatGPT.value_check(self.config.CHATGPT):
-                self.chat = ChatGPT(self.config.CHATGPT)
+                self.chat = ChatGPT({**self.config.CHATGPT, "prompt": self.ai_prompt})
             elif XinghuoWeb.value_check(self.config.XINGHUO_WEB):
                 self.chat = XinghuoWeb(self.config.XINGHUO_WEB)
             elif ChatGLM.value_check(self.config.CHATGLM):
-                self.chat = ChatGLM(self.config.CHATGLM)
+                self.chat = ChatGLM({**self.config.CHATGLM, "prompt": self.ai_prompt})
             elif BardAssistant.value_check(self.config.BardAssistant):
                 self.chat = BardAssistant(self.config.BardAssistant)
             elif ZhiPu.value_check(self.config.ZhiPu):
                 # 使用自定义prompt初始化智谱AI
                 zhipu_config = self.config.ZhiPu.copy()
-                zhipu_config["prompt"] = self.get_ai_prompt()
+                zhipu_config["prompt"] = self.ai_prompt
                 self.chat = ZhiPu(zhipu_config)
             else:
                 self.LOG.warning("未配置AI模型")
                 self.chat = None
 
         self.LOG.info(f"已选择AI模型: {self.chat}")
+        metrics.watch_conversations(self.chat)
+        # 不支持系统提示词的模型，仍需把提示词拼接在问题前面
+        self.prompt_in_system = isinstance(self.chat, (ZhiPu, ChatGPT, ChatGLM, ChatRouter))
+        self.LOG.info(f"AI提示词{'作为系统消息发送' if self.prompt_in_system else '拼接在问题前发送'}，长度 {len(self.ai_prompt)}")
 
         # 初始化短信发送插件
         if hasattr(self.config, 'SMS') and SmsSender.value_check(self.config.SMS):
@@ -121,6 +149,68 @@ class Robot(Job):
         # 添加定时任务：每小时清理过期策略
         self.onEveryHours(1, self.strategy_manager.cleanup_expired_strategies)
 
+        # 价格监控：按行情判断活跃策略的入场、止损、止盈条件
+        self.price_monitor = None
+        self.price_monitor_conf = getattr(self.config, "PRICE_MONITOR", {})
+        if self.price_monitor_conf.get("enable", False):
+            self.startPriceMonitor()
+
+    def startPriceMonitor(self) -> None:
+        """加载活跃策略并启动价格监控，定时刷新策略列表"""
+        from plugin.price_monitor import CsvReplayFeed, PriceMonitor
+
+        # 使用策略管理器增量维护的价格索引，新增的策略不必等到下次刷新
+        self.price_monitor = PriceMonitor(self.onPriceAlert, self.strategy_manager.strategy_index)
+        self.reloadMonitoredStrategies()
+        self.onEveryMinutes(int(self.price_monitor_conf.get("reload_minutes", 5)), self.reloadMonitoredStrategies)
+
+        replay_csv = self.price_monitor_conf.get("replay_csv")
+        if replay_csv:
+            feed = CsvReplayFeed(replay_csv, interval=float(self.price_monitor_conf.get("replay_interval", 1)))
+            self.price_monitor.start(feed)
+            self.LOG.info(f"价格监控已启动，回放行情: {replay_csv}")
+        else:
+            self.LOG.warning("价格监控未配置行情源，只加载策略")
+
+    def reloadMonitoredStrategies(self) -> None:
+        # list_active_strategies 会用服务端的完整列表重建价格索引
+        strategies = self.strategy_manager.list_active_strategies()
+        self.LOG.info(f"价格监控已加载 {len(strategies)} 条活跃策略")
+
+    def onPriceAlert(self, alert) -> None:
+        """价格触发时发送微信消息和短信"""
+        from plugin.price_monitor import ENTRY, STOP_LOSS
+
+        message = alert.message()
+        self.log_to_gui(message, "STRATEGY")
+        for receiver in self.price_monitor_conf.get("receivers", []):
+            self.sendTextMsg(message, receiver)
+
+        if self.sms_sender is not None and self.price_monitor_conf.get("sms", False):
+            if alert.kind == ENTRY:
+                action = {"buy": "买入", "add": "加仓", "sell": "卖出", "reduce": "减仓"}.get(alert.action, "持有")
+            else:
+                action = "止损" if alert.kind == STOP_LOSS else "止盈"
+            self.sms_sender.send_price_alert(alert.stock_name, alert.stock_code, action, alert.price)
+
+    def onOutboxFailed(self, payload: dict, error: str, gave_up: bool) -> None:
+        """发件箱中的策略放弃同步或长时间被拒绝时，在界面和文件传输助手提醒"""
+        state = "同步失败，已放弃" if gave_up else "多次被服务端拒绝，仍在重试"
+        message = f"策略{state}: {payload.get('stock_name')}({payload.get('stock_code')}) {payload.get('action')}，{error}"
+        self.log_to_gui(message, "ERROR")
+        self.sendTextMsg(message, "filehelper")
+
+    def routerProviderConfs(self) -> dict:
+        """多模型路由可用的模型配置"""
+        confs = {
+            "chatgpt": self.config.CHATGPT,
+            "zhipu": self.config.ZhiPu,
+            "ollama": getattr(self.config, "OLLAMA", {}),
+            "chatglm": self.config.CHATGLM,
+        }
+        # 各模型统一使用股票策略提示词作为系统消息
+        return {name: {**conf, "prompt": self.ai_prompt} if conf else conf for name, conf in confs.items()}
+
     @staticmethod
     def value_check(args: dict) -> bool:
         if args:
@@ -166,20 +256,50 @@ class Robot(Job):
         :param text: 待检查的文本
         :return: 是否是有效的策略文本
         """
-        keywords = ['股票', '买入', '卖出', '仓位', '价格', '止盈', '止损']
-        return any(keyword in text for keyword in keywords)
+        return matcher.first(text, {"strategy"}) is not None
+
+    def is_worth_asking(self, text: str) -> bool:
+        """调用AI之前的前置过滤：不含任何策略信号词的消息直接跳过
+        :param text: 消息文本或OCR识别结果
+        :return: 是否值得调用AI
+        """
+        if not getattr(self.config, "PREFILTER", {}).get("enable", True):
+            return True
+        hit = matcher.first(text, GATE_CATEGORIES)
+        if hit is None:
+            self.LOG.info("未命中任何策略关键词，跳过AI分析")
+            metrics.AI_SKIPPED.inc(reason="keyword")
+            return False
+        self.LOG.info(f"命中策略关键词: {hit.keyword}")
+
+        if self.relevance:
+            relevant, score = self.relevance.is_relevant(text)
+            if not relevant:
+                if self.relevance.shadow:
+                    self.LOG.info(f"相关概率 {score:.2f} 低于阈值，影子模式下仍调用AI")
+                else:
+                    self.LOG.info(f"相关概率 {score:.2f} 低于阈值，跳过AI分析")
+                    metrics.AI_SKIPPED.inc(reason="classifier")
+                    return False
+        return True
+
+    def observe_relevance(self, text: str, ai_response: str) -> None:
+        """影子模式下用AI的实际回复统计分类器的召回率"""
+        if self.relevance and self.relevance.shadow and ai_response:
+            self.relevance.observe(text, ai_response.strip() != IRRELEVANT_ANSWER)
+            self.LOG.info(self.relevance.stats())
 
     def log_to_gui(self, message, level="INFO"):
         """向GUI发送日志消息"""
         if hasattr(self, "gui") and self.gui:
-            self.gui.root.after(0, lambda: self.gui.add_log_message(message, level))
+            self.gui.add_log_message(message, level)
         self.LOG.info(message)
 
     def get_ai_prompt(self) -> str:
         """获取AI提示词
         :return: 统一的AI提示词
         """
-        return """
+        return textwrap.dedent("""
         你是一个股票策略研究专家，请根据我提供的信息，给出股票的交易策略。
         用户给你的内容有可能是通过图片OCR识别的，请自行拼接整理，并忽略文字识别错误。
         如果我提供的信息跟股票无关，则直接返回"无相关信息"。
@@ -282,7 +402,28 @@ class Robot(Job):
         4. **操作理由**
             - 根据用户输入的信息整理相关理由
             - 不要添加任何用户未提供的信息
+        """).strip()
+
+    def ask_ai(self, question: str, wxid: str) -> str:
+        """向AI提问，提示词已作为系统消息时只发送问题本身
+        :param question: 问题内容
+        :param wxid: 会话ID，私聊为微信id，群聊为群id
+        :return: AI回复
         """
+        if not self.prompt_in_system:
+            question = self.ai_prompt + "\n" + question
+        backend = self.chat.__class__.__name__
+        with span("get_answer", backend=backend), metrics.LLM_SECONDS.time(backend=backend):
+            rsp = self.chat.get_answer(question, wxid)
+        if not rsp:
+            metrics.LLM_FAILURES.inc(backend=backend)
+        metrics.observe_usage(self.chat)
+
+        usage = getattr(self.chat, "last_usage", None)
+        if usage:
+            self.LOG.info(f"提示词 {usage['prompt_tokens']} tokens，命中前缀缓存 {usage['cached_tokens']} tokens，"
+                          f"累计节省 {self.chat.cached_tokens_total} tokens")
+        return rsp
 
     def toChitchat(self, msg: WxMsg) -> bool:
         """闲聊，接入 ChatGPT
@@ -295,18 +436,14 @@ class Robot(Job):
             q = re.sub(r"@.*?[\u2005|\s]", "", msg.content).replace(" ", "")
             self.log_to_gui(f"处理聊天消息: {q[:30]}{'...' if len(q) > 30 else ''}")
             
-            # 获取提示词
-            prompt = self.get_ai_prompt()
-            self.log_to_gui(f"使用的AI提示词:\n{prompt[:100]}...", "INFO")
-            
             # 先获取AI的回复
             self.log_to_gui(f"向AI ({self.chat.__class__.__name__}) 发送请求...")
-            ai_response = self.chat.get_answer(prompt + q, (msg.roomid if msg.from_group() else msg.sender))
+            ai_response = self.ask_ai(q, (msg.roomid if msg.from_group() else msg.sender))
             
             if ai_response:
                 # 添加分隔线和AI回复章节标题
                 if hasattr(self, "gui") and self.gui:
-                    self.gui.root.after(0, lambda: self.gui.add_section_header("AI分析结果"))
+                    self.gui.add_section_header("AI分析结果")
                 
                 self.log_to_gui(f"收到AI回复: {ai_response[:30]}{'...' if len(ai_response) > 30 else ''}")
                 # 记录完整的AI回复
@@ -326,7 +463,7 @@ class Robot(Job):
                 if self.is_valid_strategy_text(ai_response):
                     # 添加策略分析章节标题
                     if hasattr(self, "gui") and self.gui:
-                        self.gui.root.after(0, lambda: self.gui.add_section_header("策略分析处理"))
+                        self.gui.add_section_header("策略分析处理")
                     
                     self.log_to_gui("检测到股票相关内容，开始策略分析")
                     strategy_result = self.strategy_manager.analyze_strategy(ai_response)
@@ -348,20 +485,47 @@ class Robot(Job):
                 self.log_to_gui("AI处理失败，未能获取回复", "ERROR")
                 return False
 
-    def process_strategy_text(self, text: str, receiver: str, at_list: list) -> None:
+    def process_strategy_text(self, text: str, receiver: str, at_list: list, sender: str = None,
+                              ai_response: str = None) -> Optional[str]:
         """处理策略文本
         
         Args:
             text: 策略文本
             receiver: 接收者
             at_list: @列表
+            sender: 消息发送者 wxid，群聊时与接收者（群ID）不同，不传时按接收者记录
+            ai_response: 调用方已经过前置过滤并询问过AI时传入（如图片消息），不再重复过滤、询问和统计
+
+        Returns:
+            AI回复（本地解析时为生成的策略文本），未处理时为 None
         """
         self.LOG.info(f"收到策略文本: {text}")
         self.LOG.info(f"接收者: {receiver}")
         self.LOG.info(f"@列表: {at_list}")
+
+        asked = ai_response is not None
+        if not asked and not self.is_worth_asking(text):
+            return None
         
-        # 调用AI处理策略文本
-        ai_response = self.chat.get_answer(text, receiver)
+        # 符合固定模板的策略先在本地解析，置信度足够时跳过AI和策略分析接口
+        strategy_data = None
+        local_parse = getattr(self.config, "LOCAL_PARSE", {})
+        if local_parse.get("enable", True):
+            data, confidence = self.strategy_manager.parse_local(text)
+            if confidence >= float(local_parse.get("threshold", 0.9)):
+                if asked:
+                    self.LOG.info(f"本地解析置信度 {confidence}，跳过策略分析接口")
+                else:
+                    self.LOG.info(f"本地解析置信度 {confidence}，跳过AI和策略分析接口")
+                    metrics.AI_SKIPPED.inc(reason="local_parse")
+                strategy_data = data
+
+        if strategy_data:
+            ai_response = self.strategy_manager.to_markdown(strategy_data)
+        elif not asked:
+            # 调用AI处理策略文本
+            ai_response = self.ask_ai(text, receiver)
+            self.observe_relevance(text, ai_response)
         self.LOG.info(f"AI响应: {ai_response}")
         
         # 发送短信
@@ -382,14 +546,15 @@ class Robot(Job):
         
         # 添加策略分析章节标题
         if hasattr(self, "gui") and self.gui:
-            self.gui.root.after(0, lambda: self.gui.add_section_header("策略分析处理"))
+            self.gui.add_section_header("策略分析处理")
         
         # 只有当文本包含股票相关内容时才进行策略分析
-        if self.is_valid_strategy_text(ai_response):
+        if strategy_data or self.is_valid_strategy_text(ai_response):
             self.LOG.info("检测到股票相关内容，开始策略分析")
             
-            # 调用策略分析接口
-            strategy_data = self.strategy_manager.analyze_strategy(ai_response)
+            # 调用策略分析接口，本地已解析时直接使用本地结果
+            if not strategy_data:
+                strategy_data = self.strategy_manager.analyze_strategy(ai_response)
             
             if strategy_data:
                 self.LOG.info(f"策略分析成功: {strategy_data}")
@@ -411,7 +576,12 @@ class Robot(Job):
                 # 添加策略
                 success, message, updated_strategy = self.strategy_manager.add_strategy(strategy)
                 self.LOG.info(f"策略添加结果: {success}, {message}")
-                
+
+                # 记录策略日志，供回测按来源统计
+                source_type = "群聊" if receiver.endswith("@chatroom") else "私聊"
+                self.robot_logger.log_strategy(source_type, receiver, sender or receiver, text, ai_response,
+                                               strategy_data, success, message)
+
                 # 发送策略详情
                 if success and updated_strategy:
                     strategy_message = self.strategy_manager.format_strategy_message(updated_strategy)
@@ -424,6 +594,7 @@ class Robot(Job):
         else:
             self.LOG.info("文本不包含股票相关内容，跳过策略分析")
             # 不发送消息给用户
+        return ai_response
 
     def process_image_message(self, msg: WxMsg, is_group: bool = False) -> None:
         """处理图片消息
@@ -441,7 +612,7 @@ class Robot(Job):
             
             # 添加OCR识别章节标题
             if hasattr(self, "gui") and self.gui:
-                self.gui.root.after(0, lambda: self.gui.add_section_header("OCR文字识别"))
+                self.gui.add_section_header("OCR文字识别")
                 
             # OCR识别图片文字
             text = self.image_ocr.extract_text(saved_path)
@@ -456,7 +627,7 @@ class Robot(Job):
                 self.log_to_gui("============ OCR识别结果结束 ============", "INFO")
                 
                 # 处理识别出的文字
-                self.process_strategy_text(text, receiver, [])
+                self.process_strategy_text(text, receiver, [], sender)
             else:
                 # 记录空OCR结果
                 self.log_to_gui("OCR识别结果: 未识别到文字", "WARNING")
@@ -477,7 +648,7 @@ class Robot(Job):
             
             # 添加OCR识别章节标题
             if hasattr(self, "gui") and self.gui:
-                self.gui.root.after(0, lambda: self.gui.add_section_header("OCR文字识别"))
+                self.gui.add_section_header("OCR文字识别")
                 
             # OCR识别图片文字
             text = self.image_ocr.extract_text(saved_path)
@@ -491,8 +662,17 @@ class Robot(Job):
                 self.log_to_gui(text, "INFO")
                 self.log_to_gui("============ OCR识别结果结束 ============", "INFO")
                 
+                # 不含策略信号词的图片不再调用AI
+                if not self.is_worth_asking(text):
+                    if is_group:
+                        self.robot_logger.log_group_image(msg.roomid, sender, saved_path, text, "无相关信息")
+                    else:
+                        self.robot_logger.log_private_image(sender, saved_path, text, "无相关信息")
+                    return
+
                 # 获取AI回复
-                ai_response = self.chat.get_answer(text, receiver) if self.chat else "未配置AI模型"
+                ai_response = self.ask_ai(text, receiver) if self.chat else "未配置AI模型"
+                self.observe_relevance(text, ai_response)
                 
                 # 记录图片处理日志
                 if is_group:
@@ -501,14 +681,14 @@ class Robot(Job):
                     self.robot_logger.log_private_image(sender, saved_path, text, ai_response)
                 
                 # 检查AI是否返回"无相关信息"
-                if ai_response.strip() == "无相关信息":
+                if ai_response.strip() == IRRELEVANT_ANSWER:
                     self.LOG.info("AI判断图片内容与股票无关，不进行策略分析")
                     self.log_to_gui("AI判断图片内容与股票无关，不进行策略分析", "INFO")
                     # 不发送消息给用户
                     return
                 
-                # 处理识别出的文字
-                self.process_strategy_text(text, receiver, [])
+                # 处理识别出的文字，前面已经过滤并询问过AI，直接使用这次的回复
+                self.process_strategy_text(text, receiver, [], sender, ai_response)
             else:
                 # 记录空OCR结果
                 self.log_to_gui("OCR识别结果: 未识别到文字", "WARNING")
@@ -543,6 +723,8 @@ class Robot(Job):
             return True
         return False
 
+    @traced("processMsg", lambda self, msg: {"msg.id": msg.id, "msg.type": msg.type, "msg.from_group": msg.from_group()})
+    @metrics.track_message
     def processMsg(self, msg: WxMsg) -> None:
         """处理接收到的消息"""
         # 记录消息
@@ -556,8 +738,6 @@ class Robot(Job):
 
             if msg.is_at(self.wxid):  # 被@
                 self.log_to_gui(f"收到@消息: roomid={msg.roomid}, sender={msg.sender}")
-                # 记录群聊消息
-                self.robot_logger.log_group_chat(msg.roomid, msg.sender, msg.content, "处理中...")
                 # 对于模拟环境，使用toChitchat方法处理消息可能更合适
                 if hasattr(self.wcf, 'gui') and self.wcf.gui:
                     # 在模拟环境中，使用toChitchat直接处理
@@ -566,7 +746,12 @@ class Robot(Job):
                 else:
                     # 在真实环境中，使用process_strategy_text处理
                     self.log_to_gui("在真实环境中使用process_strategy_text处理消息")
-                    self.process_strategy_text(msg.content, msg.roomid, [])
+                    ai_response = "处理出错"
+                    try:
+                        ai_response = self.process_strategy_text(msg.content, msg.roomid, [], msg.sender) or "无相关信息"
+                    finally:
+                        # 处理完成后记录一次群聊消息和实际回复，出错时同样记录
+                        self.robot_logger.log_group_chat(msg.roomid, msg.sender, msg.content, ai_response)
             elif msg.type == 0x03:  # 图片消息
                 self.log_to_gui(f"收到群图片消息: roomid={msg.roomid}, sender={msg.sender}")
                 self.process_image_message(msg, is_group=True)
@@ -587,10 +772,18 @@ class Robot(Job):
                 if msg.content == "^更新$":
                     self.config.reload()
                     self.LOG.info("已更新配置")
+                elif msg.content == STOP_COMMAND:
+                    self.sendTextMsg(self.stopProfiler(), "filehelper")
+                elif PROFILE_COMMAND.match(msg.content):
+                    seconds = PROFILE_COMMAND.match(msg.content).group(1)
+                    self.sendTextMsg(self.startProfiler(int(seconds) if seconds else None), "filehelper")
             else:
-                # 记录私聊消息
-                self.robot_logger.log_private_chat(msg.sender, msg.content, "处理中...")
-                self.process_strategy_text(msg.content, msg.sender, [])
+                ai_response = "处理出错"
+                try:
+                    ai_response = self.process_strategy_text(msg.content, msg.sender, [], msg.sender) or "无相关信息"
+                finally:
+                    # 处理完成后记录一次私聊消息和实际回复，出错时同样记录
+                    self.robot_logger.log_private_chat(msg.sender, msg.content, ai_response)
         elif msg.type == 0x03:  # 图片消息
             self.process_image_message(msg, is_group=False)
 
@@ -625,6 +818,7 @@ class Robot(Job):
         self.wcf.enable_receiving_msg()
         Thread(target=innerProcessMsg, name="GetMessage", args=(self.wcf,), daemon=True).start()
 
+    @traced("sendTextMsg", lambda self, msg, receiver, *args, **kwargs: {"receiver": receiver})
     def sendTextMsg(self, msg: str, receiver: str, at_list: str = "") -> None:
         """发送文本消息（重写为不执行任何操作）
         :param msg: 消息内容
@@ -632,11 +826,30 @@ class Robot(Job):
         :param at_list: 要@的用户列表
         """
         # 只记录日志，不实际发送消息
+        metrics.MESSAGES_SENT.inc(mode="silent")
         self.log_to_gui(f"[静默模式] 不发送消息到 {receiver}: {msg[:50]}{'...' if len(msg) > 50 else ''}", "INFO")
         
         # 如果在GUI模式下，仍然显示机器人消息（但不实际发送）
         if hasattr(self, "gui") and self.gui:
-            self.gui.root.after(0, lambda: self.gui.add_robot_message(f"[静默模式] {msg}"))
+            self.gui.add_robot_message(f"[静默模式] {msg}")
+
+    def startProfiler(self, seconds: int = None) -> str:
+        """开始采样性能分析，结束后把结果文件路径发给文件传输助手
+        :param seconds: 采样秒数，不填时使用默认时长
+        :return: 提示信息
+        """
+        def on_done(path: str, samples: int) -> None:
+            self.sendTextMsg(f"性能分析完成，采样 {samples} 次: {path}", "filehelper")
+
+        _, message = profiler.start(seconds, on_done)
+        self.LOG.info(message)
+        return message
+
+    def stopProfiler(self) -> str:
+        """提前结束性能分析"""
+        _, message = profiler.stop()
+        self.LOG.info(message)
+        return message
 
     def getAllContacts(self) -> dict:
         """
@@ -0,0 +1,183 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""无界面的微信机器人模拟器
+
+与 gui.py 使用同一套模拟通信层（mock_wcf.py），不需要 Tk 和显示器。
+消息投递到 MockWcf 的队列，由机器人的 enableReceivingMsg 接收线程取出处理，
+与真实运行时的代码路径相同，机器人的回复打印到标准输出。
+
+用法:
+    python simulator.py [-c 6] [--robot b] [--group 群ID] [--sender test_user] [--file 消息.txt] [--quiet]
+
+不指定 --file 时从标准输入逐行读取，交互输入时支持以下命令:
+    /img 图片路径    发送图片消息
+    /group 群ID      切换到群聊，消息自动 @机器人
+    /private         切换到私聊
+    /wait            等待已发送的消息处理完
+    /quit            退出
+--file 中的消息以 ==== 分隔行分隔（与 test_data/messages.txt 相同），没有分隔行时每行一条。
+"""
+
+import contextlib
+import os
+import re
+import sys
+import time
+from argparse import ArgumentParser
+
+from configuration import Config
+from constants import ChatType
+from mock_wcf import MockWcf, MockWxMsg
+
+SEPARATOR = re.compile(r"\n=+\n")
+
+
+class Simulator:
+    """把文本和图片构造成模拟消息投递给机器人"""
+
+    def __init__(self, robot, wcf: MockWcf, sender: str = "test_user", group: str = "") -> None:
+        """
+        :param robot: 机器人对象，需已调用 enableReceivingMsg
+        :param wcf: 机器人使用的 MockWcf
+        :param sender: 发送者 wxid
+        :param group: 群ID，为空时发私聊
+        """
+        self.robot = robot
+        self.wcf = wcf
+        self.sender = sender
+        self.group = group
+        self.sent = 0
+        self.replies = 0
+        self._seq = 0
+        self._attach(robot)
+
+    def _attach(self, robot) -> None:
+        """替换这个机器人实例的 sendTextMsg，记录回复后再调用原方法
+        robot_b 的 sendTextMsg 为静默模式，不经过 wcf.send_text，只能在这里拦截
+        """
+        original_send_text_msg = robot.sendTextMsg
+
+        def send_text_msg(msg, receiver, at_list=""):
+            self.on_reply(msg, receiver, at_list)
+            original_send_text_msg(msg, receiver, at_list)
+
+        robot.sendTextMsg = send_text_msg
+
+    def on_reply(self, msg: str, receiver: str, at_list=None) -> None:
+        self.replies += 1
+        print(f"[机器人 -> {receiver}] {msg}", file=sys.__stdout__, flush=True)
+
+    def send_text(self, content: str) -> None:
+        """发送文本消息，群聊时自动 @机器人"""
+        if self.group and not content.startswith(f"@{self.robot.wxid}"):
+            content = f"@{self.robot.wxid} {content}"
+        self._put(MockWxMsg(content=content, sender=self.sender, roomid=self.group))
+
+    def send_image(self, path: str) -> None:
+        """发送图片消息"""
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            print(f"[模拟器] 图片不存在: {path}", file=sys.__stdout__, flush=True)
+            return
+        msg = MockWxMsg(content=path, sender=self.sender, roomid=self.group, msg_type=0x03)
+        # 带 mock 标记的图片消息直接以 content 作为图片路径，不经过下载
+        self._seq += 1
+        msg.id = f"mock-{self._seq}"
+        self.wcf.last_image_path = path
+        self._put(msg)
+
+    def _put(self, msg: MockWxMsg) -> None:
+        self.sent += 1
+        self.wcf.put_msg(msg)
+
+    def handle_line(self, line: str) -> bool:
+        """处理一行输入
+        :return: 是否继续读取
+        """
+        line = line.rstrip("\n")
+        if not line.strip():
+            return True
+        command, _, arg = line.strip().partition(" ")
+        if command == "/quit":
+            return False
+        elif command == "/wait":
+            self.wcf.join()
+        elif command == "/private":
+            self.group = ""
+        elif command == "/group" and arg.strip():
+            self.group = arg.strip()
+            if self.group not in self.robot.config.GROUPS:
+                self.robot.config.GROUPS.append(self.group)
+        elif command == "/img" and arg.strip():
+            self.send_image(arg.strip())
+        else:
+            self.send_text(line)
+        return True
+
+
+def load_messages(path: str) -> list:
+    """读取消息文件，有 ==== 分隔行时按分隔行切分，否则每行一条"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    parts = SEPARATOR.split(text) if SEPARATOR.search(text) else text.splitlines()
+    return [part.strip() for part in parts if part.strip()]
+
+
+def build_robot(robot_type: str, chat_type: int, wcf: MockWcf):
+    """创建机器人，robot_type 为 a 时使用 robot.py，为 b 时使用 robot_b.py"""
+    if robot_type == "b":
+        from robot_b import Robot
+    else:
+        from robot import Robot
+    config = Config()
+    if not getattr(config, "GROUPS", None):
+        config.GROUPS = []
+    return Robot(config, wcf, chat_type)
+
+
+def main() -> int:
+    parser = ArgumentParser(description="无界面的微信机器人模拟器")
+    parser.add_argument("-c", type=int, default=0, help=f"选择模型参数序号: {ChatType.help_hint()}")
+    parser.add_argument("--robot", choices=["a", "b"], default="a", help="a: robot.py，b: robot_b.py")
+    parser.add_argument("--sender", default="test_user", help="发送者 wxid")
+    parser.add_argument("--group", default="", help="以群聊发送，填写群ID，会自动加入响应群列表")
+    parser.add_argument("--file", help="从文件读取消息，发送完等待处理结束后退出")
+    parser.add_argument("--quiet", action="store_true", help="不打印机器人和模拟层的调试输出，只打印回复和统计")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        if args.quiet:
+            devnull = stack.enter_context(open(os.devnull, "w", encoding="utf-8"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+
+        wcf = MockWcf()
+        robot = build_robot(args.robot, args.c, wcf)
+        robot.enableReceivingMsg()
+        simulator = Simulator(robot, wcf, args.sender)
+        if args.group:
+            simulator.handle_line(f"/group {args.group}")
+
+        started = time.perf_counter()
+        try:
+            if args.file:
+                for content in load_messages(args.file):
+                    simulator.send_text(content)
+            else:
+                for line in sys.stdin:
+                    if not simulator.handle_line(line):
+                        break
+            wcf.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            wcf.disable_receiving_msg()
+        elapsed = time.perf_counter() - started
+
+    rate = simulator.sent / elapsed if elapsed > 0 else 0.0
+    print(f"[模拟器] 发送 {simulator.sent} 条，回复 {simulator.replies} 条，耗时 {elapsed:.2f} 秒（{rate:.1f} 条/秒）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
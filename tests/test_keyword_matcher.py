@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from plugin.keyword_matcher import GATE_CATEGORIES, KeywordMatcher, matcher
+
+
+def brute_force(keywords, text):
+    """逐个关键词用 find 查找所有出现位置"""
+    hits = set()
+    for category, words in keywords.items():
+        for word in words:
+            start = text.find(word)
+            while word and start != -1:
+                hits.add((start, word, category))
+                start = text.find(word, start + 1)
+    return hits
+
+
+def random_texts(alphabet, count, seed):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(count)]
+
+
+def test_overlapping_keywords_match_find():
+    # 互为前后缀、互相包含的关键词，覆盖失败指针和输出合并
+    keywords = {"a": ["he", "she", "his", "hers"], "b": ["her", "e", "s"], "c": ["ushe"]}
+    m = KeywordMatcher(keywords)
+    for text in ["ushers", "hishers", "", "xyz"] + random_texts("heirsux", 300, 1):
+        assert set(m.find_all(text)) == brute_force(keywords, text)
+        assert m.categories(text) == {category for _, _, category in brute_force(keywords, text)}
+
+
+def test_global_matcher_matches_find():
+    texts = ["#大师实战演练 操作建议：3成仓位买入，止损10元", "今天天气不错", "建议加仓，目标价15元，耐心持股"]
+    alphabet = "".join({ch for words in matcher.keywords.values() for word in words for ch in word}) + "的了，。 "
+    for text in texts + random_texts(alphabet, 300, 2):
+        assert set(matcher.find_all(text)) == brute_force(matcher.keywords, text)
+
+
+@pytest.mark.parametrize("text", ["明天开会", "操作建议：低吸", "加仓", "", "闲聊" * 100 + "止损"])
+def test_first_agrees_with_in(text):
+    expected = any(word in text for category in GATE_CATEGORIES for word in matcher.keywords[category])
+    hit = matcher.first(text, GATE_CATEGORIES)
+    assert (hit is not None) == expected
+    if hit is not None:
+        assert text[hit.start:hit.start + len(hit.keyword)] == hit.keyword
+
+
+def test_first_filters_categories():
+    m = KeywordMatcher({"a": ["股票"], "b": ["买入"]})
+    assert m.first("股票买入", {"b"}).keyword == "买入"
+    assert m.first("股票", {"b"}) is None
+    assert KeywordMatcher({}).first("股票") is None
@@ -0,0 +1,61 @@
+import pytest
+
+from plugin.stock_index import PINYIN_AVAILABLE, StockIndex
+
+STOCKS = [
+    ("600519.SH", "贵州茅台"),
+    ("000858", "五粮液"),
+    ("601318", "中国平安"),
+    ("601398", "工商银行"),
+    ("600036", "招商银行"),
+    ("000001", "平安银行"),
+    ("600145", "*ST 新亿"),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "stocks.csv"
+    path.write_text("证券代码,证券简称\n" + "".join(f"{code},{name}\n" for code, name in STOCKS), encoding="utf-8")
+    index = StockIndex()
+    assert index.load_csv(str(path)) == len(STOCKS)
+    return index
+
+
+@pytest.mark.parametrize("code, name, expected", [
+    ("600519", "贵州茅台", ("600519", "贵州茅台")),
+    ("600519", "贵州茅合", ("600519", "贵州茅台")),  # OCR 认错一个字，以代码为准
+    ("600519", " 贵州 茅台 ", ("600519", "贵州茅台")),  # OCR 插入空格
+    (None, "五粮液", ("000858", "五粮液")),  # 缺少代码，按名称补全
+    ("000857", "五粮液", ("000858", "五粮液")),  # 代码识别错误，以名称为准
+    (None, "中国平按", ("601318", "中国平安")),  # 名称唯一的近似匹配
+    ("600145", "ST新亿", ("600145", "*ST 新亿")),  # 比较时忽略星号和空格，返回代码表原样名称
+])
+def test_validate_corrects_ocr_noise(index, code, name, expected):
+    assert index.validate(code, name) == (True, *expected)
+
+
+def test_validate_rejects_unknown_and_ambiguous(index):
+    assert index.validate("300750", "宁德时代") == (False, "300750", "宁德时代")
+    # 与工商银行、招商银行距离相同，无法确定时不纠正
+    assert index.validate(None, "X商银行")[0] is False
+    assert index.validate("600519", "完全不同的名字")[0] is False
+
+
+def test_find_in_text(index):
+    text = "OCR: 建议买入贵州茅台，关注601318和平安银行"
+    assert [(m.code, m.name) for m in index.find_in_text(text)] == [
+        ("600519", "贵州茅台"), ("601318", "中国平安"), ("000001", "平安银行")]
+    # 没有出现在代码表中的6位数字不算
+    assert index.find_in_text("价格 123456 元") == []
+
+
+def test_search_and_fuzzy(index):
+    assert sorted(index.search("6013")) == [("601318", "中国平安"), ("601398", "工商银行")]
+    assert index.search("平安") == [("000001", "平安银行")]
+    assert index.fuzzy("贵洲茅台")[0] == ("600519", "贵州茅台")
+
+
+@pytest.mark.skipif(not PINYIN_AVAILABLE, reason="需要 pypinyin")
+def test_pinyin_initials(index):
+    assert index.code_of("gzmt") == "600519"
@@ -0,0 +1,111 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from plugin.strategy_index import IntervalTree, StrategyIndex, _Levels
+
+
+def make_strategy(strategy_id, code="600519", price_min=None, price_max=None, stop=None, profit=None, active=True):
+    return SimpleNamespace(id=strategy_id, stock_code=code, price_min=price_min, price_max=price_max,
+                           stop_loss_price=stop, take_profit_price=profit, is_active=active)
+
+
+def ids(items):
+    return sorted(item.id for item in items)
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_interval_tree_matches_brute_force(bulk):
+    rng = random.Random(7)
+    intervals = {}
+    for i in range(300):
+        lo = round(rng.uniform(0, 100), 1)
+        intervals[i] = (lo, lo + round(rng.uniform(0, 20), 1))
+
+    tree = IntervalTree()
+    if bulk:
+        tree.build((lo, hi, SimpleNamespace(id=i)) for i, (lo, hi) in intervals.items())
+    else:
+        for i, (lo, hi) in intervals.items():
+            tree.insert(lo, hi, SimpleNamespace(id=i))
+    # 删掉一部分，再插入一些端点重合的区间
+    for i in rng.sample(sorted(intervals), 100):
+        assert tree.remove(intervals.pop(i)[0], i)
+    for i in range(300, 350):
+        intervals[i] = (50.0, 50.0 + i % 3)
+        tree.insert(50.0, 50.0 + i % 3, SimpleNamespace(id=i))
+    assert len(tree) == len(intervals)
+
+    for x in [0, 50.0, 51.0, 52.0, 120] + [round(rng.uniform(-5, 125), 1) for _ in range(200)]:
+        expected = sorted(i for i, (lo, hi) in intervals.items() if lo <= x <= hi)
+        assert ids(tree.stab(x)) == expected
+
+
+def test_interval_tree_remove_missing():
+    tree = IntervalTree()
+    tree.insert(1.0, 2.0, SimpleNamespace(id=1))
+    assert not tree.remove(1.0, 2)
+    assert not tree.remove(1.5, 1)
+    assert tree.remove(1.0, 1)
+    assert len(tree) == 0
+    assert tree.stab(1.5) == []
+
+
+def test_levels_between():
+    levels = _Levels()
+    levels.build([(10.0, 1), (12.0, 2)])
+    levels.add(11.0, 3)
+    levels.add(12.0, 4)
+    assert levels.between(10.0, 12.0, True, True) == [1, 3, 2, 4]
+    assert levels.between(10.0, 12.0, False, False) == [3]
+    assert levels.between(10.0, 12.0, False, True) == [3, 2, 4]
+    levels.remove(12.0, 2)
+    levels.remove(12.0, 99)
+    assert levels.between(0, 100, True, True) == [1, 3, 4]
+
+
+def test_strategy_index_queries():
+    index = StrategyIndex()
+    index.load([
+        make_strategy(1, price_min=10, price_max=12, stop=9, profit=15),
+        make_strategy(2, price_min=11, stop=8),  # 只有下限，上限不限
+        make_strategy(3, code="000001", price_min=10, price_max=12),
+        make_strategy(None, price_min=10, price_max=12),  # 没有ID的不进索引
+    ])
+    assert len(index) == 3
+    assert ids(index.containing("600519", 11.5)) == [1, 2]
+    assert ids(index.containing("600519", 100)) == [2]
+    assert index.containing("300750", 11) == []
+
+    assert ids(index.stops_crossed("600519", 10, 8)) == [1, 2]
+    assert ids(index.stops_crossed("600519", 9, 8.5)) == []  # 上次价格已在止损价上
+    assert index.stops_crossed("600519", 8, 10) == []
+    assert ids(index.take_profits_crossed("600519", 14, 15)) == [1]
+    assert index.take_profits_crossed("600519", 15, 16) == []
+
+
+def test_strategy_index_incremental_updates_and_fresh():
+    index = StrategyIndex()
+    strategy = make_strategy(1, price_min=10, price_max=12, stop=9)
+    index.load([strategy])
+    assert ids(index.pop_fresh("600519")) == [1]
+    assert index.pop_fresh("600519") == []
+
+    # 策略被原地修改后 upsert，旧价位应被移除
+    strategy.price_min, strategy.price_max, strategy.stop_loss_price = 20, 22, 19
+    index.upsert(strategy)
+    assert index.containing("600519", 11) == []
+    assert ids(index.containing("600519", 21)) == [1]
+    assert index.stops_crossed("600519", 10, 8) == []
+    assert ids(index.pop_fresh("600519")) == [1]
+
+    # 重新加载时已有的策略不再记为待检查
+    index.load([strategy, make_strategy(2, price_min=1, price_max=2)])
+    assert ids(index.pop_fresh("600519")) == [2]
+
+    index.upsert(make_strategy(2, price_min=1, price_max=2, active=False))
+    assert index.get(2) is None
+    index.remove(1)
+    assert len(index) == 0
+    assert index.containing("600519", 21) == []
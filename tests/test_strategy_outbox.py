@@ -0,0 +1,164 @@
+import time
+
+import pytest
+
+from plugin.strategy_outbox import FAILED, LOCAL_ERROR_ATTEMPTS, PENDING, SENT, STUCK_ATTEMPTS, StrategyOutbox
+
+
+class FakeServer:
+    """按股票名称决定成败的补发函数：rejected 中的被拒绝，down 时全部失败，broken 中的抛出异常"""
+
+    def __init__(self) -> None:
+        self.rejected = set()
+        self.broken = set()
+        self.down = False
+        self.calls = []
+
+    def __call__(self, payload: dict, key: str) -> bool:
+        self.calls.append(payload["stock_name"])
+        if payload["stock_name"] in self.broken:
+            raise ValueError("bad payload")
+        return not self.down and payload["stock_name"] not in self.rejected
+
+
+@pytest.fixture
+def server():
+    return FakeServer()
+
+
+@pytest.fixture
+def make_outbox(tmp_path, server):
+    outboxes = []
+
+    def make(**kwargs):
+        outbox = StrategyOutbox(str(tmp_path / f"outbox{len(outboxes)}.db"), server, **kwargs)
+        outboxes.append(outbox)
+        return outbox
+
+    yield make
+    for outbox in outboxes:
+        outbox._db.close()
+
+
+def rows(outbox):
+    return {name: (status, attempts, next_at) for name, status, attempts, next_at in outbox._db.execute(
+        "SELECT json_extract(payload, '$.stock_name'), status, attempts, next_at FROM outbox")}
+
+
+def test_from_config_is_off_by_default(server):
+    assert StrategyOutbox.from_config({}, server) is None
+    assert StrategyOutbox.from_config(None, server) is None
+
+
+def test_flush_sends_in_order_and_enqueue_is_idempotent(make_outbox, server):
+    outbox = make_outbox()
+    outbox.enqueue({"stock_name": "A"}, key="k1")
+    outbox.enqueue({"stock_name": "A again"}, key="k1")
+    outbox.enqueue({"stock_name": "B"})
+    assert outbox.flush() == 2
+    assert server.calls == ["A", "B"]
+    assert outbox.stats()[SENT] == 2 and outbox.pending() == 0
+    assert outbox.flush() == 0
+
+
+def test_server_down_keeps_order_without_row_backoff(make_outbox, server):
+    outbox = make_outbox()
+    for name in "ABC":
+        outbox.enqueue({"stock_name": name})
+    server.down = True
+    assert outbox.flush() == 0
+    # 连续两条失败即停止本轮，不逐条退避，也不会放弃
+    assert server.calls == ["A", "B"]
+    assert rows(outbox) == {"A": (PENDING, 1, 0), "B": (PENDING, 0, 0), "C": (PENDING, 0, 0)}
+    assert outbox._failures == 1
+    assert outbox.lag() > 0
+
+    server.down = False
+    assert outbox.flush() == 3
+    assert outbox._failures == 0 and outbox.lag() == 0
+
+
+def test_rejected_row_backs_off_alone(make_outbox, server):
+    outbox = make_outbox(interval=10)
+    for name in "ABC":
+        outbox.enqueue({"stock_name": name})
+    server.rejected = {"A"}
+    before = time.time()
+    assert outbox.flush() == 2
+    status, attempts, next_at = rows(outbox)["A"]
+    assert (status, attempts) == (PENDING, 1)
+    assert next_at >= before + 10
+    assert outbox._failures == 0
+    # 退避期间不会重试
+    assert outbox.flush() == 0
+    assert server.calls == ["A", "B", "C"]
+
+
+def test_backoff_doubles_up_to_max(make_outbox):
+    outbox = make_outbox(interval=1, max_backoff=60)
+    assert [outbox._backoff(n) for n in range(1, 9)] == [1, 2, 4, 8, 16, 32, 60, 60]
+
+
+def test_rejected_row_gives_up_and_reports(make_outbox, server):
+    notices = []
+    outbox = make_outbox(interval=0, max_attempts=3, on_failed=lambda *args: notices.append(args))
+    outbox.enqueue({"stock_name": "A"})
+    server.rejected = {"A"}
+    for i in range(3):
+        outbox.enqueue({"stock_name": f"ok{i}"})
+        outbox.flush()
+    assert rows(outbox)["A"][:2] == (FAILED, 3)
+    assert notices == [({"stock_name": "A"}, "接口调用失败", True)]
+    outbox.flush()
+    assert server.calls.count("A") == 3
+
+
+def test_long_rejected_row_is_reported_once(make_outbox, server):
+    notices = []
+    outbox = make_outbox(interval=0, on_failed=lambda *args: notices.append(args))
+    outbox.enqueue({"stock_name": "A"})
+    server.rejected = {"A"}
+    for i in range(STUCK_ATTEMPTS + 2):
+        outbox.enqueue({"stock_name": f"ok{i}"})
+        outbox.flush()
+    assert rows(outbox)["A"][:2] == (PENDING, STUCK_ATTEMPTS + 2)
+    assert notices == [({"stock_name": "A"}, "接口调用失败", False)]
+
+
+def test_local_error_does_not_block_and_gives_up(make_outbox, server):
+    notices = []
+    outbox = make_outbox(interval=0, on_failed=lambda *args: notices.append(args))
+    server.broken = {"A"}
+    outbox.enqueue({"stock_name": "A"})
+    outbox.enqueue({"stock_name": "B"})
+    for _ in range(LOCAL_ERROR_ATTEMPTS + 2):
+        outbox.flush()
+        # 本地错误不计入整体退避
+        assert outbox._failures == 0
+    assert rows(outbox)["A"][:2] == (FAILED, LOCAL_ERROR_ATTEMPTS)
+    assert rows(outbox)["B"][0] == SENT
+    assert notices == [({"stock_name": "A"}, "本地错误: bad payload", True)]
+
+
+def test_failing_callback_does_not_break_flush(make_outbox, server):
+    def on_failed(*args):
+        raise RuntimeError("gui closed")
+
+    outbox = make_outbox(interval=0, max_attempts=1, on_failed=on_failed)
+    server.rejected = {"A"}
+    outbox.enqueue({"stock_name": "A"})
+    outbox.enqueue({"stock_name": "B"})
+    assert outbox.flush() == 1
+    assert rows(outbox)["A"][0] == FAILED
+
+
+def test_prune_keeps_recent_and_pending(make_outbox, server):
+    outbox = make_outbox()
+    outbox.enqueue({"stock_name": "A"})
+    outbox.flush()
+    server.down = True
+    outbox.enqueue({"stock_name": "B"})
+    outbox._db.execute("UPDATE outbox SET sent_at = ? WHERE status = ?", (time.time() - 8 * 86400, SENT))
+    assert outbox.prune(7) == 1
+    assert outbox.prune(7) == 0
+    assert list(rows(outbox)) == ["B"]